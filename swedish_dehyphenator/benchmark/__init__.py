@@ -0,0 +1,13 @@
+"""
+Reproducible benchmarks for the de-hyphenator.
+
+- `swedish_dehyphenator.benchmark.corpus` generates synthetic Swedish-like corpora and a matching word frequency lexicon.
+- `swedish_dehyphenator.benchmark.runner` runs the de-hyphenator over a corpus without user interaction and reports throughput,
+  peak memory and per-stage timings as JSON.
+
+From the command line:
+
+    swe-dehyph-bench generate -o bench_corpus --files 200 --file-chars 20000
+    swe-dehyph-bench run -c bench_corpus -s anf_dict --results before.json
+    swe-dehyph-bench compare before.json after.json
+"""
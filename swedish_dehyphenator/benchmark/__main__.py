@@ -0,0 +1,3 @@
+from swedish_dehyphenator.benchmark.runner import cli
+
+cli()
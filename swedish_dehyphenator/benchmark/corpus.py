@@ -0,0 +1,209 @@
+#!/usr/bin/env python3
+"""
+Synthetic Swedish-like corpora for benchmarking.
+
+Words are built from Swedish syllables with a seeded random generator, so the same parameters always give the same corpus.
+Hyphenated candidates are drawn from a fixed mix that exercises every step of the decision chain: the rules, the lexicon,
+autojoin and, at the `ambiguity` rate, candidates that need a human decision.
+
+A generated corpus directory holds:
+- `meta.json`: the generation parameters and corpus size
+- `wf.json`: the word frequency lexicon
+- `anf_dict/` and/or `txt_file/`: the input files
+"""
+import json
+import os
+import random
+
+
+
+
+_ONSETS = ["", "b", "d", "f", "g", "h", "j", "k", "l", "m", "n", "p", "r", "s", "t", "v", "br", "fr", "gr", "kr", "pr", "tr",
+           "sk", "sl", "sm", "sn", "sp", "st", "sv", "sj", "tj", "kv", "bl", "fl", "gl", "kl", "pl", "str", "skr", "spr"]
+_NUCLEI = ["a", "e", "i", "o", "u", "y", "å", "ä", "ö", "ei", "au"]
+_CODAS = ["", "", "", "n", "r", "s", "t", "l", "m", "k", "ng", "nd", "rt", "st", "ll", "tt", "ck", "rd", "ns", "lk"]
+_TAGS = ["<p>", "</p>", "<em>", "</em>", "<b>", "</b>", "<br/>", "<p> STYLEREF Kantrubrik \\* MERGEFORMAT>"]
+_ABBREVIATIONS = ["EU", "FN", "SVT", "KD", "LO", "SCB", "AMS", "SJ"]
+# Share of candidates of each kind, before the ambiguity rate is taken out
+_KINDS = [
+    ("split", 0.55),      # a long word split between syllables, only joined form in the lexicon
+    ("compound", 0.25),   # two words, joined and dashed forms both in the lexicon with different frequencies
+    ("garbage", 0.08),    # neither form nor the first part are words, autojoined
+    ("uppercase", 0.05),
+    ("numeric", 0.05),
+    ("icke", 0.02),
+]
+
+
+
+
+class SyntheticSwedish:
+    """
+    A seeded vocabulary of Swedish-like words and compounds, and the lexicon and texts built from it.
+
+    Args:
+    - seed: random seed
+    - n_words: number of simple words
+    - n_compounds: number of two-word compounds
+    """
+
+    def __init__(self, seed=0, n_words=5000, n_compounds=2000):
+        rng = random.Random(seed)
+        words = set()
+        while len(words) < n_words:
+            words.add(self._word(rng, rng.choice((1, 2, 2, 3, 3, 4))))
+        self.words = sorted(words)
+        rng.shuffle(self.words)
+        # the longer words, split somewhere in the middle, for end-of-line splits
+        self.splits = []
+        for word in self.words:
+            if len(word) >= 6:
+                i = rng.randint(2, len(word) - 3)
+                self.splits.append((word[:i], word[i:]))
+        self.compounds = []
+        while len(self.compounds) < n_compounds:
+            first, second = rng.choice(self.words), rng.choice(self.words)
+            self.compounds.append((first, second, rng.random() < 0.7))
+        self.ambiguous = [(rng.choice(self.words), rng.choice(self.words)) for _ in range(max(1, n_compounds // 10))]
+
+
+    @staticmethod
+    def _word(rng, n_syllables):
+        return "".join(rng.choice(_ONSETS) + rng.choice(_NUCLEI) + rng.choice(_CODAS) for _ in range(n_syllables))
+
+
+    def lexicon(self):
+        """
+        Return the word frequency dictionary, 'word': freq, with Zipf-distributed frequencies.
+        Compounds are listed both joined and dashed, with the preferred form more frequent. Ambiguous compounds are listed
+        with equal frequencies, so they need a human decision.
+        """
+        wf = {}
+        for rank, word in enumerate(self.words):
+            wf[word] = 1.0 / (rank + 1)
+        for i, (first, second, joined) in enumerate(self.compounds):
+            freq = 0.5 / (len(self.words) + i + 1)
+            wf[first + second] = freq * (2 if joined else 1)
+            wf[f"{first}-{second}"] = freq * (1 if joined else 2)
+        for first, second in self.ambiguous:
+            freq = 0.1 / len(self.words)
+            wf[first + second] = freq
+            wf[f"{first}-{second}"] = freq
+        return wf
+
+
+    def _candidate(self, rng, ambiguity):
+        if rng.random() < ambiguity:
+            return rng.choice(self.ambiguous)
+        r = rng.random()
+        for kind, share in _KINDS:
+            r -= share
+            if r < 0:
+                break
+        if kind == "split" and self.splits:
+            return rng.choice(self.splits)
+        if kind == "compound":
+            return rng.choice(self.compounds)[:2]
+        if kind == "garbage":
+            return "qx" + self._word(rng, 2), self._word(rng, 2)
+        if kind == "uppercase":
+            return rng.choice(_ABBREVIATIONS), rng.choice(self.words)
+        if kind == "numeric":
+            return str(rng.randint(1900, 2029)), rng.choice(("talet", "talets", "tal"))
+        return "icke", rng.choice(self.words)
+
+
+    def text(self, rng, n_chars, density=0.02, noise=0.1, ambiguity=0.02):
+        """
+        Return a text of about n_chars characters, broken into lines.
+
+        Args:
+        - rng: a random.Random instance
+        - n_chars: approximate length of the text
+        - density: share of words that are hyphenated across a line break
+        - noise: share of lines with html tags, carriage returns or extra spaces around them
+        - ambiguity: share of hyphenated candidates that need a human decision
+        """
+        parts = []
+        size = 0
+        line = 0
+        n_common = min(len(self.words), 500)
+        while size < n_chars:
+            if rng.random() < density:
+                first, second = self._candidate(rng, ambiguity)
+                token = f"{first}-\n{second}"
+                line = len(second)
+            else:
+                # frequent words are more likely, like in real text
+                token = self.words[int(rng.paretovariate(1.2)) % n_common] if rng.random() < 0.7 else rng.choice(self.words)
+                line += len(token) + 1
+            if rng.random() < 0.08:
+                token += "."
+            parts.append(token)
+            size += len(token) + 1
+            if line > 70:
+                line = 0
+                if rng.random() < noise:
+                    parts.append(rng.choice(("\r\n", "  \n", "\n" + rng.choice(_TAGS), rng.choice(_TAGS) + "\n")))
+                else:
+                    parts.append("\n")
+            else:
+                parts.append(" ")
+        return "".join(parts).strip()
+
+
+
+
+def generate_corpus(corpus_path, layouts=("anf_dict", "txt_file"), n_files=100, file_chars=20000, density=0.02, noise=0.1, ambiguity=0.02, seed=0, n_words=5000, n_compounds=2000):
+    """
+    Write a synthetic corpus and its lexicon to a directory. Returns the corpus metadata, which is also written to `meta.json`.
+    The same texts are written in every layout.
+
+    Args:
+    - corpus_path: directory to write to
+    - layouts: source types to write files for, anf_dict and/or txt_file
+    - n_files: number of files
+    - file_chars: approximate number of characters per file. Each file's length varies between half and one and a half times this.
+    - density: share of words that are hyphenated across a line break
+    - noise: share of lines with html tags, carriage returns or extra spaces
+    - ambiguity: share of hyphenated candidates that need a human decision
+    - seed: random seed
+    - n_words: size of the simple word vocabulary
+    - n_compounds: number of compounds in the lexicon
+    """
+    vocabulary = SyntheticSwedish(seed=seed, n_words=n_words, n_compounds=n_compounds)
+    os.makedirs(corpus_path, exist_ok=True)
+    with open(os.path.join(corpus_path, "wf.json"), 'w', encoding='utf-8') as f:
+        json.dump(vocabulary.lexicon(), f, ensure_ascii=False)
+    for layout in layouts:
+        os.makedirs(os.path.join(corpus_path, layout), exist_ok=True)
+
+    rng = random.Random(seed + 1)
+    total_chars = 0
+    for i in range(n_files):
+        _text = vocabulary.text(rng, rng.randint(file_chars // 2, file_chars * 3 // 2), density=density, noise=noise, ambiguity=ambiguity)
+        total_chars += len(_text)
+        if "anf_dict" in layouts:
+            anfdict = {"anforande": {"anforande_id": f"bench-{i:06d}", "anforandetext": _text}}
+            with open(os.path.join(corpus_path, "anf_dict", f"bench-{i:06d}.json"), 'w', encoding='utf-8') as f:
+                json.dump(anfdict, f, ensure_ascii=False)
+        if "txt_file" in layouts:
+            with open(os.path.join(corpus_path, "txt_file", f"bench-{i:06d}.txt"), 'w', encoding='utf-8') as f:
+                f.write(_text)
+
+    meta = {
+        "layouts": list(layouts),
+        "files": n_files,
+        "file_chars": file_chars,
+        "chars": total_chars,
+        "density": density,
+        "noise": noise,
+        "ambiguity": ambiguity,
+        "seed": seed,
+        "words": n_words,
+        "compounds": n_compounds,
+    }
+    with open(os.path.join(corpus_path, "meta.json"), 'w', encoding='utf-8') as f:
+        json.dump(meta, f, indent=2)
+
+    return meta
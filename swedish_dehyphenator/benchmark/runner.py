@@ -0,0 +1,276 @@
+#!/usr/bin/env python3
+"""
+Run the de-hyphenator over a synthetic corpus and report how fast it was.
+
+A run has two parts:
+- an end-to-end run of `dehyphenate` over the corpus files, for characters and files per second and peak memory
+- a staged pass over the same texts in memory, timing `clean_anftext`, candidate extraction, decisions and substitution separately
+
+Candidates that need a human decision are answered by a `ScriptedUser`, so runs need no terminal and give the same result every
+time. Results are JSON, so runs can be saved and compared with `compare`.
+"""
+import swedish_dehyphenator.swedish_dehyphenator as sd
+from swedish_dehyphenator.benchmark.corpus import generate_corpus
+from swedish_dehyphenator.cache import DecisionCache
+from swedish_dehyphenator.lexicon import build_lexicon, load_wf
+from swedish_dehyphenator.metrics import Metrics
+from swedish_dehyphenator.recording import Silent
+from contextlib import contextmanager, redirect_stderr, redirect_stdout
+import argparse
+import itertools
+import json
+import os
+import platform
+import sys
+import tempfile
+import time
+try:
+    import resource
+except ImportError:
+    resource = None
+
+
+
+
+class ScriptedUser:
+    """
+    Stands in for `ask_user`, answering from a fixed sequence of (j)oin, (d)ash and (k)eep choices in turn.
+
+    Args:
+    - answers: a string of choices, e.g. "jdk"
+    """
+
+    def __init__(self, answers="j"):
+        if not answers or set(answers) - set("jdk"):
+            raise ValueError("answers must be a string of j, d and k")
+        self._answers = itertools.cycle(answers)
+        self.calls = 0
+
+
+    def __call__(self, autojoined, selected, log_results, progbar=None, config=None):
+        self.calls += 1
+        return next(self._answers)
+
+
+
+
+@contextmanager
+def scripted_user(answers="j"):
+    """
+    Replace `ask_user` with a `ScriptedUser` for the duration of a with block, which gets the ScriptedUser.
+
+    Args:
+    - answers: a string of choices, see `ScriptedUser`
+    """
+    user = ScriptedUser(answers)
+    original, sd.ask_user = sd.ask_user, user
+    try:
+        yield user
+    finally:
+        sd.ask_user = original
+
+
+
+
+@contextmanager
+def _quiet():
+    with open(os.devnull, 'w') as devnull, redirect_stdout(devnull), redirect_stderr(devnull):
+        yield
+
+
+
+
+def peak_rss_mb():
+    """
+    Return the peak resident memory of this process and its finished child processes in MiB, or None where that isn't available.
+    """
+    if resource is None:
+        return None
+    peak = max(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss, resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss)
+    # kilobytes on Linux, bytes on macOS
+    return peak / (1024 * 1024 if sys.platform == "darwin" else 1024)
+
+
+
+
+def stage_timings(texts, wf, cache_size=65536):
+    """
+    Dehyphenate texts in memory in quiet mode, timing each stage of `dehyphenate_text`. Returns (seconds per stage, decisions per rule).
+
+    Args:
+    - texts: list of raw texts
+    - wf: word frequency dictionary: 'word': freq
+    - cache_size: size of the decision cache
+    """
+    selected, autojoined = [], []
+    cache = DecisionCache(maxsize=cache_size)
+    metrics = Metrics(quiet=True)
+    silent = Silent()
+    dcounter = 0
+    for _text in texts:
+        _, dcounter = sd.dehyphenate_text(_text, wf, selected, autojoined, False, dcounter, progbar=silent, cache=cache, metrics=metrics)
+    return metrics.stages, dict(metrics.rules)
+
+
+
+
+def run_benchmark(corpus_path, source_type="anf_dict", lexicon=False, workers=1, io_threads=0, chunk_size=None, cache_size=65536, answers="jdk", repeat=3, quiet=False):
+    """
+    Benchmark the de-hyphenator on a corpus written by `generate_corpus`. Returns the results as a dict.
+    The end-to-end figures are from the fastest of the repeats; every repeat starts without earlier decisions.
+
+    Args:
+    - corpus_path: the corpus directory
+    - source_type: which layout of the corpus to run on, anf_dict or txt_file
+    - lexicon: build and use a memory-mapped lexicon instead of the json word frequency file
+    - workers: number of worker processes, see `dehyphenate_from`
+    - io_threads: number of reader and writer threads, see `dehyphenate_from`
+    - chunk_size: stream txt_file inputs in chunks of this many characters
+    - cache_size: size of the decision cache
+    - answers: choices for candidates that need a human decision, see `ScriptedUser`
+    - repeat: number of end-to-end runs
+    - quiet: run end to end in quiet mode, without per-candidate messages (see `swedish_dehyphenator.metrics`)
+    """
+    if repeat < 1:
+        raise ValueError(f"repeat must be at least 1, not {repeat}")
+    with open(os.path.join(corpus_path, "meta.json"), 'r', encoding='utf-8') as f:
+        meta = json.load(f)
+    input_path = os.path.join(corpus_path, source_type)
+    _files = sd.list_files(input_path, source_type)
+    texts = [sd._read_source(_file, source_type)[1] for _file in _files]
+    n_chars = sum(len(_text) for _text in texts)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        wf_path = os.path.join(corpus_path, "wf.json")
+        if lexicon:
+            wf_path = os.path.join(tmp, "wf.lex")
+            build_lexicon(os.path.join(corpus_path, "wf.json"), wf_path)
+        t0 = time.perf_counter()
+        wf = load_wf(wf_path)
+        load_seconds = time.perf_counter() - t0
+
+        runs = []
+        for i in range(repeat):
+            output_path = os.path.join(tmp, f"out{i}") + "/"
+            os.makedirs(output_path)
+            with scripted_user(answers) as user, _quiet():
+                t0 = time.perf_counter()
+                _, dcounter, fcounter = sd.dehyphenate(input_path=input_path, output_path=output_path, source_type=source_type, wf_anf=wf, log_results=False,
+                                                       cache=DecisionCache(maxsize=cache_size), workers=workers, chunk_size=chunk_size, io_threads=io_threads,
+                                                       metrics=Metrics(quiet=True) if quiet else None)
+                runs.append(time.perf_counter() - t0)
+        with scripted_user(answers):
+            stages, rules = stage_timings(texts, wf, cache_size=cache_size)
+        if hasattr(wf, "close"):
+            wf.close()
+
+    wall = min(runs)
+    return {
+        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S%z"),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "corpus": meta,
+        "params": {
+            "source_type": source_type,
+            "lexicon": lexicon,
+            "workers": workers,
+            "io_threads": io_threads,
+            "chunk_size": chunk_size,
+            "cache_size": cache_size,
+            "answers": answers,
+            "repeat": repeat,
+            "quiet": quiet,
+        },
+        "results": {
+            "files": fcounter,
+            "chars": n_chars,
+            "dashwords": dcounter,
+            "user_answers": user.calls,
+            "wall_seconds": wall,
+            "wall_seconds_all": runs,
+            "chars_per_second": n_chars / wall if wall else None,
+            "files_per_second": fcounter / wall if wall else None,
+            "peak_rss_mb": peak_rss_mb(),
+            "lexicon_load_seconds": load_seconds,
+            "stage_seconds": stages,
+            "rules": rules,
+        },
+    }
+
+
+
+
+def compare(before, after):
+    """
+    Compare two benchmark results. Returns a dict of metric: (before, after, after / before).
+
+    Args:
+    - before: results dict, as returned by `run_benchmark`
+    - after: results dict
+    """
+    def _metrics(results):
+        r = results["results"]
+        metrics = {key: r[key] for key in ("chars_per_second", "files_per_second", "wall_seconds", "peak_rss_mb")}
+        for stage, seconds in r["stage_seconds"].items():
+            metrics[f"{stage}_seconds"] = seconds
+        return metrics
+
+    a, b = _metrics(before), _metrics(after)
+    return {key: (a[key], b.get(key), b[key] / a[key] if a[key] and b.get(key) is not None else None) for key in a}
+
+
+
+
+def cli():
+    """
+    Generate benchmark corpora, run benchmarks and compare their results from the command line.
+    """
+    parser = argparse.ArgumentParser(description=__doc__, prog="swe-dehyph-bench", formatter_class=argparse.RawDescriptionHelpFormatter)
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    generate = subparsers.add_parser("generate", help="write a synthetic corpus and lexicon")
+    generate.add_argument("-o", "--corpus-path", type=str, required=True, help="Directory to write the corpus to")
+    generate.add_argument("--layouts", type=str, nargs="+", choices=["anf_dict", "txt_file"], default=["anf_dict", "txt_file"], help="Source types to write files for")
+    generate.add_argument("--files", type=int, default=100, help="Number of files")
+    generate.add_argument("--file-chars", type=int, default=20000, help="Approximate number of characters per file")
+    generate.add_argument("--density", type=float, default=0.02, help="Share of words hyphenated across a line break")
+    generate.add_argument("--noise", type=float, default=0.1, help="Share of lines with html tags, carriage returns or extra spaces")
+    generate.add_argument("--ambiguity", type=float, default=0.02, help="Share of candidates that need a human decision")
+    generate.add_argument("--seed", type=int, default=0, help="Random seed")
+
+    run = subparsers.add_parser("run", help="benchmark the de-hyphenator on a generated corpus")
+    run.add_argument("-c", "--corpus-path", type=str, required=True, help="A directory written by generate")
+    run.add_argument("-s", "--source-type", type=str, choices=["anf_dict", "txt_file"], default="anf_dict", help="Which layout to run on")
+    run.add_argument("--lexicon", action="store_true", help="Use a memory-mapped lexicon instead of the json word frequency file")
+    run.add_argument("-w", "--workers", type=int, default=1, help="Number of worker processes")
+    run.add_argument("--io-threads", type=int, default=0, help="Number of reader and writer threads")
+    run.add_argument("--chunk-size", type=int, default=None, help="Stream txt_file inputs in chunks of this many characters")
+    run.add_argument("--cache-size", type=int, default=65536, help="Size of the decision cache")
+    run.add_argument("--answers", type=str, default="jdk", help="Scripted answers to candidates that need a human decision, used in turn")
+    run.add_argument("--quiet", action="store_true", help="Run end to end without per-candidate messages")
+    run.add_argument("--repeat", type=int, default=3, help="Number of end-to-end runs; the fastest is reported")
+    run.add_argument("--results", type=str, default=None, help="Write the results to this json file")
+
+    comp = subparsers.add_parser("compare", help="compare two results files")
+    comp.add_argument("before", type=str, help="Results of the baseline run")
+    comp.add_argument("after", type=str, help="Results of the run to compare")
+
+    args = parser.parse_args()
+    if args.command == "generate":
+        meta = generate_corpus(args.corpus_path, layouts=tuple(args.layouts), n_files=args.files, file_chars=args.file_chars, density=args.density,
+                               noise=args.noise, ambiguity=args.ambiguity, seed=args.seed)
+        print(f"Wrote {meta['files']} files, {meta['chars']} characters, to {args.corpus_path}")
+    elif args.command == "run":
+        results = run_benchmark(args.corpus_path, source_type=args.source_type, lexicon=args.lexicon, workers=args.workers, io_threads=args.io_threads,
+                                chunk_size=args.chunk_size, cache_size=args.cache_size, answers=args.answers, repeat=args.repeat, quiet=args.quiet)
+        if args.results is not None:
+            with open(args.results, 'w', encoding='utf-8') as f:
+                json.dump(results, f, indent=2)
+        print(json.dumps(results["results"], indent=2))
+    else:
+        with open(args.before, 'r', encoding='utf-8') as f:
+            before = json.load(f)
+        with open(args.after, 'r', encoding='utf-8') as f:
+            after = json.load(f)
+        for key, (a, b, ratio) in compare(before, after).items():
+            print("{:<22} {:>14} {:>14} {:>8}".format(key, "-" if a is None else f"{a:.4g}", "-" if b is None else f"{b:.4g}", "-" if ratio is None else f"{ratio:.3f}x"))
@@ -0,0 +1,95 @@
+#!/usr/bin/env python3
+"""
+A bounded memo cache for hyphenation decisions, shared across files in a run.
+"""
+from collections import namedtuple, OrderedDict
+
+
+
+
+CacheInfo = namedtuple("CacheInfo", ["hits", "misses", "maxsize", "currsize"])
+
+
+
+
+class DecisionCache:
+    """
+    Least-recently-used cache of automatic decisions, keyed on the (prefix, suffix) pair of a 'prefix- suffix' candidate.
+
+    Args:
+    - maxsize: maximum number of entries to keep. None means unbounded, 0 disables the cache.
+    """
+
+    def __init__(self, maxsize=65536):
+        self.maxsize = maxsize
+        self.hits = 0
+        self.misses = 0
+        self._data = OrderedDict()
+
+
+    def get(self, key):
+        """
+        Return the cached value for key, or None. Counts a hit or a miss.
+
+        Args:
+        - key: a (prefix, suffix) tuple
+        """
+        try:
+            value = self._data[key]
+        except KeyError:
+            self.misses += 1
+            return None
+        self._data.move_to_end(key)
+        self.hits += 1
+        return value
+
+
+    def put(self, key, value):
+        """
+        Store value under key, evicting the least recently used entry if the cache is full.
+
+        Args:
+        - key: a (prefix, suffix) tuple
+        - value: the decision to remember
+        """
+        if self.maxsize == 0:
+            return
+        self._data[key] = value
+        self._data.move_to_end(key)
+        if self.maxsize is not None and len(self._data) > self.maxsize:
+            self._data.popitem(last=False)
+
+
+    def merge(self, entries, hits=0, misses=0):
+        """
+        Add entries and statistics from another cache, e.g. a worker process's.
+
+        Args:
+        - entries: iterable of (key, value) pairs, least recently used first
+        - hits: number of hits to add
+        - misses: number of misses to add
+        """
+        for key, value in entries:
+            self.put(key, value)
+        self.hits += hits
+        self.misses += misses
+
+
+    def info(self):
+        """
+        Return hit and miss statistics as a CacheInfo tuple.
+        """
+        return CacheInfo(self.hits, self.misses, self.maxsize, len(self._data))
+
+
+    def clear(self):
+        """
+        Empty the cache and reset its statistics.
+        """
+        self._data.clear()
+        self.hits = 0
+        self.misses = 0
+
+
+    def __len__(self):
+        return len(self._data)
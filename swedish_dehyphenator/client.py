@@ -0,0 +1,151 @@
+#!/usr/bin/env python3
+"""
+A thin client for `swe-dehyph serve`.
+
+It only uses the standard library and doesn't import the rest of the package, so it starts quickly. From the command line:
+
+    swe-dehyph-client --socket /tmp/swe-dehyph.sock "en riks- dag"
+    cat speech.txt | swe-dehyph-client --port 8765
+    cat speeches.txt | swe-dehyph-client --socket /tmp/swe-dehyph.sock --lines
+"""
+import argparse
+import http.client
+import json
+import socket
+import sys
+
+
+
+
+class Client:
+    """
+    Send requests to a running `swe-dehyph serve`. Over a Unix socket, one connection is kept open for all requests.
+
+    Args:
+    - socket_path: path of the server's Unix socket
+    - host: the server's HTTP address
+    - port: the server's HTTP port, if no socket_path is given
+    - timeout: seconds to wait for the server
+    """
+
+    def __init__(self, socket_path=None, host="127.0.0.1", port=None, timeout=60.0):
+        if socket_path is None and port is None:
+            raise ValueError("give the server's socket_path or port")
+        self.socket_path = socket_path
+        self.host = host
+        self.port = port
+        self.timeout = timeout
+        self._sock = None
+        self._rfile = None
+        self._http = None
+
+
+    def request(self, request):
+        """
+        Send a request and return the response, see `swedish_dehyphenator.server`. Raises RuntimeError if the server reports an error.
+
+        Args:
+        - request: the request, a dict
+        """
+        data = json.dumps(request, ensure_ascii=False).encode('utf-8')
+        if self.socket_path is not None:
+            if self._sock is None:
+                self._sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+                self._sock.settimeout(self.timeout)
+                self._sock.connect(self.socket_path)
+                self._rfile = self._sock.makefile('rb')
+            self._sock.sendall(data + b"\n")
+            response = json.loads(self._rfile.readline())
+        else:
+            if self._http is None:
+                self._http = http.client.HTTPConnection(self.host, self.port, timeout=self.timeout)
+            self._http.request("POST", "/", body=data, headers={"Content-Type": "application/json"})
+            response = json.loads(self._http.getresponse().read())
+        if "error" in response:
+            raise RuntimeError(response["error"])
+        return response
+
+
+    def dehyphenate(self, text):
+        """
+        Dehyphenate a string. Returns (text, fixes).
+
+        Args:
+        - text: a raw string
+        """
+        response = self.request({"text": text})
+        return response["text"], response["fixes"]
+
+
+    def dehyphenate_many(self, texts):
+        """
+        Dehyphenate a list of strings in one request. Returns a list of (text, fixes) tuples.
+
+        Args:
+        - texts: a list of raw strings
+        """
+        return [(r["text"], r["fixes"]) for r in self.request({"texts": list(texts)})["results"]]
+
+
+    def flush(self):
+        """
+        Ask the server to save the decisions it has learned.
+        """
+        self.request({"op": "flush"})
+
+
+    def close(self):
+        """
+        Close the connection to the server.
+        """
+        if self._sock is not None:
+            self._rfile.close()
+            self._sock.close()
+            self._sock = self._rfile = None
+        if self._http is not None:
+            self._http.close()
+            self._http = None
+
+
+    def __enter__(self):
+        return self
+
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+
+
+def cli():
+    """
+    Dehyphenate text with a running server from the command line.
+    """
+    parser = argparse.ArgumentParser(description=__doc__, prog="swe-dehyph-client", formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("texts", nargs="*", help="Strings to dehyphenate. Standard input is read if none are given.")
+    parser.add_argument("--socket", type=str, default=None, help="The server's Unix socket")
+    parser.add_argument("--host", type=str, default="127.0.0.1", help="The server's HTTP address")
+    parser.add_argument("--port", type=int, default=None, help="The server's HTTP port")
+    parser.add_argument("--lines", action="store_true", help="Treat each line of standard input as a separate text, sent in one batch")
+    parser.add_argument("--flush", action="store_true", help="Ask the server to save its decisions")
+    args = parser.parse_args()
+    if args.socket is None and args.port is None:
+        parser.error("give --socket or --port")
+
+    with Client(socket_path=args.socket, host=args.host, port=args.port) as client:
+        if args.flush:
+            client.flush()
+        texts = args.texts
+        if not texts and not args.flush:
+            texts = sys.stdin.read().splitlines() if args.lines else [sys.stdin.read()]
+        if len(texts) == 1:
+            print(client.dehyphenate(texts[0])[0])
+        elif texts:
+            for _text, _ in client.dehyphenate_many(texts):
+                print(_text)
+
+
+
+
+if __name__ == "__main__":
+    cli()
@@ -0,0 +1,110 @@
+#!/usr/bin/env python3
+"""
+Read and write gzip and xz compressed files as if they were plain text.
+
+A file's codec is taken from its extension, `.gz` or `.xz`, or else from its first bytes, so compressed files without the
+extension are read too. Files are decompressed as they are read and compressed as they are written, without a temporary copy.
+
+The output of an input file is written with the input's codec, under the same name. A run can instead compress all output
+with one codec, or none, with `compress`; the extension of the output names is changed to match.
+"""
+import gzip
+import lzma
+
+
+
+
+CODECS = {
+    "gz": gzip.open,
+    "xz": lzma.open,
+}
+EXTENSIONS = {"." + codec: codec for codec in CODECS}
+_MAGIC = {
+    b"\x1f\x8b": "gz",
+    b"\xfd7zXZ\x00": "xz",
+}
+
+
+
+
+def codec_from_name(path):
+    """
+    Return the codec given by a file name's extension, "gz" or "xz", or None.
+
+    Args:
+    - path: path to the file
+    """
+    for ext, codec in EXTENSIONS.items():
+        if path.endswith(ext):
+            return codec
+    return None
+
+
+
+
+def detect_codec(path):
+    """
+    Return the codec of an existing file, "gz" or "xz", from its extension or else its first bytes. Returns None for plain files.
+
+    Args:
+    - path: path to the file
+    """
+    codec = codec_from_name(path)
+    if codec is not None:
+        return codec
+    with open(path, 'rb') as f:
+        head = f.read(max(len(magic) for magic in _MAGIC))
+    for magic, codec in _MAGIC.items():
+        if head.startswith(magic):
+            return codec
+    return None
+
+
+
+
+def open_file(path, mode='r', codec=None, encoding=None):
+    """
+    Open a file in text mode, decompressing or compressing it with its codec. Takes the same modes as `open`.
+
+    Args:
+    - path: path to the file
+    - mode: "r", "w" or "a", as for `open`
+    - codec: "gz", "xz" or None for a plain file. When reading, the codec is detected if None.
+    - encoding: the text encoding, as for `open`
+    """
+    if codec is None and 'r' in mode:
+        codec = detect_codec(path)
+    if codec is None:
+        return open(path, mode, encoding=encoding)
+    # the compressed file objects can't be opened for both reading and writing
+    return CODECS[codec](path, mode.replace('+', '').replace('t', '') + 't', encoding=encoding)
+
+
+
+
+def with_codec(name, codec):
+    """
+    Return a file name with its compression extension changed to the codec's.
+
+    Args:
+    - name: the file name
+    - codec: "gz", "xz" or "none" for no extension
+    """
+    if codec_from_name(name) is not None:
+        name = name[:name.rfind('.')]
+    return name if codec == "none" else f"{name}.{codec}"
+
+
+
+
+def output_codec(_file):
+    """
+    Return the codec to write an input file's output with: the run's `compress` option if the file has one, otherwise the input's own codec.
+
+    Args:
+    - _file: path to an input file, see `swedish_dehyphenator.discovery.InputFile`
+    """
+    compress = getattr(_file, "compress", None)
+    if compress is None:
+        return detect_codec(_file)
+    return None if compress == "none" else compress
@@ -33,6 +33,8 @@ def _fetch_defaults():
             "wf_path": "~/.config/swedish_dehyphenator/wf.json",
             "autojoined_path": "~/.config/swedish_dehyphenator/autojoined.pickle",
             "selected_path": "~/.config/swedish_dehyphenator/selected.pickle",
+            "store_path": "~/.config/swedish_dehyphenator/decisions.sqlite",
+            "lexicon_path": "~/.config/swedish_dehyphenator/wf.lex",
         }
 
 
@@ -48,6 +50,8 @@ def init(args):
         - wf_path: path to word frequency json file. default `~/.config/swedish_dehyphenator/wf.json`
         - autojoined_path: path to previoiusly autojoined words. default `~/.config/swedish_dehyphenator/autojoined.pickle`
         - selected_path: path to previously selected corrections. default `~/.config/swedish_dehyphenator/autojoined.pickle`
+        - store_path: path to the decision store database. default `~/.config/swedish_dehyphenator/decisions.sqlite`
+        - lexicon_path: path to the compact word frequency lexicon. default `~/.config/swedish_dehyphenator/wf.lex`
     """
     to_write = _fetch_defaults()
     for k, v in args.items():
@@ -77,6 +81,8 @@ def show_opts(args):
         - wf_path: path to word frequency json file. default `~/.config/swedish_dehyphenator/wf.json`
         - autojoined_path: path to previoiusly autojoined words. default `~/.config/swedish_dehyphenator/autojoined.pickle`
         - selected_path: path to previously selected corrections. default `~/.config/swedish_dehyphenator/autojoined.pickle`
+        - store_path: path to the decision store database. default `~/.config/swedish_dehyphenator/decisions.sqlite`
+        - lexicon_path: path to the compact word frequency lexicon. default `~/.config/swedish_dehyphenator/wf.lex`
     """
     config, loc = fetch_config()
     print("\nConfig file located at:", loc, "\n")
@@ -98,6 +104,8 @@ def edit(args):
         - wf_path: path to word frequency json file. default `~/.config/swedish_dehyphenator/wf.json`
         - autojoined_path: path to previoiusly autojoined words. default `~/.config/swedish_dehyphenator/autojoined.pickle`
         - selected_path: path to previously selected corrections. default `~/.config/swedish_dehyphenator/autojoined.pickle`
+        - store_path: path to the decision store database. default `~/.config/swedish_dehyphenator/decisions.sqlite`
+        - lexicon_path: path to the compact word frequency lexicon. default `~/.config/swedish_dehyphenator/wf.lex`
     """
     config, _path = fetch_config()
     for k, v in args.items():
@@ -111,18 +119,73 @@ def edit(args):
 
 
 
+def migrate(args):
+    """
+    Import the selected and autojoined pickles into the decision store, and record the store's location in the config.
+
+    Args:
+    - args: dict of values
+        - selected_path: path to previously selected corrections. defaults to the configured value
+        - autojoined_path: path to previoiusly autojoined words. defaults to the configured value
+        - store_path: path to the decision store database. defaults to the configured value
+    """
+    from swedish_dehyphenator.store import DecisionStore
+    config, _path = fetch_config()
+    paths = {}
+    for k in ["selected_path", "autojoined_path", "store_path"]:
+        v = args.get(k) or config.get(k) or _fetch_defaults()[k]
+        paths[k] = os.path.abspath(os.path.expanduser(v))
+    with DecisionStore(paths["store_path"]) as store:
+        n_selected, n_autojoined = store.import_pickles(paths["selected_path"], paths["autojoined_path"])
+        print(f"\nImported {n_selected} selected and {n_autojoined} autojoined entries into {paths['store_path']}")
+        print(f"The store now holds {len(store.selected)} selected and {len(store.autojoined)} autojoined entries\n")
+    config["store_path"] = paths["store_path"]
+    with open(_path, "w+") as c:
+        json.dump(config, c, indent=4, ensure_ascii=False)
+
+
+
+
+def build_lexicon(args):
+    """
+    Build the compact, memory-mapped lexicon from the word frequency json file, and record its location in the config.
+
+    Args:
+    - args: dict of values
+        - wf_path: path to word frequency json file. defaults to the configured value
+        - lexicon_path: where to write the lexicon. defaults to the configured value
+    """
+    from swedish_dehyphenator.lexicon import build_lexicon as _build
+    config, _path = fetch_config()
+    paths = {}
+    for k in ["wf_path", "lexicon_path"]:
+        v = args.get(k) or config.get(k) or _fetch_defaults()[k]
+        paths[k] = os.path.abspath(os.path.expanduser(v))
+    n = _build(paths["wf_path"], paths["lexicon_path"])
+    print(f"\nWrote {n} words from {paths['wf_path']} to {paths['lexicon_path']}\n")
+    config["lexicon_path"] = paths["lexicon_path"]
+    with open(_path, "w+") as c:
+        json.dump(config, c, indent=4, ensure_ascii=False)
+
+
+
+
 #if __name__ == '__main__':
 def cli():
     programs = {
             "init": init,
             "edit": edit,
             "show_opts": show_opts,
+            "migrate": migrate,
+            "build_lexicon": build_lexicon,
         }
     parser = argparse.ArgumentParser(description=__doc__)
-    parser.add_argument("program", choices=["init", "edit", "show_opts"], help="What program do you want to run?")
+    parser.add_argument("program", choices=["init", "edit", "show_opts", "migrate", "build_lexicon"], help="What program do you want to run?")
     parser.add_argument("--config-path", default=None, help="Path to config file")
     parser.add_argument("--wf-path", default=None, help="Path to word frequency json file")
     parser.add_argument("--autojoined-path", default=None, help="Path to autojoined pickle")
     parser.add_argument("--selected-path", default=None, help="Path to selected pickle")
+    parser.add_argument("--store-path", default=None, help="Path to decision store database")
+    parser.add_argument("--lexicon-path", default=None, help="Path to compact word frequency lexicon")
     args = parser.parse_args()
     programs[args.program]({**vars(args)})
@@ -0,0 +1,141 @@
+#!/usr/bin/env python3
+"""
+Find the input files under a directory tree.
+
+Directories are walked lazily with `os.scandir`, in sorted order. Hidden files and directories are skipped, and files can be
+filtered with include and exclude globs, matched against both the file name and the path relative to the input directory.
+Each file keeps its relative path, so the output tree mirrors the input tree.
+
+Compressed files, e.g. `.json.gz`, are listed for their source type too, see `swedish_dehyphenator.compression`.
+
+With a shard "i/N", only the files whose relative path hashes to shard i of N are kept. The hash depends on nothing but the
+relative path, so several machines can split one corpus between them without coordinating.
+"""
+from swedish_dehyphenator.compression import EXTENSIONS, with_codec
+from fnmatch import fnmatch
+import hashlib
+import os
+
+
+
+
+SOURCE_PATTERNS = {
+    source_type: (pattern,) + tuple(pattern + ext for ext in EXTENSIONS)
+    for source_type, pattern in (("anf_dict", "*.json"), ("txt_file", "*.txt"), ("jsonl", "*.jsonl"))
+}
+
+
+
+
+class InputFile(str):
+    """
+    The path to an input file, which also knows its path relative to the input directory.
+
+    Args:
+    - path: path to the file
+    - relpath: path relative to the input directory, with / as separator
+    - compress: the codec to write the file's output with, "gz", "xz" or "none", or None for the input's own codec
+    """
+
+    def __new__(cls, path, relpath, compress=None):
+        _file = super().__new__(cls, path)
+        _file.relpath = relpath
+        _file.compress = compress
+        return _file
+
+
+    def __getnewargs__(self):
+        return str(self), self.relpath, self.compress
+
+
+
+
+def output_name(_file):
+    """
+    Return the name of a file's output, relative to the output path: the relative path of an `InputFile`, otherwise the file name.
+    If the output is compressed with another codec than the input, the extension is changed to match.
+
+    Args:
+    - _file: path to an input file
+    """
+    relpath = getattr(_file, "relpath", None)
+    name = relpath if relpath else _file.split('/')[-1]
+    compress = getattr(_file, "compress", None)
+    return name if compress is None else with_codec(name, compress)
+
+
+
+
+def parse_shard(shard):
+    """
+    Parse a shard given as "i/N", 1 <= i <= N. Returns (i, N).
+
+    Args:
+    - shard: the shard as a string
+    """
+    try:
+        i, n = (int(_) for _ in shard.split('/'))
+    except ValueError:
+        raise ValueError(f"a shard is given as i/N, not {shard!r}")
+    if not 1 <= i <= n:
+        raise ValueError(f"shard {shard!r} is out of range, i must be between 1 and N")
+    return i, n
+
+
+
+
+def shard_of(relpath, n):
+    """
+    Return the shard, 1 to n, that a relative path belongs to.
+
+    Args:
+    - relpath: path relative to the input directory
+    - n: number of shards
+    """
+    digest = hashlib.blake2b(relpath.encode('utf-8'), digest_size=8).digest()
+    return int.from_bytes(digest, "big") % n + 1
+
+
+
+
+def _matches(name, relpath, patterns):
+    return any(fnmatch(name, pattern) or fnmatch(relpath, pattern) for pattern in patterns)
+
+
+
+
+def iter_files(input_path, include=None, exclude=None, shard=None, compress=None):
+    """
+    Yield the input files under a directory, recursively, as `InputFile`s. If input_path is a file, only that file is yielded.
+
+    Args:
+    - input_path: path to a file or a directory
+    - include: globs of files to keep, e.g. ["*.json"]. All files are kept if None.
+    - exclude: globs of files and directories to leave out
+    - shard: (i, N) to keep only the files in shard i of N, see `parse_shard`
+    - compress: the codec to write the outputs with, see `InputFile`
+    """
+    if not os.path.isdir(input_path):
+        yield InputFile(input_path, input_path.split('/')[-1], compress)
+        return
+    exclude = exclude or ()
+
+    def _walk(path, prefix):
+        with os.scandir(path) as it:
+            entries = sorted(it, key=lambda entry: entry.name)
+        for entry in entries:
+            if entry.name.startswith("."):
+                continue
+            relpath = prefix + entry.name
+            if _matches(entry.name, relpath, exclude):
+                continue
+            if entry.is_dir():
+                yield from _walk(entry.path, relpath + "/")
+            elif entry.is_file():
+                if include and not _matches(entry.name, relpath, include):
+                    continue
+                if shard is not None and shard_of(relpath, shard[1]) != shard[0]:
+                    continue
+                yield InputFile(entry.path, relpath, compress)
+
+    yield from _walk(input_path, "")
@@ -0,0 +1,214 @@
+#!/usr/bin/env python3
+"""
+Rewrite a corpus from a frozen table of decisions, without the lexicon, the decision rules or any questions.
+
+Once the decisions for a corpus are settled, `freeze_table` runs the automatic rules over it once and writes every candidate
+they settle, together with the answers from a review queue, to a table of candidate: replacement. `apply_table` then cleans
+and rewrites texts with nothing but the table: candidates are found with the same single regex as in `dehyphenate_text` and
+looked up in the table, so the work per text is one pass over it. Candidates that aren't in the table are left as they are,
+and can be collected in a review queue to decide about later.
+
+The table is a JSON object, so it can be read and edited by hand.
+"""
+from swedish_dehyphenator.compression import open_file, output_codec
+from swedish_dehyphenator.review import merge_queues, queue_candidate, queue_decisions, read_queue, scan_files
+from swedish_dehyphenator.swedish_dehyphenator import (
+    _DASH_RE,
+    _chunksize,
+    _output_file,
+    _read_source,
+    _write_output,
+    clean_anftext,
+)
+from multiprocessing import Pool
+from tqdm import tqdm
+import json
+import os
+
+
+
+
+def load_table(table_path):
+    """
+    Load a frozen table of decisions. Returns a dict of candidate: replacement.
+
+    Args:
+    - table_path: path to the json file
+    """
+    with open(table_path, 'r', encoding='utf-8') as f:
+        return json.load(f)
+
+
+
+
+def save_table(table, table_path):
+    """
+    Write a frozen table of decisions as json.
+
+    Args:
+    - table: dict of candidate: replacement
+    - table_path: where to write the table
+    """
+    tmp_path = f"{table_path}.tmp"
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        json.dump(dict(sorted(table.items())), f, ensure_ascii=False, indent=0)
+    os.replace(tmp_path, table_path)
+
+
+
+
+def freeze_table(_files, source_type, wf, selected, autojoined, queue_path=None, cache=None, workers=1, field=None):
+    """
+    Build a frozen table of decisions for a corpus. Returns (table, queue): the table of candidate: replacement, and the review
+    queue of candidates that neither the rules nor the review queue at queue_path settle.
+
+    Args:
+    - _files: list of input files
+    - source_type: anf_dict, txt_file or jsonl
+    - wf: word frequency dictionary: 'word': freq
+    - selected: previously selected fixes
+    - autojoined: auomatic fixes based on heuristic
+    - queue_path: a review queue with decisions, which take precedence over the rules
+    - cache: a DecisionCache for automatic decisions
+    - workers: number of worker processes
+    - field: for jsonl, the dotted path of the text in each record
+    """
+    table = {}
+    queue = scan_files(_files, source_type, wf, selected, autojoined, cache=cache, workers=workers, field=field, table=table)
+    if queue_path is not None:
+        decisions = queue_decisions(read_queue(queue_path))
+        table.update(decisions)
+        queue = {dash: entry for dash, entry in queue.items() if dash not in decisions}
+    return table, queue
+
+
+
+
+def apply_table(_text, table, unknown=None):
+    """
+    Clean a text and rewrite its candidates from a frozen table. Returns (text, fixes), where fixes is the number of distinct
+    candidates rewritten, counted like in `dehyphenate_text`.
+
+    Args:
+    - _text: a raw string
+    - table: dict of candidate: replacement
+    - unknown: a review queue to add the candidates missing from the table to, updated in place
+    """
+    _text = clean_anftext(_text)
+    fixed = set()
+    missing = {}
+
+    def _replace(m):
+        dash = m.group(0)
+        newdash = table.get(dash)
+        if newdash is None:
+            missing[dash] = missing.get(dash, 0) + 1
+            return dash
+        fixed.add(dash)
+        return newdash
+
+    out = _DASH_RE.sub(_replace, _text)
+    if unknown is not None:
+        for dash, n in missing.items():
+            queue_candidate(unknown, dash, n, _text)
+    return out, len(fixed)
+
+
+
+
+def _apply_file(_file, source_type, table, output_path, field=None, report=False):
+    """
+    Rewrite one input file from a frozen table and write it to the output path. Returns (fixes, unknown queue).
+    """
+    unknown = {} if report else None
+    fixes = 0
+    if source_type == "jsonl":
+        from swedish_dehyphenator.jsonl import DEFAULT_FIELD, read_records, set_field
+        field = field or DEFAULT_FIELD
+        out_file = _output_file(_file, output_path)
+        tmp_file = f"{out_file}.part"
+        try:
+            with open_file(tmp_file, 'w', codec=output_codec(_file), encoding='utf-8') as o:
+                for line, record, _text in read_records(_file, field):
+                    if _text is None:
+                        o.write(line)
+                        continue
+                    _text, n = apply_table(_text, table, unknown)
+                    set_field(record, _text.strip(), field)
+                    o.write(json.dumps(record, ensure_ascii=False) + "\n")
+                    fixes += n
+            os.replace(tmp_file, out_file)
+        except BaseException:
+            if os.path.exists(tmp_file):
+                os.remove(tmp_file)
+            raise
+    else:
+        document, _text = _read_source(_file, source_type)
+        _text, fixes = apply_table(_text, table, unknown)
+        _write_output(_file, source_type, output_path, document, _text)
+    return fixes, unknown
+
+
+
+
+# Per-process state, set up once by `_init_applier`
+_applier = {}
+
+
+
+
+def _init_applier(source_type, table, output_path, field, report):
+    _applier.update({
+        "source_type": source_type,
+        "table": table,
+        "output_path": output_path,
+        "field": field,
+        "report": report,
+    })
+
+
+
+
+def _apply_one(_file):
+    a = _applier
+    return _apply_file(_file, a["source_type"], a["table"], a["output_path"], field=a["field"], report=a["report"])
+
+
+
+
+def apply_files(_files, source_type, table, output_path, field=None, workers=1, report=False):
+    """
+    Rewrite files from a frozen table and write them to the output path. Returns (number of files, number of fixes, unknown), where
+    unknown is the review queue of candidates missing from the table, or None if report is False.
+
+    Args:
+    - _files: list of input files
+    - source_type: anf_dict, txt_file or jsonl
+    - table: dict of candidate: replacement
+    - output_path: where to write output
+    - field: for jsonl, the dotted path of the text in each record
+    - workers: number of worker processes
+    - report: collect the candidates missing from the table
+    """
+    unknown = {} if report else None
+    dcounter = 0
+    progbar = tqdm(total=len(_files), desc="Files", position=0, leave=True)
+    if workers > 1 and len(_files) > 1:
+        chunksize = _chunksize(len(_files), workers)
+        with Pool(workers, initializer=_init_applier, initargs=(source_type, table, output_path, field, report)) as pool:
+            results = pool.imap_unordered(_apply_one, _files, chunksize=chunksize)
+            for fixes, file_unknown in results:
+                dcounter += fixes
+                if report:
+                    merge_queues(unknown, file_unknown)
+                progbar.update(1)
+    else:
+        for _file in _files:
+            fixes, file_unknown = _apply_file(_file, source_type, table, output_path, field=field, report=report)
+            dcounter += fixes
+            if report:
+                merge_queues(unknown, file_unknown)
+            progbar.update(1)
+    progbar.close()
+
+    return len(_files), dcounter, unknown
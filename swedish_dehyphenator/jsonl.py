@@ -0,0 +1,203 @@
+#!/usr/bin/env python3
+"""
+Read and write speeches as JSON Lines, one record per line, so a corpus can live in a few large files instead of one file per speech.
+
+The text to dehyphenate is found in each record by a dotted field path, `anforande.anforandetext` by default, like in the
+anf dict files. Files are streamed record by record in batches (see `_dehyphenate_many`), so each distinct candidate is decided
+once per file and, with more than one worker, records are cleaned and substituted in a process pool. Records are written to the
+output file in their input order; lines that are empty or records without the field are written back unchanged.
+"""
+from swedish_dehyphenator.compression import open_file, output_codec
+from swedish_dehyphenator.swedish_dehyphenator import (
+    _dehyphenate_many,
+    _file_done,
+    _log_results,
+    _output_file,
+    _print,
+)
+from collections import deque
+from tqdm import tqdm
+import json
+import os
+
+
+
+
+DEFAULT_FIELD = "anforande.anforandetext"
+
+
+
+
+def get_field(record, field=DEFAULT_FIELD):
+    """
+    Return the value at a dotted field path in a record, or None if it isn't there.
+
+    Args:
+    - record: a dict
+    - field: dotted path, e.g. "anforande.anforandetext"
+    """
+    for key in field.split('.'):
+        if not isinstance(record, dict):
+            return None
+        record = record.get(key)
+    return record
+
+
+
+
+def set_field(record, value, field=DEFAULT_FIELD):
+    """
+    Set the value at a dotted field path in a record, which must already be there.
+
+    Args:
+    - record: a dict
+    - value: the new value
+    - field: dotted path, e.g. "anforande.anforandetext"
+    """
+    *parents, key = field.split('.')
+    for parent in parents:
+        record = record[parent]
+    record[key] = value
+
+
+
+
+def read_records(_file, field=DEFAULT_FIELD):
+    """
+    Yield (line, record, text) for each line of a JSON Lines file. For empty lines, record is None; text is None for records
+    that have no string at the field path.
+
+    Args:
+    - _file: path to a JSON Lines file
+    - field: dotted path of the text in each record
+    """
+    with open_file(_file, 'r', encoding='utf-8-sig') as f:
+        for n, line in enumerate(f, 1):
+            if not line.strip():
+                yield line, None, None
+                continue
+            try:
+                record = json.loads(line)
+            except ValueError as e:
+                raise ValueError(f"{_file}, line {n}: {e}")
+            text = get_field(record, field)
+            yield line, record, text if isinstance(text, str) else None
+
+
+
+
+def process_jsonl_file(_file, wf_anf, selected, autojoined, output_path, log_results, dcounter, progbar=None, config=None, cache=None, policy="ask", pending=None, decisions=None, metrics=None, field=DEFAULT_FIELD, workers=1, batch_size=1024):
+    """
+    Dehyphenate the text of each record in a JSON Lines file and write the records to the output path. Returns the updated dcounter,
+    or None if the user aborted, in which case nothing is written.
+
+    Args:
+    - _file: input file
+    - wf_anf: word frequency dictionary: 'word': freq
+    - selected: previously selected fixes
+    - autojoined: auomatic fixes based on heuristic
+    - output_path: output path
+    - log_results: to log or not to log
+    - dcounter: couter of hyphenation fixes
+    - progbar: progress bar instance
+    - config: a config dict
+    - cache: a DecisionCache for automatic decisions, shared across files
+    - policy: "ask" or "defer", see `dehyphenate_text`
+    - pending: dict of deferred candidates, see `dehyphenate_text`
+    - decisions: dict of candidate: replacement settled beforehand, see `dehyphenate_text`
+    - metrics: a Metrics instance to count decisions per rule in
+    - field: dotted path of the text in each record
+    - workers: number of worker processes to clean and substitute records in
+    - batch_size: number of records to take at a time
+    """
+    out_file = _output_file(_file, output_path)
+    tmp_file = f"{out_file}.part"
+    # Records waiting for their text to come back, in input order
+    waiting = deque()
+    fed = [0]
+
+    def _texts():
+        for line, record, text in read_records(_file, field):
+            waiting.append((line, record, text))
+            if text is not None:
+                fed[0] += 1
+                yield text
+
+    def _write_waiting(o):
+        # Write the records at the front that have no text to wait for
+        while waiting and waiting[0][2] is None:
+            o.write(waiting.popleft()[0])
+
+    quiet = metrics is not None and metrics.quiet
+    done = 0
+    try:
+        with open_file(tmp_file, 'w', codec=output_codec(_file), encoding='utf-8') as o:
+            for _text, fixes in _dehyphenate_many(_texts(), wf_anf, selected, autojoined, log_results, config=config, cache=cache, policy=policy,
+                                                  pending=pending, decisions=decisions, metrics=metrics, workers=workers, batch_size=batch_size,
+                                                  quiet=quiet, progbar=progbar):
+                _write_waiting(o)
+                _, record, _ = waiting.popleft()
+                set_field(record, _text.strip(), field)
+                o.write(json.dumps(record, ensure_ascii=False) + "\n")
+                dcounter += fixes
+                done += 1
+            _write_waiting(o)
+        if done < fed[0] or waiting:
+            os.remove(tmp_file)
+            return None
+        os.replace(tmp_file, out_file)
+    except BaseException:
+        if os.path.exists(tmp_file):
+            os.remove(tmp_file)
+        raise
+
+    return dcounter
+
+
+
+
+def dehyphenate_jsonl(_files, wf_anf, selected, autojoined, output_path, log_results, dcounter, fcounter, config=None, cache=None, policy="ask", decisions=None, manifest=None, metrics=None, field=DEFAULT_FIELD, workers=1):
+    """
+    Find dashes in the records of JSON Lines files and potentially remove them.
+
+    Args:
+    - _files: list of input files prepared in `dehyphenate_from`
+    - wf_anf: word frequency dictionary: 'word': freq
+    - selected: previously selected fixes
+    - autojoined: auomatic fixes based on heuristic
+    - output_path: output path
+    - log_results: to log or not to log
+    - dcounter: couter of hyphenation fixes
+    - fcounter: file process counter
+    - config: a config dict
+    - cache: a DecisionCache for automatic decisions, shared across files
+    - policy: "ask" to ask the user about ambiguous candidates, "defer" to leave them unchanged and report them
+    - decisions: dict of candidate: replacement settled beforehand, see `dehyphenate_text`
+    - manifest: a Manifest to record finished files in, for incremental runs
+    - metrics: a Metrics instance to count decisions and time files in, see `swedish_dehyphenator.metrics`
+    - field: dotted path of the text in each record
+    - workers: number of worker processes to spread the records of each file over
+    """
+    progbar = tqdm(total=len(_files), desc="Files", position=0, leave=True)
+    progbar.update(0)
+    pending = {} if policy == "defer" else None
+    for i, _file in enumerate(_files):
+        file_pending = {} if pending is not None else None
+        mark = metrics.mark() if metrics is not None else None
+        d = process_jsonl_file(_file, wf_anf, selected, autojoined, output_path, log_results, dcounter, progbar=progbar, config=config, cache=cache, policy=policy, pending=file_pending, decisions=decisions, metrics=metrics, field=field, workers=workers)
+        if d is None:
+            _print("Aborted, {} files left unprocessed".format(len(_files) - i), progbar)
+            break
+        if metrics is not None:
+            metrics.file_done(_file, mark, d - dcounter)
+        fcounter += 1
+        dcounter = d
+        _file_done(_file, file_pending, pending, manifest)
+        progbar.update(1)
+    _print("We went through a total of {} dashwords!".format(dcounter), progbar)
+    if pending:
+        _print("{} candidates were left unresolved".format(len(pending)), progbar)
+    if log_results:
+        _log_results(selected, autojoined, config=config)
+
+    return fcounter, dcounter
@@ -0,0 +1,190 @@
+#!/usr/bin/env python3
+"""
+A compact, memory-mapped word frequency lexicon.
+
+The lexicon file holds the words of a `wf.json` word frequency dictionary sorted by their UTF-8 bytes, with an array of offsets and an array of frequencies.
+It is opened with mmap, so opening is near instant and several processes share one copy through the page cache.
+
+Layout (little endian):
+- 8 bytes magic, `SWDHLEX1`
+- uint64 number of words, n
+- n+1 uint64 offsets into the word blob
+- n float64 frequencies
+- the word blob
+"""
+from array import array
+import json
+import mmap
+import os
+import pickle
+import struct
+import sys
+
+
+
+
+MAGIC = b"SWDHLEX1"
+_HEADER = struct.Struct("<8sQ")
+
+
+
+
+def build_lexicon(wf, lexicon_path):
+    """
+    Build a lexicon file from a word frequency dictionary. Returns the number of words written.
+
+    Args:
+    - wf: a word frequency dict ('word': freq), or the path to a json file holding one
+    - lexicon_path: where to write the lexicon
+    """
+    if isinstance(wf, str):
+        with open(wf, 'r') as f:
+            wf = json.load(f)
+    entries = sorted((word.encode('utf-8'), freq) for word, freq in wf.items())
+    offsets = array('Q', [0])
+    freqs = array('d')
+    for word, freq in entries:
+        offsets.append(offsets[-1] + len(word))
+        freqs.append(freq)
+    if sys.byteorder != 'little':
+        offsets.byteswap()
+        freqs.byteswap()
+    if os.path.dirname(lexicon_path):
+        os.makedirs(os.path.dirname(lexicon_path), exist_ok=True)
+    tmp_path = f"{lexicon_path}.tmp"
+    with open(tmp_path, 'wb') as f:
+        f.write(_HEADER.pack(MAGIC, len(entries)))
+        offsets.tofile(f)
+        freqs.tofile(f)
+        for word, _ in entries:
+            f.write(word)
+    os.replace(tmp_path, lexicon_path)
+
+    return len(entries)
+
+
+
+
+class Lexicon:
+    """
+    Read-only, memory-mapped word frequency lexicon. Supports `word in lexicon`, `lexicon[word]` and `lexicon.get(word)`, like the word frequency dict it was built from.
+
+    Args:
+    - lexicon_path: path to a file written by `build_lexicon`
+    """
+
+    def __init__(self, lexicon_path):
+        self.path = lexicon_path
+        with open(lexicon_path, 'rb') as f:
+            self._mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        magic, n = _HEADER.unpack_from(self._mm, 0)
+        if magic != MAGIC:
+            self._mm.close()
+            raise ValueError(f"{lexicon_path} is not a swedish_dehyphenator lexicon")
+        self._n = n
+        self._view = memoryview(self._mm)
+        start = _HEADER.size
+        self._offsets = self._view[start:start + 8 * (n + 1)].cast('Q')
+        start += 8 * (n + 1)
+        self._freqs = self._view[start:start + 8 * n].cast('d')
+        self._blob = start + 8 * n
+        if sys.byteorder != 'little':
+            self._offsets = array('Q', self._offsets)
+            self._offsets.byteswap()
+            self._freqs = array('d', self._freqs)
+            self._freqs.byteswap()
+
+
+    def _word(self, i):
+        return self._mm[self._blob + self._offsets[i]:self._blob + self._offsets[i + 1]]
+
+
+    def _find(self, word):
+        key = word.encode('utf-8')
+        lo, hi = 0, self._n
+        while lo < hi:
+            mid = (lo + hi) // 2
+            if self._word(mid) < key:
+                lo = mid + 1
+            else:
+                hi = mid
+        if lo < self._n and self._word(lo) == key:
+            return lo
+        return -1
+
+
+    def get(self, word, default=None):
+        """
+        Return the frequency of word, or default if it isn't in the lexicon.
+
+        Args:
+        - word: the word to look up
+        - default: value to return for unknown words
+        """
+        i = self._find(word)
+        if i < 0:
+            return default
+        return self._freqs[i]
+
+
+    def __getitem__(self, word):
+        i = self._find(word)
+        if i < 0:
+            raise KeyError(word)
+        return self._freqs[i]
+
+
+    def __contains__(self, word):
+        return self._find(word) >= 0
+
+
+    def __len__(self):
+        return self._n
+
+
+    def __iter__(self):
+        for i in range(self._n):
+            yield self._word(i).decode('utf-8')
+
+
+    def __reduce__(self):
+        # Pickle by path, so a lexicon can be handed to worker processes without copying it
+        return (Lexicon, (self.path,))
+
+
+    def close(self):
+        """
+        Release the memory map.
+        """
+        for view in (self._offsets, self._freqs, self._view):
+            if isinstance(view, memoryview):
+                view.release()
+        self._mm.close()
+
+
+
+
+def load_wf(wf_path):
+    """
+    Load a word frequency lexicon from a lexicon file, a json file or a pickle, whichever wf_path holds. Returns None if it can't be read.
+
+    Args:
+    - wf_path: path to the word frequency file
+    """
+    try:
+        with open(wf_path, 'rb') as f:
+            head = f.read(len(MAGIC))
+    except (OSError, TypeError):
+        return None
+    if head == MAGIC:
+        return Lexicon(wf_path)
+    try:
+        with open(wf_path, 'r') as f:
+            return json.load(f)
+    except ValueError:
+        pass
+    try:
+        with open(wf_path, 'rb') as f:
+            return pickle.load(f)
+    except Exception:
+        return None
@@ -0,0 +1,152 @@
+#!/usr/bin/env python3
+"""
+A manifest of processed files, kept in the output directory, for incremental and resumable runs.
+
+Each line of the manifest is a JSON record of one processed input file: its content hash, size and modification time,
+the decision version the run started with and its status. Records are appended as files finish, so an interrupted run
+loses nothing, and the last record for a file wins. Records can be added from several threads.
+"""
+import hashlib
+import json
+import os
+import threading
+
+
+
+
+MANIFEST_NAME = ".swe-dehyph-manifest.jsonl"
+
+
+
+
+def file_digest(path, block_size=1 << 20):
+    """
+    Return the hex blake2b digest of a file's contents.
+
+    Args:
+    - path: path to the file
+    - block_size: bytes to read at a time
+    """
+    h = hashlib.blake2b(digest_size=16)
+    with open(path, 'rb') as f:
+        for block in iter(lambda: f.read(block_size), b''):
+            h.update(block)
+    return h.hexdigest()
+
+
+
+
+def decision_version(selected, autojoined):
+    """
+    Return a version string for the current decisions: a digest of the unique words, so duplicates in older decision files
+    don't change it.
+
+    Args:
+    - selected: previously selected fixes
+    - autojoined: auomatic fixes based on heuristic
+    """
+    h = hashlib.blake2b(digest_size=16)
+    for words in (selected, autojoined):
+        for word in sorted(set(words)):
+            h.update(word.encode("utf-8"))
+            h.update(b"\n")
+        h.update(b"\0")
+    return h.hexdigest()
+
+
+
+
+class Manifest:
+    """
+    Manifest of the files processed into an output directory.
+
+    Args:
+    - output_path: the output directory
+    - version: the decision version of the current run, see `decision_version`
+    - recheck_decisions: also redo files that were processed with a different decision version
+    - suffix: added to a key to get the name of the output that must still exist, e.g. for patch sidecars
+    """
+
+    def __init__(self, output_path, version=None, recheck_decisions=False, suffix=""):
+        self.path = os.path.join(output_path, MANIFEST_NAME)
+        self.version = version
+        self.recheck_decisions = recheck_decisions
+        self.suffix = suffix
+        self.entries = {}
+        self._current = {}
+        self._lock = threading.Lock()
+        if os.path.isfile(self.path):
+            with open(self.path, 'r', encoding='utf-8') as f:
+                for line in f:
+                    try:
+                        entry = json.loads(line)
+                    except ValueError:
+                        # a line cut short by an interrupted run
+                        continue
+                    self.entries[entry["file"]] = entry
+        os.makedirs(output_path, exist_ok=True)
+        self._out = open(self.path, 'a', encoding='utf-8')
+
+
+    def _stat(self, _file):
+        st = os.stat(_file)
+        return st.st_size, st.st_mtime_ns
+
+
+    def is_done(self, _file, key):
+        """
+        Return True if the file was completed in an earlier run and hasn't changed since.
+        The file's size and mtime are checked first; its contents are only hashed if those changed.
+
+        Args:
+        - _file: path to the input file
+        - key: the file's key in the manifest, normally its output name. The output must still exist.
+        """
+        size, mtime = self._stat(_file)
+        entry = self.entries.get(key)
+        if entry is None or entry.get("status") != "done":
+            return False
+        if self.recheck_decisions and entry.get("version") != self.version:
+            return False
+        if not os.path.exists(os.path.join(os.path.dirname(self.path), key + self.suffix)):
+            return False
+        if entry.get("size") == size and entry.get("mtime") == mtime:
+            return True
+        digest = file_digest(_file)
+        if entry.get("hash") != digest:
+            self._current[_file] = (digest, size, mtime)
+            return False
+        # Touched but unchanged: record the new mtime so the file isn't hashed again next time
+        self._write(dict(entry, size=size, mtime=mtime))
+        return True
+
+
+    def record(self, _file, key, status="done"):
+        """
+        Append a record for a processed file.
+
+        Args:
+        - _file: path to the input file
+        - key: the file's key in the manifest, normally its output name
+        - status: "done", or "deferred" if candidates were left unresolved
+        """
+        with self._lock:
+            digest, size, mtime = self._current.pop(_file, (None, None, None))
+        if digest is None:
+            size, mtime = self._stat(_file)
+            digest = file_digest(_file)
+        self._write({"file": key, "hash": digest, "size": size, "mtime": mtime, "version": self.version, "status": status})
+
+
+    def _write(self, entry):
+        with self._lock:
+            self.entries[entry["file"]] = entry
+            self._out.write(json.dumps(entry, ensure_ascii=False) + "\n")
+            self._out.flush()
+
+
+    def close(self):
+        """
+        Close the manifest file.
+        """
+        self._out.close()
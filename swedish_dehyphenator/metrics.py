@@ -0,0 +1,98 @@
+#!/usr/bin/env python3
+"""
+Counters and timers for a run, as an alternative to reading per-candidate messages.
+
+A `Metrics` instance counts decisions per rule, times the stages of `dehyphenate_text` and records how long each file took.
+In quiet mode the per-candidate messages are left out altogether. The report can be written as one JSON document, or as
+JSON Lines with one line per file followed by a summary line.
+"""
+from collections import Counter
+import json
+import time
+
+
+
+
+STAGES = ("clean", "candidates", "decision", "substitution")
+
+
+
+
+class Metrics:
+    """
+    Decision counts per rule, time per stage and per-file timings for a run.
+
+    Args:
+    - quiet: leave out the per-candidate messages
+    """
+
+    def __init__(self, quiet=False):
+        self.quiet = quiet
+        self.rules = Counter()
+        self.stages = dict.fromkeys(STAGES, 0.0)
+        self.chars = 0
+        self.files = []
+        self.started = time.perf_counter()
+
+
+    def mark(self):
+        """
+        Return a mark to pass to `file_done` once a file is processed.
+        """
+        return time.perf_counter(), self.chars
+
+
+    def file_done(self, _file, mark, dashwords):
+        """
+        Record the time and number of characters since a mark for a file.
+
+        Args:
+        - _file: the input file
+        - mark: the value `mark` returned before the file was processed
+        - dashwords: number of hyphenation fixes in the file
+        """
+        started, chars = mark
+        self.files.append({"file": _file, "seconds": time.perf_counter() - started, "chars": self.chars - chars, "dashwords": dashwords})
+
+
+    def merge(self, other):
+        """
+        Add the counts and timings of another Metrics instance, e.g. from a worker process.
+
+        Args:
+        - other: a Metrics instance
+        """
+        self.rules.update(other.rules)
+        for stage, seconds in other.stages.items():
+            self.stages[stage] = self.stages.get(stage, 0.0) + seconds
+        self.chars += other.chars
+        self.files.extend(other.files)
+
+
+    def summary(self):
+        """
+        Return the totals as a dict.
+        """
+        return {
+            "seconds": time.perf_counter() - self.started,
+            "files": len(self.files),
+            "chars": self.chars,
+            "rules": dict(self.rules),
+            "stage_seconds": dict(self.stages),
+        }
+
+
+    def write(self, path):
+        """
+        Write the report. Paths ending in .jsonl get one line per file followed by a summary line, others a single JSON document.
+
+        Args:
+        - path: where to write the report
+        """
+        with open(path, 'w', encoding='utf-8') as f:
+            if path.endswith(".jsonl"):
+                for entry in self.files:
+                    f.write(json.dumps(dict(entry, type="file"), ensure_ascii=False) + "\n")
+                f.write(json.dumps(dict(self.summary(), type="summary"), ensure_ascii=False) + "\n")
+            else:
+                json.dump(dict(self.summary(), file_timings=self.files), f, ensure_ascii=False, indent=2)
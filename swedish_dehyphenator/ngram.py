@@ -0,0 +1,324 @@
+#!/usr/bin/env python3
+"""
+An optional statistical resolver for the candidates that the decision chain leaves to the user.
+
+When neither the joined nor the dashed form of a candidate is in the word frequency lexicon, or both are equally frequent,
+the rules can't decide it. `NgramModel` scores such candidates instead, with the probability that the candidate should be
+joined rather than dashed. The model is trained from the lexicon alone:
+
+- character trigram statistics tell how word-like the joined form is across the line break, and how the dashed form
+  compares with the hyphenated words in the lexicon
+- compound-split statistics tell whether each half is a word of its own, and whether the first half ends and the second
+  half starts like words do
+
+Training is self-supervised: the hyphenated words in the lexicon, split at the hyphen, are examples of candidates to dash,
+and the other words, split at a random position, are examples of line-break hyphenations to join. A logistic regression
+is fitted to both.
+
+Words are encoded as arrays of code points and n-grams are hashed into fixed-size count tables, so training and scoring
+work on batches of words at a time with NumPy. NumPy is only needed for this module: `pip install numpy`.
+"""
+from swedish_dehyphenator.swedish_dehyphenator import _apply_choice, _batches
+import os
+import re
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+
+
+
+# Markers for the start and end of a word, which never occur in candidates
+_START, _END = "\x02", "\x03"
+_WORD_RE = re.compile(r"[^\W\d_]+(?:-[^\W\d_]+)?")
+_PRIME = 1000003
+_MIX = 0x9E3779B97F4A7C15
+FEATURES = ("join_junction", "dash_junction", "join_word", "pre_end", "post_start", "pre_known", "post_known")
+
+
+
+
+def _require_numpy():
+    if np is None:
+        raise ImportError("the n-gram resolver needs NumPy, install it with `pip install numpy`")
+
+
+
+
+def _encode(words, width):
+    """
+    Encode strings as a matrix of code points, one row per string, padded with zeros and cut at width.
+    """
+    buf = "".join(w[:width].ljust(width, "\0") for w in words).encode("utf-32-le")
+    return np.frombuffer(buf, dtype=np.uint32).reshape(len(words), width).astype(np.uint64)
+
+
+
+
+def _hash(h, bits):
+    return ((h * np.uint64(_MIX)) >> np.uint64(64 - bits)).astype(np.int64)
+
+
+
+
+def _gram_hashes(codes, n, bits):
+    """
+    Hash the n-grams starting at each position of each row. Returns (hashes, valid), where valid marks n-grams without padding.
+    """
+    width = codes.shape[1] - n + 1
+    h = np.zeros((codes.shape[0], width), dtype=np.uint64)
+    for k in range(n):
+        h = h * np.uint64(_PRIME) + codes[:, k:k + width]
+    return _hash(h, bits), codes[:, n - 1:n - 1 + width] != 0
+
+
+
+
+def _word_hashes(codes, bits):
+    """
+    Hash whole rows, independently of the padding.
+    """
+    powers = np.cumprod(np.full(codes.shape[1], _PRIME, dtype=np.uint64), dtype=np.uint64)
+    return _hash((codes * powers).sum(axis=1, dtype=np.uint64), bits)
+
+
+
+
+class NgramModel:
+    """
+    A logistic regression over character n-gram and compound-split features, see the module docstring. Use `train_model` to
+    build one from a lexicon and `load` to read one written with `save`.
+
+    Args:
+    - trigram_bits: size of the hashed trigram table, as a power of two
+    - bigram_bits: size of the hashed bigram table
+    - word_bits: size of the hashed table of known words
+    - smoothing: added to bigram counts when estimating the probability of the next character
+    """
+
+    def __init__(self, trigram_bits=20, bigram_bits=16, word_bits=22, smoothing=50.0):
+        _require_numpy()
+        self.trigram_bits = trigram_bits
+        self.bigram_bits = bigram_bits
+        self.word_bits = word_bits
+        self.smoothing = smoothing
+        self.trigrams = np.zeros(1 << trigram_bits, dtype=np.float32)
+        self.bigrams = np.zeros(1 << bigram_bits, dtype=np.float32)
+        self.words = np.zeros(1 << word_bits, dtype=np.uint8)
+        self.weights = None
+        self.mean = None
+        self.std = None
+
+
+    def _count(self, words, batch_size=65536):
+        for batch in _batches(words, batch_size):
+            marked = [_START + w + _END for w in batch]
+            codes = _encode(marked, max(len(w) for w in marked))
+            for n, table, bits in ((3, self.trigrams, self.trigram_bits), (2, self.bigrams, self.bigram_bits)):
+                hashes, valid = _gram_hashes(codes, n, bits)
+                table += np.bincount(hashes[valid], minlength=len(table)).astype(np.float32)
+            self.words[_word_hashes(_encode(batch, max(len(w) for w in batch)), self.word_bits)] = 1
+
+
+    def _logp(self, marked, starts, width=64):
+        """
+        Log probability of the trigram starting at each of the given positions of each marked word, given its first two characters.
+        Returns a matrix with a column per position.
+        """
+        codes = _encode(marked, min(width, max(len(w) for w in marked)))
+        starts = np.minimum(starts, codes.shape[1] - 3)
+        h3, _ = _gram_hashes(codes, 3, self.trigram_bits)
+        h2, _ = _gram_hashes(codes, 2, self.bigram_bits)
+        h3 = np.take_along_axis(h3, starts, axis=1)
+        h2 = np.take_along_axis(h2, starts, axis=1)
+        return np.log1p(self.trigrams[h3]) - np.log(self.bigrams[h2] + self.smoothing)
+
+
+    def _known(self, words):
+        return self.words[_word_hashes(_encode(words, max(len(w) for w in words)), self.word_bits)].astype(np.float64)
+
+
+    def features(self, pairs):
+        """
+        Return the feature matrix for a list of (before, after) pairs, the halves of candidates in lower case, one row per pair.
+        See `FEATURES`.
+
+        Args:
+        - pairs: list of (predash, postdash) tuples
+        """
+        pre = [p for p, _ in pairs]
+        post = [q for _, q in pairs]
+        lengths = np.array([len(p) for p in pre])[:, None]
+        # The joined form, with the trigrams ending at the first two characters after the break
+        joined = [_START + p + q + _END for p, q in pairs]
+        join_junction = self._logp(joined, lengths + np.array([-1, 0])).mean(axis=1)
+        # The dashed form, with the trigrams ending at the hyphen and the two characters after it
+        dashed = [_START + p + "-" + q + _END for p, q in pairs]
+        dash_junction = self._logp(dashed, lengths + np.array([-1, 0, 1])).mean(axis=1)
+        # How word-like the joined form is as a whole
+        join_lengths = np.array([len(w) - 2 for w in joined])[:, None]
+        positions = np.arange(16)[None, :]
+        inside = positions < join_lengths
+        join_word = (self._logp(joined, np.minimum(positions, join_lengths - 1)) * inside).sum(axis=1) / inside.sum(axis=1)
+        pre_end = self._logp([_START + p + _END for p in pre], lengths - 1)[:, 0]
+        post_start = self._logp([_START + q + _END for q in post], np.zeros_like(lengths))[:, 0]
+        return np.column_stack([join_junction, dash_junction, join_word, pre_end, post_start, self._known(pre), self._known(post)])
+
+
+    def fit(self, pairs, labels, iterations=25, l2=1e-3):
+        """
+        Fit the logistic regression with Newton's method. Returns the share of the training pairs that are classified right.
+
+        Args:
+        - pairs: list of (predash, postdash) tuples
+        - labels: 1 for pairs to join, 0 for pairs to dash
+        - iterations: number of Newton steps
+        - l2: weight of the L2 penalty
+        """
+        X = np.vstack([self.features(batch) for batch in _batches(pairs, 65536)])
+        y = np.asarray(labels, dtype=np.float64)
+        self.mean = X.mean(axis=0)
+        self.std = X.std(axis=0) + 1e-9
+        X = np.column_stack([(X - self.mean) / self.std, np.ones(len(X))])
+        w = np.zeros(X.shape[1])
+        penalty = l2 * len(X) * np.eye(X.shape[1])
+        for _ in range(iterations):
+            p = 1 / (1 + np.exp(-X @ w))
+            hessian = (X * (p * (1 - p))[:, None]).T @ X + penalty
+            w += np.linalg.solve(hessian, X.T @ (y - p) - penalty @ w)
+        self.weights = w
+        return float(((X @ w > 0) == (y > 0.5)).mean())
+
+
+    def score(self, candidates, batch_size=65536):
+        """
+        Return the probability that each candidate should be joined rather than dashed, as a NumPy array.
+
+        Args:
+        - candidates: list of 'word- anotherword' candidates
+        - batch_size: number of candidates to score at a time
+        """
+        if self.weights is None:
+            raise ValueError("the model hasn't been trained")
+        scores = []
+        for batch in _batches(candidates, batch_size):
+            pairs = [tuple(dash.lower().split('- ')) for dash in batch]
+            X = (self.features(pairs) - self.mean) / self.std
+            scores.append(1 / (1 + np.exp(-(X @ self.weights[:-1] + self.weights[-1]))))
+        return np.concatenate(scores) if scores else np.zeros(0)
+
+
+    def save(self, model_path):
+        """
+        Write the model to a file.
+
+        Args:
+        - model_path: where to write the model, an .npz file
+        """
+        tmp_path = f"{model_path}.tmp"
+        with open(tmp_path, 'wb') as f:
+            np.savez_compressed(f, trigrams=self.trigrams, bigrams=self.bigrams, words=self.words, weights=self.weights,
+                                mean=self.mean, std=self.std, smoothing=self.smoothing)
+        os.replace(tmp_path, model_path)
+
+
+    @classmethod
+    def load(cls, model_path):
+        """
+        Read a model written with `save`.
+
+        Args:
+        - model_path: path to the model file
+        """
+        _require_numpy()
+        with np.load(model_path) as data:
+            model = cls.__new__(cls)
+            for name in ("trigrams", "bigrams", "words", "weights", "mean", "std"):
+                setattr(model, name, data[name])
+            model.smoothing = float(data["smoothing"])
+        model.trigram_bits = len(model.trigrams).bit_length() - 1
+        model.bigram_bits = len(model.bigrams).bit_length() - 1
+        model.word_bits = len(model.words).bit_length() - 1
+        return model
+
+
+
+
+def training_pairs(words, max_examples=100000, seed=0):
+    """
+    Make self-supervised training examples from the words of a lexicon. Returns (pairs, labels): hyphenated words split at
+    the hyphen, labelled 0, and as many other words split at a random position, labelled 1.
+
+    Args:
+    - words: iterable of words
+    - max_examples: the largest number of examples of each kind
+    - seed: seed for the random choices
+    """
+    _require_numpy()
+    rng = np.random.default_rng(seed)
+    dashed, plain = [], []
+    for word in words:
+        if not _WORD_RE.fullmatch(word):
+            continue
+        if '-' in word:
+            pre, post = word.lower().split('-')
+            if len(pre) > 1 and len(post) > 1:
+                dashed.append((pre, post))
+        elif len(word) > 3:
+            plain.append(word.lower())
+    if not dashed or not plain:
+        raise ValueError("the lexicon needs both hyphenated and other words to learn from")
+    n = min(len(dashed), len(plain), max_examples)
+    dashed = [dashed[i] for i in rng.choice(len(dashed), n, replace=False)]
+    plain = [plain[i] for i in rng.choice(len(plain), n, replace=False)]
+    cuts = rng.integers(2, [len(w) - 1 for w in plain])
+    joined = [(w[:i], w[i:]) for w, i in zip(plain, cuts)]
+    return dashed + joined, [0] * n + [1] * n
+
+
+
+
+def train_model(wf, max_examples=100000, seed=0, **options):
+    """
+    Train an `NgramModel` from a word frequency lexicon. Returns (model, accuracy), the share of the training examples it classifies right.
+
+    Args:
+    - wf: word frequency dictionary: 'word': freq, or a `Lexicon`
+    - max_examples: the largest number of examples of each kind, see `training_pairs`
+    - seed: seed for the random choices
+    - options: table sizes for `NgramModel`
+    """
+    model = NgramModel(**options)
+    words = list(wf)
+    model._count([w.lower() for w in words])
+    pairs, labels = training_pairs(words, max_examples=max_examples, seed=seed)
+    accuracy = model.fit(pairs, labels)
+    return model, accuracy
+
+
+
+
+def resolve_queue(queue, model, threshold=0.9):
+    """
+    Decide the undecided candidates in a review queue that the model is confident about, in one batch. Each decided entry gets
+    the model's confidence; the rest are left for `review_queue`. Returns the number of candidates decided.
+
+    Args:
+    - queue: dict of candidate: queue entry, updated in place, see `swedish_dehyphenator.review`
+    - model: an `NgramModel`
+    - threshold: the confidence, between 0.5 and 1, a decision needs
+    """
+    todo = [entry for entry in queue.values() if entry.get("decision") is None]
+    decided = 0
+    for entry, p in zip(todo, model.score([entry["candidate"] for entry in todo])):
+        confidence = max(p, 1 - p)
+        if confidence < threshold:
+            continue
+        dash = entry["candidate"]
+        predash, postdash = dash.split('- ')
+        entry["decision"] = "j" if p >= 0.5 else "d"
+        entry["replacement"] = _apply_choice(entry["decision"], dash, predash + postdash, predash + '-' + postdash)
+        entry["confidence"] = round(float(confidence), 3)
+        decided += 1
+    return decided
@@ -0,0 +1,210 @@
+#!/usr/bin/env python3
+"""
+Spread file processing over a pool of worker processes.
+
+Each worker loads the lexicon and decisions once and processes whole files. Candidates that need a human decision are deferred
+instead of blocking the worker; once the pool is done, the user is asked about each of them once and the answers are applied to
+the output files that contain them.
+"""
+from swedish_dehyphenator.compression import open_file, output_codec
+from swedish_dehyphenator.discovery import output_name
+from swedish_dehyphenator.metrics import Metrics
+from swedish_dehyphenator.recording import RecordingCache, RecordingSet, Silent
+from swedish_dehyphenator.store import DecisionStore, DecisionTable
+from swedish_dehyphenator.swedish_dehyphenator import (
+    _chunksize,
+    _log_results,
+    _print,
+    parsejson,
+    process_anf_dict,
+    process_txt_file,
+    resolve_candidate,
+    savejson,
+    substitute_candidates,
+)
+from multiprocessing import Pool
+from tqdm import tqdm
+
+
+
+
+_PROCESSORS = {
+    "anf_dict": process_anf_dict,
+    "txt_file": process_txt_file,
+}
+# Per-process state, set up once by `_init_worker`
+_worker = {}
+
+
+
+
+def _init_worker(source_type, wf_anf, selected, autojoined, store_path, output_path, log_results, cache_size, config, decisions, collect_metrics, extra):
+    if store_path is not None:
+        store = DecisionStore(store_path, batch_size=256 if log_results else None)
+        selected, autojoined = store.selected, store.autojoined
+    else:
+        store = None
+        selected, autojoined = RecordingSet(selected), RecordingSet(autojoined)
+    _worker.update({
+        "process": _PROCESSORS[source_type],
+        "wf_anf": wf_anf,
+        "selected": selected,
+        "autojoined": autojoined,
+        "store": store,
+        "output_path": output_path,
+        "log_results": log_results,
+        "cache": RecordingCache(maxsize=cache_size),
+        "config": config,
+        "decisions": decisions,
+        "collect_metrics": collect_metrics,
+        "extra": extra,
+    })
+
+
+
+
+def _work(_file):
+    w = _worker
+    pending = {}
+    metrics = Metrics(quiet=True) if w["collect_metrics"] else None
+    mark = metrics.mark() if metrics is not None else None
+    dcounter = w["process"](_file, w["wf_anf"], w["selected"], w["autojoined"], w["output_path"], w["log_results"], 0,
+                            progbar=Silent(), config=w["config"], cache=w["cache"], policy="defer", pending=pending, decisions=w["decisions"], metrics=metrics, **w["extra"])
+    if metrics is not None:
+        metrics.file_done(_file, mark, dcounter)
+    if w["store"] is not None:
+        if w["log_results"]:
+            w["store"].flush()
+        new_selected, new_autojoined = [], []
+    else:
+        new_selected, new_autojoined = w["selected"].take(), w["autojoined"].take()
+
+    return _file, dcounter, new_selected, new_autojoined, pending, metrics, w["cache"].take()
+
+
+
+
+def _apply_to_output(source_type, _file, output_path, replacements, patches=False):
+    """
+    Rewrite deferred candidates in an output file that has already been written, or add their edits to its patch sidecar.
+    """
+    if patches:
+        from swedish_dehyphenator.patches import add_patches
+        add_patches(_file, source_type, output_path, replacements)
+        return
+    out_file = f"{output_path}{output_name(_file)}"
+    codec = output_codec(_file)
+    if source_type == "anf_dict":
+        anfdict = parsejson(out_file)
+        anfdict['anforande']['anforandetext'] = substitute_candidates(anfdict['anforande']['anforandetext'], replacements)
+        savejson(output_name(_file), output_path, anfdict, codec=codec)
+    else:
+        with open_file(out_file, 'r', codec=codec) as f:
+            _text = f.read()
+        with open_file(out_file, 'w+', codec=codec) as o:
+            o.write(substitute_candidates(_text, replacements))
+
+
+
+
+def dehyphenate_parallel(_files, source_type, wf_anf, selected, autojoined, output_path, log_results, dcounter, fcounter, workers, config=None, cache=None, policy="ask", decisions=None, manifest=None, metrics=None, **extra):
+    """
+    Find dashes in files of one source type using a pool of worker processes.
+
+    Workers share decisions through the decision store if one is used; otherwise their new decisions are merged into `selected` and
+    `autojoined` as files finish. Ambiguous candidates are collected from all workers and asked about once each at the end, most
+    frequent first.
+
+    Returns (fcounter, dcounter). Unlike a serial run, every file has already been written when the user is asked, so an abort
+    doesn't return None or leave files unprocessed: the decisions made before it are saved and applied, and the candidates left
+    undecided stay as they are in the output. Those files aren't recorded in the manifest, so an incremental run does them again.
+
+    Args:
+    - _files: list of input files prepared in `dehyphenate_from`
+    - source_type: anf_dict or txt_file
+    - wf_anf: word frequency dictionary: 'word': freq
+    - selected: previously selected fixes
+    - autojoined: auomatic fixes based on heuristic
+    - output_path: output path
+    - log_results: to log or not to log
+    - dcounter: couter of hyphenation fixes
+    - fcounter: file process counter
+    - workers: number of worker processes
+    - config: a config dict
+    - cache: a DecisionCache for the final review; its size is also used for each worker's own cache. The workers' entries and
+      statistics are merged into it as files finish.
+    - policy: "ask" to ask about ambiguous candidates at the end, "defer" to leave them unchanged and report them
+    - decisions: dict of candidate: replacement settled beforehand, see `dehyphenate_text`
+    - manifest: a Manifest to record finished files in, for incremental runs. Files with candidates that were asked about are recorded
+      once all of those are decided.
+    - metrics: a Metrics instance, see `swedish_dehyphenator.metrics`. Workers collect their own and they are merged as files finish.
+    - extra: options for the source type's file processor, e.g. chunk_size for txt_file
+    """
+    if isinstance(selected, DecisionTable):
+        selected.store.flush()
+        store_path = selected.store.path
+        snapshot = (None, None)
+        seen_selected = seen_autojoined = None
+    else:
+        store_path = None
+        snapshot = (list(selected), list(autojoined))
+        seen_selected, seen_autojoined = set(selected), set(autojoined)
+    cache_size = cache.maxsize if cache is not None else 0
+    chunksize = _chunksize(len(_files), workers)
+
+    pending = {}
+    pending_files = {}
+    progbar = tqdm(total=len(_files), desc="Files", position=0, leave=True)
+    progbar.update(0)
+    initargs = (source_type, wf_anf, *snapshot, store_path, output_path, log_results, cache_size, config, decisions, metrics is not None, extra)
+    with Pool(workers, initializer=_init_worker, initargs=initargs) as pool:
+        for _file, d, new_selected, new_autojoined, file_pending, file_metrics, file_cache in pool.imap_unordered(_work, _files, chunksize=chunksize):
+            fcounter += 1
+            dcounter += d
+            if cache is not None:
+                cache.merge(*file_cache)
+            if metrics is not None:
+                metrics.merge(file_metrics)
+            for seen, merged, added in ((seen_selected, selected, new_selected), (seen_autojoined, autojoined, new_autojoined)):
+                for word in added:
+                    if word not in seen:
+                        seen.add(word)
+                        merged.append(word)
+            if file_pending:
+                pending_files[_file] = list(file_pending)
+                for dash, n in file_pending.items():
+                    pending[dash] = pending.get(dash, 0) + n
+            elif manifest is not None:
+                manifest.record(_file, output_name(_file))
+            progbar.update(1)
+
+    if pending and policy == "defer":
+        _print("{} candidates in {} files were left unresolved".format(len(pending), len(pending_files)), progbar)
+        if manifest is not None:
+            for _file in pending_files:
+                manifest.record(_file, output_name(_file), status="deferred")
+    elif pending:
+        _print("{} candidates in {} files need a decision".format(len(pending), len(pending_files)), progbar)
+        decided = {}
+        for dash in sorted(pending, key=lambda dash: -pending[dash]):
+            resolved = resolve_candidate(dash, wf_anf, selected, autojoined, log_results, progbar=progbar, config=config, cache=cache, quiet=metrics is not None and metrics.quiet)
+            if resolved is None:
+                _print("Aborted, {} candidates left undecided".format(len(pending) - len(decided)), progbar)
+                break
+            newdash, rule = resolved
+            if metrics is not None:
+                metrics.rules[rule] += 1
+            decided[dash] = newdash
+        for _file, dashes in pending_files.items():
+            replacements = {dash: decided[dash] for dash in dashes if dash in decided}
+            if replacements:
+                _apply_to_output(source_type, _file, output_path, replacements, patches=extra.get("patches", False))
+                dcounter += len(replacements)
+            # Files with candidates left undecided by an abort aren't recorded, so an incremental run does them again
+            if manifest is not None and len(replacements) == len(dashes):
+                manifest.record(_file, output_name(_file))
+    _print("We went through a total of {} dashwords!".format(dcounter), progbar)
+    if log_results:
+        _log_results(selected, autojoined, config=config)
+
+    return fcounter, dcounter
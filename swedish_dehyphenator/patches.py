@@ -0,0 +1,198 @@
+#!/usr/bin/env python3
+"""
+Write the edits dehyphenation makes as patches, instead of rewriting whole files.
+
+In patch mode, each input file gets a sidecar, `<name>.patch.jsonl` in the output path, named after the input's relative path
+whatever the output is compressed with, with one edit per line:
+
+    {"start": 1042, "end": 1051, "original": "riks- dag", "replacement": "riksdag"}
+
+Offsets are character offsets into the source text (the speech text of an anf dict, the whole of a text file) as it is
+after `clean_anftext`, the text a normal run dehyphenates. Cleaning can't be undone span by span: taking out a line break can
+join stray '<' and '>' into a new tag, so edits to the raw source wouldn't give the same output. `apply_patches` cleans each
+source file and applies its sidecar, checking that each original span is still there, and writes the same output as a normal
+run with the same decisions. Edits are sorted and don't overlap. Files without any edits get an empty sidecar.
+"""
+from swedish_dehyphenator.swedish_dehyphenator import (
+    _DASH_RE,
+    _chunksize,
+    _read_source,
+    _write_output,
+    clean_anftext,
+)
+from functools import partial
+from multiprocessing import Pool
+from tqdm import tqdm
+import json
+import os
+
+
+
+
+PATCH_SUFFIX = ".patch.jsonl"
+
+
+
+
+def patch_name(_file):
+    """
+    Return the name of a file's patch sidecar, relative to the patch path: the input's relative path or file name with
+    `PATCH_SUFFIX` added. Unlike `output_name`, it doesn't depend on the codec the output is written with.
+
+    Args:
+    - _file: path to an input file
+    """
+    relpath = getattr(_file, "relpath", None)
+    return (relpath if relpath else _file.split('/')[-1]) + PATCH_SUFFIX
+
+
+
+
+def make_patches(_text, replacements):
+    """
+    Return the edits that dehyphenating a source text with the given decisions makes, as a list of dicts with start, end,
+    original and replacement. Candidates that are kept as they are, or missing from replacements, aren't edited.
+
+    Args:
+    - _text: the source text, before `clean_anftext`
+    - replacements: dict of candidate: replacement, e.g. the `resolved` dict filled in by `dehyphenate_text`
+    """
+    if not replacements:
+        return []
+    cleaned = clean_anftext(_text)
+    edits = []
+    for m in _DASH_RE.finditer(cleaned):
+        dash = m.group(0)
+        newdash = replacements.get(dash)
+        if newdash is None or newdash == dash:
+            continue
+        edits.append({"start": m.start(), "end": m.end(), "original": dash, "replacement": newdash})
+    return edits
+
+
+
+
+def apply_edits(_text, edits):
+    """
+    Apply edits to a cleaned source text and return the result. Raises ValueError if an edit's original span isn't in the text.
+
+    Args:
+    - _text: the source text, after `clean_anftext`
+    - edits: list of edits, sorted by start, see `make_patches`
+    """
+    out = []
+    pos = 0
+    for edit in edits:
+        start, end = edit["start"], edit["end"]
+        if start < pos or _text[start:end] != edit["original"]:
+            raise ValueError(f"edit at {start}-{end} doesn't match the source, expected {edit['original']!r}")
+        out.append(_text[pos:start])
+        out.append(edit["replacement"])
+        pos = end
+    out.append(_text[pos:])
+    return "".join(out)
+
+
+
+
+def read_patches(patch_file):
+    """
+    Read the edits in a patch sidecar.
+
+    Args:
+    - patch_file: path to the sidecar
+    """
+    with open(patch_file, 'r', encoding='utf-8') as f:
+        return [json.loads(line) for line in f if line.strip()]
+
+
+
+
+def write_patches(patch_file, edits):
+    """
+    Write edits to a patch sidecar.
+
+    Args:
+    - patch_file: path to the sidecar
+    - edits: list of edits, see `make_patches`
+    """
+    with open(patch_file, 'w', encoding='utf-8') as f:
+        for edit in edits:
+            f.write(json.dumps(edit, ensure_ascii=False) + "\n")
+
+
+
+
+def add_patches(_file, source_type, output_path, replacements):
+    """
+    Add the edits for more decisions to a file's sidecar, e.g. for candidates that were decided after the file was processed.
+    """
+    patch_file = f"{output_path}{patch_name(_file)}"
+    edits = read_patches(patch_file) + make_patches(_read_source(_file, source_type)[1], replacements)
+    write_patches(patch_file, sorted(edits, key=lambda edit: edit["start"]))
+
+
+
+
+def patch_file(_file, source_type, patch_path, output_path):
+    """
+    Clean a source file, apply its sidecar and write the patched file to the output path, as a normal run would. Returns the
+    number of edits, or None if the file has no sidecar.
+
+    Args:
+    - _file: the source file
+    - source_type: anf_dict or txt_file
+    - patch_path: the directory with the sidecars, the output path of the patch mode run
+    - output_path: where to write the patched file
+    """
+    sidecar = os.path.join(patch_path, patch_name(_file))
+    if not os.path.isfile(sidecar):
+        return None
+    edits = read_patches(sidecar)
+    document, _text = _read_source(_file, source_type)
+    try:
+        _text = apply_edits(clean_anftext(_text), edits)
+    except ValueError as e:
+        raise ValueError(f"{_file}: {e}")
+    _write_output(_file, source_type, output_path, document, _text)
+    return len(edits)
+
+
+
+
+def apply_patches(_files, source_type, patch_path, output_path, workers=1):
+    """
+    Apply patch sidecars to source files and write the patched files to the output path. Returns (number of files patched,
+    number of edits, number of files without a sidecar).
+
+    Args:
+    - _files: list of source files
+    - source_type: anf_dict or txt_file
+    - patch_path: the directory with the sidecars
+    - output_path: where to write the patched files
+    - workers: number of worker processes
+    """
+    fcounter = dcounter = missing = 0
+    progbar = tqdm(total=len(_files), desc="Files", position=0, leave=True)
+    work = partial(patch_file, source_type=source_type, patch_path=patch_path, output_path=output_path)
+    if workers > 1 and len(_files) > 1:
+        pool = Pool(workers)
+        results = pool.imap_unordered(work, _files, chunksize=_chunksize(len(_files), workers))
+    else:
+        pool = None
+        results = map(work, _files)
+    try:
+        for n in results:
+            if n is None:
+                missing += 1
+            else:
+                fcounter += 1
+                dcounter += n
+            progbar.update(1)
+    finally:
+        if pool is not None:
+            pool.terminate()
+            pool.join()
+    progbar.close()
+
+    return fcounter, dcounter, missing
@@ -0,0 +1,115 @@
+#!/usr/bin/env python3
+"""
+Overlap file reads and writes with dehyphenation.
+
+Reader threads parse upcoming files into a bounded prefetch window while the main thread dehyphenates the current one, and a
+write-behind thread pool saves finished files. Dehyphenation itself, and any question to the user, stays in the main thread and
+in file order, so the output and the decisions are the same as in the serial loops of `dehyphenate_anf_dict` and
+`dehyphenate_txt_file`.
+"""
+from swedish_dehyphenator.discovery import output_name
+from swedish_dehyphenator.swedish_dehyphenator import (
+    _file_done,
+    _log_results,
+    _print,
+    _read_source,
+    _write_output,
+    _write_patches,
+    dehyphenate_text,
+)
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from tqdm import tqdm
+
+
+
+
+def _write_and_record(_file, source_type, output_path, document, _text, manifest, status, patches=None):
+    if patches is not None:
+        _write_patches(_file, output_path, *patches)
+    else:
+        _write_output(_file, source_type, output_path, document, _text)
+    if manifest is not None:
+        manifest.record(_file, output_name(_file), status=status)
+
+
+
+
+def dehyphenate_pipelined(_files, source_type, wf_anf, selected, autojoined, output_path, log_results, dcounter, fcounter, io_threads, prefetch=None, config=None, cache=None, policy="ask", decisions=None, manifest=None, metrics=None, patches=False):
+    """
+    Find dashes in files of one source type, reading and writing files in background threads.
+
+    Args:
+    - _files: list of input files prepared in `dehyphenate_from`
+    - source_type: anf_dict or txt_file
+    - wf_anf: word frequency dictionary: 'word': freq
+    - selected: previously selected fixes
+    - autojoined: auomatic fixes based on heuristic
+    - output_path: output path
+    - log_results: to log or not to log
+    - dcounter: couter of hyphenation fixes
+    - fcounter: file process counter
+    - io_threads: number of reader threads, and of writer threads
+    - prefetch: number of files to read ahead, and to hold for writing, at most. Defaults to twice io_threads.
+    - config: a config dict
+    - cache: a DecisionCache for automatic decisions, shared across files
+    - policy: "ask" to ask the user about ambiguous candidates, "defer" to leave them unchanged and report them
+    - decisions: dict of candidate: replacement settled beforehand, see `dehyphenate_text`
+    - manifest: a Manifest to record finished files in, for incremental runs
+    - metrics: a Metrics instance, see `swedish_dehyphenator.metrics`. File timings cover dehyphenation, not reading and writing.
+    - patches: write patch sidecars instead of dehyphenated files, see `swedish_dehyphenator.patches`
+    """
+    if prefetch is None:
+        prefetch = 2 * io_threads
+    prefetch = max(1, prefetch)
+    progbar = tqdm(total=len(_files), desc="Files", position=0, leave=True)
+    progbar.update(0)
+    pending = {} if policy == "defer" else None
+    files = iter(_files)
+    reads = deque()
+    writes = deque()
+    with ThreadPoolExecutor(io_threads, thread_name_prefix="reader") as readers, \
+         ThreadPoolExecutor(io_threads, thread_name_prefix="writer") as writers:
+        def _read_next():
+            _file = next(files, None)
+            if _file is not None:
+                reads.append((_file, readers.submit(_read_source, _file, source_type)))
+
+        for _ in range(prefetch):
+            _read_next()
+        i = 0
+        while reads:
+            _file, read = reads.popleft()
+            _read_next()
+            document, pre_text = read.result()
+            file_pending = {} if pending is not None else None
+            resolved = {} if patches else None
+            mark = metrics.mark() if metrics is not None else None
+            result = dehyphenate_text(pre_text, wf_anf, selected, autojoined, log_results, dcounter, progbar=progbar, config=config, cache=cache, policy=policy, pending=file_pending, decisions=decisions, resolved=resolved, metrics=metrics)
+            if result is None:
+                _print("Aborted, {} files left unprocessed".format(len(_files) - i), progbar)
+                for _, read in reads:
+                    read.cancel()
+                break
+            if metrics is not None:
+                metrics.file_done(_file, mark, result[1] - dcounter)
+            _text, dcounter = result
+            fcounter += 1
+            i += 1
+            _file_done(_file, file_pending, pending, None)
+            status = "deferred" if file_pending else "done"
+            writes.append(writers.submit(_write_and_record, _file, source_type, output_path, document, _text, manifest, status,
+                                         (pre_text, resolved) if patches else None))
+            # Bound the texts waiting to be written, and surface write errors early
+            while len(writes) > prefetch or (writes and writes[0].done()):
+                writes.popleft().result()
+            progbar.update(1)
+        for write in writes:
+            write.result()
+    _print("We went through a total of {} dashwords!".format(dcounter), progbar)
+    if pending:
+        _print("{} candidates were left unresolved".format(len(pending)), progbar)
+    if log_results:
+        _log_results(selected, autojoined, config=config)
+
+    return fcounter, dcounter
@@ -0,0 +1,70 @@
+#!/usr/bin/env python3
+"""
+Stand-ins for the progress bar, the decisions and the decision cache in code that runs away from the terminal, e.g. in
+worker processes or a benchmark. They keep the output quiet and remember what was learned, so it can be reported back.
+"""
+from swedish_dehyphenator.cache import DecisionCache
+
+
+
+
+class Silent:
+    """
+    Stands in for a progress bar, so per-candidate messages aren't written, e.g. interleaved on the terminal by workers.
+    """
+
+    def write(self, s):
+        pass
+
+
+
+
+class RecordingSet(set):
+    """
+    A set of decisions with a list-style append that remembers what was added, so workers can report new decisions back.
+    """
+
+    def __init__(self, words=()):
+        super().__init__(words)
+        self.added = []
+
+
+    def append(self, word):
+        if word not in self:
+            self.add(word)
+            self.added.append(word)
+
+
+    def take(self):
+        """
+        Return the words added since the last call.
+        """
+        added, self.added = self.added, []
+        return added
+
+
+
+
+class RecordingCache(DecisionCache):
+    """
+    A decision cache that remembers what was added, so workers can report new entries and their hits and misses back.
+    """
+
+    def __init__(self, maxsize=65536):
+        super().__init__(maxsize=maxsize)
+        self.added = []
+
+
+    def put(self, key, value):
+        super().put(key, value)
+        if self.maxsize != 0:
+            self.added.append((key, value))
+
+
+    def take(self):
+        """
+        Return the entries added and the hits and misses counted since the last call.
+        """
+        taken = (self.added, self.hits, self.misses)
+        self.added, self.hits, self.misses = [], 0, 0
+        return taken
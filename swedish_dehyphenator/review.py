@@ -0,0 +1,266 @@
+#!/usr/bin/env python3
+"""
+A two-phase, non-interactive workflow: scan, review, apply.
+
+1. `scan_files` runs the automatic rules over a corpus without writing any output, and collects every candidate the rules
+   can't settle into a review queue, with its number of occurrences, the number of files it occurs in and an example context.
+2. `review_queue` asks the user about each queued candidate once, most frequent first. It can be stopped and picked up again.
+   Candidates can be decided in one batch by an n-gram model first, so only the uncertain ones are asked about, see
+   `swedish_dehyphenator.ngram`.
+3. The apply phase is a normal run with the "defer" policy and the reviewed decisions (see `queue_decisions`), so it never
+   waits for input.
+
+The queue is a JSON Lines file with one candidate per line.
+"""
+from swedish_dehyphenator.recording import RecordingSet, Silent
+from swedish_dehyphenator.swedish_dehyphenator import (
+    _apply_choice,
+    _chunksize,
+    _print,
+    _read_texts,
+    ask_user,
+    clean_anftext,
+    find_candidates,
+    resolve_candidate,
+)
+from swedish_dehyphenator.cache import DecisionCache
+from swedish_dehyphenator.store import DecisionTable
+from collections import Counter
+from multiprocessing import Pool
+from tqdm import tqdm
+import json
+import os
+
+
+
+
+def scan_text(_text, wf, selected, autojoined, queue, cache=None, context=60, table=None):
+    """
+    Add the candidates in a text that the automatic rules can't settle to a review queue.
+
+    Args:
+    - _text: a string to scan
+    - wf: word frequency dictionary: 'word': freq
+    - selected: previously selected fixes
+    - autojoined: auomatic fixes based on heuristic
+    - queue: dict of candidate: queue entry, updated in place
+    - cache: a DecisionCache for automatic decisions, shared across texts
+    - context: number of characters of context to keep on each side of the example
+    - table: dict of candidate: replacement to add the candidates the rules settle to, updated in place
+    """
+    _text = clean_anftext(_text)
+    for dash, n in Counter(find_candidates(_text)).items():
+        if table is not None and dash in table:
+            continue
+        if dash not in queue:
+            newdash, rule = resolve_candidate(dash, wf, selected, autojoined, False, progbar=Silent(), cache=cache, policy="defer")
+            if rule != "deferred":
+                if table is not None:
+                    table[dash] = newdash
+                continue
+        queue_candidate(queue, dash, n, _text, context=context)
+
+
+
+
+def queue_candidate(queue, dash, n, _text, context=60):
+    """
+    Add the occurrences of a candidate in a text to a review queue.
+
+    Args:
+    - queue: dict of candidate: queue entry, updated in place
+    - dash: the candidate
+    - n: number of occurrences in the text
+    - _text: the cleaned text, for the example
+    - context: number of characters of context to keep on each side of the example
+    """
+    entry = queue.get(dash)
+    if entry is None:
+        i = _text.find(dash)
+        entry = queue[dash] = {
+            "candidate": dash,
+            "count": 0,
+            "files": 0,
+            "example": _text[max(0, i - context):i + len(dash) + context].strip(),
+            "decision": None,
+            "replacement": None,
+        }
+    entry["count"] += n
+    entry["files"] += 1
+
+
+
+
+def merge_queues(queue, other):
+    """
+    Merge the entries of one review queue into another, adding up counts.
+
+    Args:
+    - queue: dict of candidate: queue entry, updated in place
+    - other: dict of candidate: queue entry
+    """
+    for dash, entry in other.items():
+        if dash in queue:
+            queue[dash]["count"] += entry["count"]
+            queue[dash]["files"] += entry["files"]
+        else:
+            queue[dash] = entry
+
+
+
+
+_scanner = {}
+
+
+
+
+def _init_scanner(source_type, wf, selected, autojoined, cache_size, field, table):
+    _scanner.update({
+        "source_type": source_type,
+        "field": field,
+        "table": table,
+        "wf": wf,
+        "selected": RecordingSet(selected),
+        "autojoined": RecordingSet(autojoined),
+        "cache": DecisionCache(maxsize=cache_size),
+    })
+
+
+
+
+def _scan_one(_file):
+    s = _scanner
+    queue = {}
+    table = {} if s["table"] else None
+    for _text in _read_texts(_file, s["source_type"], s["field"]):
+        scan_text(_text, s["wf"], s["selected"], s["autojoined"], queue, cache=s["cache"], table=table)
+    return queue, table
+
+
+
+
+def scan_files(_files, source_type, wf, selected, autojoined, cache=None, workers=1, field=None, table=None):
+    """
+    Scan files with the automatic rules and return the review queue, a dict of candidate: queue entry. Nothing is written and no decisions are saved.
+
+    Args:
+    - _files: list of input files
+    - source_type: anf_dict, txt_file or jsonl
+    - wf: word frequency dictionary: 'word': freq
+    - selected: previously selected fixes
+    - autojoined: auomatic fixes based on heuristic
+    - cache: a DecisionCache for automatic decisions; its size is used for each worker's cache
+    - workers: number of worker processes
+    - field: for jsonl, the dotted path of the text in each record
+    - table: dict of candidate: replacement to add the candidates the rules settle to, updated in place (see `swedish_dehyphenator.frozen`)
+    """
+    if cache is None:
+        cache = DecisionCache()
+    queue = {}
+    progbar = tqdm(total=len(_files), desc="Scanning", position=0, leave=True)
+    if workers > 1 and len(_files) > 1:
+        if isinstance(selected, DecisionTable):
+            selected.store.flush()
+        initargs = (source_type, wf, list(selected), list(autojoined), cache.maxsize, field, table is not None)
+        chunksize = _chunksize(len(_files), workers)
+        with Pool(workers, initializer=_init_scanner, initargs=initargs) as pool:
+            for file_queue, file_table in pool.imap_unordered(_scan_one, _files, chunksize=chunksize):
+                merge_queues(queue, file_queue)
+                if table is not None:
+                    table.update(file_table)
+                progbar.update(1)
+    else:
+        # Scanning must not change the saved decisions, so rules that record decisions write to a copy
+        selected, autojoined = RecordingSet(selected), RecordingSet(autojoined)
+        for _file in _files:
+            for _text in _read_texts(_file, source_type, field):
+                scan_text(_text, wf, selected, autojoined, queue, cache=cache, table=table)
+            progbar.update(1)
+    progbar.close()
+
+    return queue
+
+
+
+
+def write_queue(queue, queue_path):
+    """
+    Write a review queue as JSON Lines, most frequent candidates first.
+
+    Args:
+    - queue: dict of candidate: queue entry
+    - queue_path: path to the queue file
+    """
+    tmp_path = f"{queue_path}.tmp"
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        for entry in sorted(queue.values(), key=lambda e: (-e["count"], e["candidate"])):
+            f.write(json.dumps(entry, ensure_ascii=False) + "\n")
+    os.replace(tmp_path, queue_path)
+
+
+
+
+def read_queue(queue_path):
+    """
+    Read a review queue written by `write_queue`. Returns a dict of candidate: queue entry.
+
+    Args:
+    - queue_path: path to the queue file
+    """
+    queue = {}
+    with open(queue_path, 'r', encoding='utf-8') as f:
+        for line in f:
+            if line.strip():
+                entry = json.loads(line)
+                queue[entry["candidate"]] = entry
+    return queue
+
+
+
+
+def queue_decisions(queue):
+    """
+    Return the reviewed decisions in a queue as a dict of candidate: replacement, for use as `decisions` in an apply run.
+
+    Args:
+    - queue: dict of candidate: queue entry
+    """
+    return {dash: entry["replacement"] for dash, entry in queue.items() if entry.get("decision") is not None}
+
+
+
+
+def review_queue(queue_path, selected=None, save_every=20):
+    """
+    Ask the user about each undecided candidate in a review queue file once, most frequent first, and save the answers in the file.
+    Aborting saves the answers given so far; running the review again continues where it stopped. Returns the number of answers given.
+
+    Args:
+    - queue_path: path to the queue file
+    - selected: previously selected fixes. If given, join and dash answers are also recorded there.
+    - save_every: number of answers between saves
+    """
+    queue = read_queue(queue_path)
+    todo = [entry for entry in queue.values() if entry.get("decision") is None]
+    todo.sort(key=lambda e: (-e["count"], e["candidate"]))
+    answered = 0
+    for i, entry in enumerate(todo):
+        dash = entry["candidate"]
+        predash, postdash = dash.split('- ')
+        _print("\n[{}/{}] '{}' -- {} occurrences in {} files".format(i + 1, len(todo), dash, entry["count"], entry["files"]), None)
+        _print("  ... {} ...".format(entry["example"]), None)
+        tbd = ask_user(None, None, False)
+        if tbd == 'a':
+            break
+        if tbd not in ("j", "d", "k"):
+            continue
+        entry["decision"] = tbd
+        entry["replacement"] = _apply_choice(tbd, dash, predash + postdash, predash + '-' + postdash)
+        if selected is not None and tbd in "jd":
+            selected.append(entry["replacement"].lower())
+        answered += 1
+        if answered % save_every == 0:
+            write_queue(queue, queue_path)
+    write_queue(queue, queue_path)
+
+    return answered
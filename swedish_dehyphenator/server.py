@@ -0,0 +1,154 @@
+#!/usr/bin/env python3
+"""
+Serve dehyphenation from a long-running process that keeps the lexicon and decisions loaded.
+
+The server listens on a Unix socket or on localhost HTTP. Requests and responses are JSON objects:
+
+- `{"text": "..."}` gets `{"text": "...", "fixes": n}`
+- `{"texts": ["...", ...]}` gets `{"results": [{"text": "...", "fixes": n}, ...]}`; each distinct candidate is decided once per batch
+- `{"op": "flush"}` saves the decisions learned so far
+- `{"op": "stats"}` gets the number of fixes and of deferred candidates so far
+
+Ambiguous candidates are left as they are, since nobody is there to ask. Over a Unix socket, each request and response is one line,
+and a connection can carry any number of them. Over HTTP, requests are POSTed to `/`. See `swedish_dehyphenator.client` for a client.
+"""
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+import json
+import os
+import signal
+import socketserver
+
+
+
+
+def handle_request(dehyphenator, request):
+    """
+    Answer a single request. Returns the response as a dict.
+
+    Args:
+    - dehyphenator: a Dehyphenator
+    - request: the request, a dict
+    """
+    if not isinstance(request, dict):
+        return {"error": "a request must be a json object"}
+    op = request.get("op")
+    if op == "flush":
+        dehyphenator.flush()
+        return {"ok": True}
+    if op == "stats":
+        stats = {"fixes": dehyphenator.dcounter, "deferred": len(dehyphenator.pending)}
+        if dehyphenator.metrics is not None:
+            stats["rules"] = dict(dehyphenator.metrics.rules)
+        return stats
+    if op is not None:
+        return {"error": f"unknown op {op!r}"}
+    if isinstance(request.get("text"), str):
+        before = dehyphenator.dcounter
+        _text = dehyphenator.dehyphenate(request["text"])
+        return {"text": _text, "fixes": dehyphenator.dcounter - before}
+    texts = request.get("texts")
+    if isinstance(texts, list) and all(isinstance(_text, str) for _text in texts):
+        return {"results": [{"text": _text, "fixes": n} for _text, n in dehyphenator.dehyphenate_many(texts)]}
+    return {"error": "a request needs a 'text' string, a 'texts' list of strings or an 'op'"}
+
+
+
+
+def _answer(dehyphenator, data):
+    try:
+        request = json.loads(data)
+    except ValueError as e:
+        return {"error": f"invalid json: {e}"}
+    try:
+        return handle_request(dehyphenator, request)
+    except Exception as e:
+        return {"error": f"{type(e).__name__}: {e}"}
+
+
+
+
+class _SocketHandler(socketserver.StreamRequestHandler):
+
+    def handle(self):
+        for line in self.rfile:
+            if not line.strip():
+                continue
+            response = _answer(self.server.dehyphenator, line)
+            self.wfile.write(json.dumps(response, ensure_ascii=False).encode('utf-8') + b"\n")
+            self.wfile.flush()
+
+
+
+
+class _HTTPHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+
+    def _respond(self, status, response):
+        body = json.dumps(response, ensure_ascii=False).encode('utf-8')
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json; charset=utf-8")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+
+    def do_GET(self):
+        if self.path == "/health":
+            self._respond(200, {"ok": True})
+        else:
+            self._respond(404, {"error": "POST requests to /"})
+
+
+    def do_POST(self):
+        data = self.rfile.read(int(self.headers.get("Content-Length", 0)))
+        response = _answer(self.server.dehyphenator, data)
+        self._respond(400 if "error" in response else 200, response)
+
+
+    def log_message(self, format, *args):
+        pass
+
+
+
+
+class _UnixServer(socketserver.ThreadingMixIn, socketserver.UnixStreamServer):
+    daemon_threads = True
+
+
+
+
+def serve(dehyphenator, socket_path=None, host="127.0.0.1", port=None):
+    """
+    Answer requests with a Dehyphenator until interrupted or terminated, then save its decisions and close it.
+
+    Args:
+    - dehyphenator: a Dehyphenator, normally with the "defer" policy and quiet metrics
+    - socket_path: path of a Unix socket to listen on
+    - host: address to listen on for HTTP, localhost by default
+    - port: port to listen on for HTTP, if no socket_path is given
+    """
+    if socket_path is not None:
+        if os.path.exists(socket_path):
+            os.unlink(socket_path)
+        server = _UnixServer(socket_path, _SocketHandler)
+        where = socket_path
+    else:
+        server = ThreadingHTTPServer((host, port), _HTTPHandler)
+        where = "http://{}:{}/".format(*server.server_address[:2])
+    server.dehyphenator = dehyphenator
+
+    def _terminate(signum, frame):
+        raise KeyboardInterrupt
+    signal.signal(signal.SIGTERM, _terminate)
+    print(f"Serving on {where}", flush=True)
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+        if socket_path is not None and os.path.exists(socket_path):
+            os.unlink(socket_path)
+        if dehyphenator.log_results:
+            dehyphenator.flush()
+        dehyphenator.close()
@@ -0,0 +1,167 @@
+#!/usr/bin/env python3
+"""
+An indexed decision store for selected and autojoined words, shared safely between processes.
+
+Decisions are kept in a SQLite database in WAL mode, so several worker processes can read and append to the same file at once.
+"""
+import os
+import pickle
+import sqlite3
+
+
+
+
+class DecisionTable:
+    """
+    A set-like view of one kind of decision in a DecisionStore.
+
+    It supports `word in table` and `table.append(word)`, so it can be used wherever the old `selected` and `autojoined` lists were.
+    Appended words are buffered and written in batches; lookups see both buffered words and words written by other processes.
+
+    Args:
+    - store: the DecisionStore this table belongs to
+    - kind: the decision kind, e.g. "selected" or "autojoined"
+    """
+
+    def __init__(self, store, kind):
+        self.store = store
+        self.kind = kind
+        self._known = set()
+        self._pending = []
+
+
+    def __contains__(self, word):
+        if word in self._known:
+            return True
+        row = self.store._conn.execute(
+            "SELECT 1 FROM decisions WHERE kind = ? AND word = ?", (self.kind, word)).fetchone()
+        if row is not None:
+            self._known.add(word)
+            return True
+        return False
+
+
+    def append(self, word):
+        """
+        Record a word. Words that are already known are ignored.
+
+        Args:
+        - word: the word to record
+        """
+        if word in self._known:
+            return
+        self._known.add(word)
+        self._pending.append(word)
+        if self.store.batch_size is not None and len(self._pending) >= self.store.batch_size:
+            self.flush()
+
+
+    def extend(self, words):
+        """
+        Record several words.
+
+        Args:
+        - words: an iterable of words
+        """
+        for word in words:
+            self.append(word)
+
+
+    def flush(self):
+        """
+        Write buffered words to the database.
+        """
+        if not self._pending:
+            return
+        with self.store._conn:
+            self.store._conn.executemany(
+                "INSERT OR IGNORE INTO decisions (kind, word) VALUES (?, ?)",
+                [(self.kind, word) for word in self._pending])
+        self._pending = []
+
+
+    def __iter__(self):
+        self.flush()
+        for (word,) in self.store._conn.execute("SELECT word FROM decisions WHERE kind = ?", (self.kind,)):
+            yield word
+
+
+    def __len__(self):
+        self.flush()
+        return self.store._conn.execute("SELECT COUNT(*) FROM decisions WHERE kind = ?", (self.kind,)).fetchone()[0]
+
+
+
+
+class DecisionStore:
+    """
+    SQLite-backed store of previously selected and autojoined words.
+
+    Args:
+    - path: path to the database file. It is created if it doesn't exist.
+    - timeout: seconds to wait for another process' write lock
+    - batch_size: number of appended words to buffer before writing. None buffers until `flush` is called.
+    """
+
+    def __init__(self, path, timeout=30.0, batch_size=256):
+        self.path = path
+        self.batch_size = batch_size
+        if os.path.dirname(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+        self._conn = sqlite3.connect(path, timeout=timeout, isolation_level=None, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS decisions ("
+            "kind TEXT NOT NULL, word TEXT NOT NULL, PRIMARY KEY (kind, word)) WITHOUT ROWID")
+        self.selected = DecisionTable(self, "selected")
+        self.autojoined = DecisionTable(self, "autojoined")
+
+
+    def flush(self):
+        """
+        Write all buffered decisions to the database.
+        """
+        self.selected.flush()
+        self.autojoined.flush()
+
+
+    def close(self, flush=True):
+        """
+        Close the database connection.
+
+        Args:
+        - flush: write buffered decisions before closing
+        """
+        if flush:
+            self.flush()
+        self._conn.close()
+
+
+    def import_pickles(self, selected_path=None, autojoined_path=None):
+        """
+        Import decisions from the legacy `selected.pickle` and `autojoined.pickle` files. Duplicates are dropped.
+        Returns a (selected, autojoined) tuple with the number of entries read from each file.
+
+        Args:
+        - selected_path: path to a pickled list of selected words
+        - autojoined_path: path to a pickled list of autojoined words
+        """
+        counts = []
+        for table, _path in ((self.selected, selected_path), (self.autojoined, autojoined_path)):
+            words = []
+            if _path is not None and os.path.isfile(_path):
+                with open(_path, 'rb') as f:
+                    words = pickle.load(f)
+            table.extend(words)
+            table.flush()
+            counts.append(len(words))
+        return tuple(counts)
+
+
+    def __enter__(self):
+        return self
+
+
+    def __exit__(self, *exc):
+        self.close()
@@ -5,7 +5,17 @@ A python program to remove end-line hyphenations from large texts.
 
 Author: Stian Rødven Eide
 """
+from swedish_dehyphenator.cache import DecisionCache
+from swedish_dehyphenator.compression import CODECS, open_file, output_codec
 from swedish_dehyphenator.config import fetch_config
+from swedish_dehyphenator.discovery import SOURCE_PATTERNS, iter_files, output_name, parse_shard
+from swedish_dehyphenator.lexicon import load_wf
+from swedish_dehyphenator.manifest import Manifest, decision_version
+from swedish_dehyphenator.metrics import Metrics
+from swedish_dehyphenator.store import DecisionStore, DecisionTable
+from collections import Counter
+from contextlib import nullcontext
+from itertools import islice
 from tqdm import tqdm
 import argparse
 import getch
@@ -13,26 +23,55 @@ import json
 import os
 import pickle
 import re
+import sys
+import threading
+import time
+
+
+
+
+_DASH_RE = re.compile(r'\w+- \w+')
+_STYLEREF_RE = re.compile('<p> STYLEREF.*?>')
+# A run of tags, linebreaks and spaces that needs folding into one space: anything but a lone space.
+# Each branch starts with a literal so the regex engine can skip ahead to candidate positions.
+_FOLD = r'(?:[ \n\r]|<[^\n>]*>)'
+_CLEAN_RE = re.compile(rf'<[^\n>]*>{_FOLD}*|\n{_FOLD}*|\r{_FOLD}*| {_FOLD}+')
+# Rules that settle a candidate without a lexicon lookup, tried in order on the dashed form.
+# Each entry is (name, pattern, message); a match means the dashed form is kept.
+_RULES = [
+    ("uppercase", r'[A-ZÅÄÖ]+-[a-zåäö]+', "Matching '[A-Z]+-[a-z]+' rule, dashing!"),
+    ("capitalised", r'[A-ZÅÄÖ][a-zåäö]+-[A-ZÅÄÖ][a-zåäö]+', "Matching '[A-Z][a-z]+-[A-Z][a-z]+' rule, dashing!"),
+    ("numeric", r'\d+-\w+', "Matching '\\d+-\\w+' rule, dashing!"),
+    ("icke", r'icke-\w+', "Matching 'icke-\\w+' rule, dashing!"),
+]
+_RULE_RE = re.compile("|".join(f"(?P<{name}>{pattern})" for name, pattern, _ in _RULES))
+_RULE_MESSAGES = {name: message for name, _, message in _RULES}
+# A newline that raw text can be split at: the character before it is kept as it is by cleaning and doesn't end a
+# 'word-', so no tag, inline header, whitespace run or candidate spans the cut. Tags and inline headers can span a
+# lone '\r', so only '\n' will do.
+_SPLIT_RE = re.compile(r'(?<=[^ \n\r>-])\n')
+# The smallest piece a text is split into for `dehyphenate_text` with workers
+_MIN_SPLIT = 1 << 20
 
 
 
 
 def parsejson(jfile):
     """
-    Reads a json file in utf-8 and returns its contents as a nested dictionary
+    Reads a json file in utf-8 and returns its contents as a nested dictionary. Compressed files are decompressed.
 
     Args:
     - jfile: json file, incl path
     """
-    with open(jfile, 'r', 'utf-8-sig') as jdoc:
-        anfdict = json.loads(jdoc, encoding='utf-8')
+    with open_file(jfile, 'r', encoding='utf-8-sig') as jdoc:
+        anfdict = json.load(jdoc)
 
     return anfdict
 
 
 
 
-def savejson(jfile, path, anfdict):
+def savejson(jfile, path, anfdict, codec=None):
     """
     Saves formatted JSON file.
 
@@ -40,29 +79,32 @@ def savejson(jfile, path, anfdict):
     - jfile: json file name
     - path: path to json file
     - anfdict: dict to save
+    - codec: compress the file with "gz" or "xz"
     """
-    with codecs.open(path + jfile, 'w','utf-8-sig') as f:
+    with open_file(path + jfile, 'w', codec=codec, encoding='utf-8-sig') as f:
         json.dump(anfdict, f, ensure_ascii=False, indent=4)
 
 
 
 
-def clean_anftext(anftext):
+def clean_anftext(anftext, cleaned=False):
     """
     This function removes unwanted formatting from the text
-    These remove html-tags and inline headers
+    These remove html-tags and inline headers, linebreaks and redundant whitespace
+
+    Inline headers are removed first, and only if there are any. Tags, linebreaks and runs of spaces are then folded into
+    a single space in one pass.
 
     Args:
     - anftext: input text
+    - cleaned: the text has already been cleaned, return it as is
     """
-    anftext = re.sub('<p> STYLEREF.*?>',' ', anftext)
-    anftext = re.sub('<.*?>',' ', anftext)
-    # These remove linebreaks and redundant whitespace
-    anftext = re.sub('\n',' ', anftext)
-    anftext = re.sub('\r',' ', anftext)
-    anftext = re.sub(' {2,}',' ', anftext)
+    if cleaned:
+        return anftext
+    if 'STYLEREF' in anftext:
+        anftext = _STYLEREF_RE.sub(' ', anftext)
 
-    return anftext
+    return _CLEAN_RE.sub(' ', anftext)
 
 
 
@@ -84,6 +126,22 @@ def _print(s, p):
 
 
 
+def _messages(progbar, quiet=False):
+    """
+    Return a function that formats and prints a message with `_print`, or one that does nothing in quiet mode,
+    so quiet runs don't spend time formatting messages nobody reads.
+
+    Args:
+    - progbar: tqdm progress bar, see `_print`
+    - quiet: leave messages out
+    """
+    if quiet:
+        return lambda s, *args: None
+    return lambda s, *args: _print(s.format(*args) if args else s, progbar)
+
+
+
+
 def file_loc_prompt(filetype):
     """
     Prompt user for a file location, if one is not set in the config.
@@ -101,6 +159,10 @@ def file_loc_prompt(filetype):
 
 
 def _log_results(selected, autojoined, config=None):
+    if isinstance(selected, DecisionTable) and isinstance(autojoined, DecisionTable):
+        selected.flush()
+        autojoined.flush()
+        return
     if config is None:
         config = {}
     if 'selected_path' not in config or config['selected_path'] is None:
@@ -147,107 +209,635 @@ def ask_user(autojoined, selected, log_results, progbar=None, config=None):
             if log_results:
                 _log_results(selected, autojoined, config=config)
         else:
-            ask_user(autojoined, selected, log_results, progbar=progbar, config=config)
+            return ask_user(autojoined, selected, log_results, progbar=progbar, config=config)
     else:
         _print("Try again", progbar)
-        ask_user(autojoined, selected, log_results, progbar=progbar, config=config)
+        return ask_user(autojoined, selected, log_results, progbar=progbar, config=config)
 
     return char
 
 
 
 
-def dehyphenate_text(_text, wf, selected, autojoined, log_results, dcounter, progbar=None, config=None):
+def find_candidates(_text):
     """
-    Dehyphenate text input
+    Return all 'word- anotherword' candidates in the text, in document order.
+
     Args:
-    - _text: a string to dehyphenate
-    - wf: path to pickle, which is a word frequency dictionary with all words from parliamentary debates and their frequencies there: 'word': freq
+    - _text: a string to search
+    """
+    return _DASH_RE.findall(_text)
+
+
+
+
+def substitute_candidates(_text, replacements):
+    """
+    Rewrite every candidate in the text in a single pass. Candidates missing from `replacements` are left as they are.
+
+    Args:
+    - _text: a string to rewrite
+    - replacements: dict of candidate: replacement
+    """
+    if not replacements:
+        return _text
+    return _DASH_RE.sub(lambda m: replacements.get(m.group(0), m.group(0)), _text)
+
+
+
+
+def _apply_choice(choice, dash, jdash, ddash):
+    """
+    Turn a (j)oin/(d)ash/(k)eep choice into the replacement string.
+    """
+    return {"j": jdash, "d": ddash}.get(choice, dash)
+
+
+
+
+def resolve_candidate(dash, wf, selected, autojoined, log_results, progbar=None, config=None, cache=None, policy="ask", quiet=False):
+    """
+    Decide what to do with a single 'word- anotherword' candidate.
+
+    Returns a (replacement, rule) tuple, where rule names the step of the decision chain that settled it, or None if the user aborted.
+    A decision found in the cache keeps the rule it was made by. New decisions are appended to `selected`; those found in the cache
+    or in `selected` already are not.
+    When the policy is "defer", candidates that need a human decision are left as they are and the rule is "deferred".
+
+    Args:
+    - dash: the candidate, as found in the text
+    - wf: word frequency dictionary: 'word': freq
     - selected: previously selected fixes
     - autojoined: auomatic fixes based on heuristic
     - log_results: to log or not to log
-    - dcounter: couter of hyphenation fixes
     - progbar: progress bar instance
     - config: a config dict
+    - cache: a DecisionCache for automatic decisions, shared across texts
+    - policy: "ask" to ask the user about ambiguous candidates, "defer" to leave them for later
+    - quiet: leave out the messages about each step. The candidate is still shown before the user is asked about it.
     """
-    _text = clean_anftext(_text)
-    dashes = re.findall('\w+- \w+', _text)
-    if dashes is None:
-        return _text
-
-    for dash in set(dashes):
-        _print("Processing '{}' ...".format(dash), progbar)
-        jdash = re.sub('- ','',dash)
-        ddash = re.sub('- ','-',dash)
-        if selected is not None and jdash.lower() in selected:
-            _print("'{}' was selected earlier".format(jdash), progbar)
-            newdash = jdash
-        elif selected is not None and  ddash.lower() in selected:
-            _print("'{}' was selected earlier".format(ddash), progbar)
-            newdash = ddash
-        elif re.match('[A-ZÅÄÖ]+-[a-zåäö]+',ddash):
-            _print("Matching '[A-Z]+-[a-z]+' rule, dashing!", progbar)
-            newdash = ddash
-        elif re.match('[A-ZÅÄÖ][a-zåäö]+-[A-ZÅÄÖ][a-zåäö]+',ddash):
-            _print("Matching '[A-Z][a-z]+-[A-Z][a-z]+' rule, dashing!", progbar)
-            newdash = ddash
-        elif re.match('\d+-\w+',ddash):
-            _print("Matching '\d+-\w+' rule, dashing!", progbar)
-            newdash = ddash
-        elif re.match('icke-\w+',ddash):
-            _print("Matching 'icke-\w+' rule, dashing!", progbar)
-            newdash = ddash
-        elif wf is not None and jdash.lower() in wf and ddash.lower() in wf:
-            _print("Both '{}' and '{}' are in the word frequency list".format(jdash, ddash), progbar)
-            if wf[jdash.lower()] > wf[ddash.lower()]:
-                _print("'{}' is more frequent, choosing that".format(jdash), progbar)
-                newdash = jdash
-            elif wf[jdash.lower()] < wf[ddash.lower()]:
-                _print("'{}' is more frequent, choosing that".format(ddash), progbar)
-                newdash = ddash
+    say = _messages(progbar, quiet)
+    say("Processing '{}' ...", dash)
+    predash, postdash = dash.split('- ')
+    jdash = predash + postdash
+    ddash = predash + '-' + postdash
+    jlower = jdash.lower()
+    dlower = ddash.lower()
+    key = (predash, postdash)
+    # The cache comes first: looking a word up in `selected` is a list scan when the decisions come from a pickle
+    if cache is not None:
+        cached = cache.get(key)
+        if cached is not None:
+            choice, rule = cached
+            say("'{}' was decided earlier by the {} rule", dash, rule)
+            return _apply_choice(choice, dash, jdash, ddash), rule
+
+    if selected is not None:
+        choice = 'j' if jlower in selected else 'd' if dlower in selected else None
+        if choice is not None:
+            say("'{}' was selected earlier", _apply_choice(choice, dash, jdash, ddash))
+            if cache is not None:
+                cache.put(key, (choice, "selected"))
+            return _apply_choice(choice, dash, jdash, ddash), "selected"
+
+    m = _RULE_RE.match(ddash)
+    if m is not None:
+        say(_RULE_MESSAGES[m.lastgroup])
+        choice, rule = "d", m.lastgroup
+    else:
+        jfreq = wf.get(jlower) if wf is not None else None
+        dfreq = wf.get(dlower) if wf is not None else None
+        choice = None
+        if jfreq is not None and dfreq is not None:
+            say("Both '{}' and '{}' are in the word frequency list", jdash, ddash)
+            if jfreq > dfreq:
+                say("'{}' is more frequent, choosing that", jdash)
+                choice = "j"
+            elif jfreq < dfreq:
+                say("'{}' is more frequent, choosing that", ddash)
+                choice = "d"
             else:
-                _print("They're equally frequent")
-                tbd = ask_user(autojoined, selected, log_results, progbar=progbar, config=config)
-                if tbd == 'j':
-                    newdash = jdash
-                elif tbd == 'd':
-                    newdash = ddash
-                elif tbd == 'a':
-                    return
-        elif wf is not None and jdash.lower() in wf:
-            _print("Only '{}' was found in the word frequency list".format(jdash), progbar)
-            newdash = jdash
-        elif wf is not None and ddash.lower() in wf:
-            _print("Only '{}' was found in the word frequency list".format(ddash), progbar)
-            newdash = jdash
+                say("They're equally frequent")
+        elif jfreq is not None:
+            say("Only '{}' was found in the word frequency list", jdash)
+            choice = "j"
+        elif dfreq is not None:
+            say("Only '{}' was found in the word frequency list", ddash)
+            choice = "j"
         else:
-            _print("Neither '{}' nor '{}' are in the word frequency list".format(jdash, ddash), progbar)
-            predash, postdash = ddash.split('-')
+            say("Neither '{}' nor '{}' are in the word frequency list", jdash, ddash)
             if selected is not None and wf is not None and predash not in selected and postdash not in selected and predash.lower() not in wf:
-                _print("However, neither '{}' nor '{}' seem to be words, so joining!".format(predash, postdash), progbar)
+                say("However, neither '{}' nor '{}' seem to be words, so joining!", predash, postdash)
                 autojoined.append(jdash)
-                newdash = jdash
-            else:
-                tbd = ask_user(autojoined, selected, log_results, progbar=progbar, config=config)
-                if tbd == 'j':
-                    newdash = jdash
-                elif tbd == 'd':
-                    newdash = ddash
-                elif tbd == 'a':
-                    return
-                else:
-                    newdash = dash
+                selected.append(jlower)
+                return jdash, "autojoin"
+        if choice is None and policy == "defer":
+            say("Leaving '{}' for later", dash)
+            return dash, "deferred"
+        if choice is None:
+            if quiet:
+                _print("'{}' needs a decision".format(dash), progbar)
+            tbd = ask_user(autojoined, selected, log_results, progbar=progbar, config=config)
+            if tbd == 'a':
+                return None
+            newdash = _apply_choice(tbd, dash, jdash, ddash)
+            if selected is not None:
+                selected.append(newdash.lower())
+            return newdash, "user"
+        rule = "lexicon"
+
+    if cache is not None:
+        cache.put(key, (choice, rule))
+    newdash = _apply_choice(choice, dash, jdash, ddash)
+    if selected is not None:
         selected.append(newdash.lower())
-        _text = re.sub(dash, newdash, _text)
+    return newdash, rule
+
+
+
+
+def dehyphenate_text(_text, wf, selected, autojoined, log_results, dcounter, progbar=None, config=None, cache=None, policy="ask", pending=None, decisions=None, resolved=None, cleaned=False, metrics=None, workers=1):
+    """
+    Dehyphenate text input. Returns (text, dcounter), or None if the user aborted.
+    Args:
+    - _text: a string to dehyphenate
+    - wf: path to pickle, which is a word frequency dictionary with all words from parliamentary debates and their frequencies there: 'word': freq
+    - selected: previously selected fixes
+    - autojoined: auomatic fixes based on heuristic
+    - log_results: to log or not to log
+    - dcounter: couter of hyphenation fixes
+    - progbar: progress bar instance
+    - config: a config dict
+    - cache: a DecisionCache for automatic decisions, shared across texts
+    - policy: "ask" to ask the user about ambiguous candidates, "defer" to leave them unchanged
+    - pending: dict of deferred candidate: number of occurrences, updated in place
+    - decisions: dict of candidate: replacement settled beforehand, e.g. in a review. These skip the decision chain.
+    - resolved: dict of candidate: replacement already decided earlier in the same document, e.g. in a previous chunk. Updated in place, and these are not counted again.
+    - cleaned: the text has already been through `clean_anftext`, don't clean it again
+    - metrics: a Metrics instance to count decisions per rule and time each stage in, see `swedish_dehyphenator.metrics`.
+      Its quiet setting leaves out the per-candidate messages.
+    - workers: number of worker processes to split a large text over, see `split_text`. The output is the same as with one.
+    """
+    if workers > 1 and not cleaned and len(_text) > 2 * _MIN_SPLIT:
+        pieces = split_text(_text, max(_MIN_SPLIT, len(_text) // (workers * 4)))
+        if len(pieces) > 1:
+            return _dehyphenate_split(pieces, wf, selected, autojoined, log_results, dcounter, progbar, config, cache, policy, pending, decisions, resolved, metrics, workers)
+    if metrics is not None:
+        return _dehyphenate_text_measured(_text, wf, selected, autojoined, log_results, dcounter, progbar, config, cache, policy, pending, decisions, resolved, cleaned, metrics)
+    _text = clean_anftext(_text, cleaned=cleaned)
+    dashes = find_candidates(_text)
+    if not dashes:
+        return _text, dcounter
+    result = _decide_candidates(Counter(dashes), wf, selected, autojoined, log_results, dcounter, progbar, config, cache, policy, pending, decisions, resolved)
+    if result is None:
+        return
+    replacements, dcounter = result
+
+    return substitute_candidates(_text, replacements), dcounter
+
+
+
+
+def _dehyphenate_text_measured(_text, wf, selected, autojoined, log_results, dcounter, progbar, config, cache, policy, pending, decisions, resolved, cleaned, metrics):
+    """
+    `dehyphenate_text` with each stage timed and decisions counted in metrics.
+    """
+    clock = time.perf_counter
+    stages = metrics.stages
+    metrics.chars += len(_text)
+    t0 = clock()
+    _text = clean_anftext(_text, cleaned=cleaned)
+    t1 = clock()
+    dashes = find_candidates(_text)
+    t2 = clock()
+    stages["clean"] += t1 - t0
+    stages["candidates"] += t2 - t1
+    if not dashes:
+        return _text, dcounter
+    result = _decide_candidates(Counter(dashes), wf, selected, autojoined, log_results, dcounter, progbar, config, cache, policy, pending, decisions, resolved, metrics)
+    t3 = clock()
+    stages["decision"] += t3 - t2
+    if result is None:
+        return
+    replacements, dcounter = result
+    _text = substitute_candidates(_text, replacements)
+    stages["substitution"] += clock() - t3
+
+    return _text, dcounter
+
+
+
+
+def _decide_candidates(counts, wf, selected, autojoined, log_results, dcounter, progbar, config, cache, policy, pending, decisions, resolved, metrics=None):
+    """
+    Decide about each distinct candidate of a text, given as a Counter of candidate: occurrences in document order, see `dehyphenate_text`.
+    Returns (replacements, dcounter), or None if the user aborted.
+    """
+    quiet = metrics is not None and metrics.quiet
+    replacements = {}
+    for dash in counts:
+        if resolved is not None and dash in resolved:
+            replacements[dash] = resolved[dash]
+            continue
+        if decisions is not None and dash in decisions:
+            newdash, rule = decisions[dash], "decided"
+            selected.append(newdash.lower())
+        else:
+            result = resolve_candidate(dash, wf, selected, autojoined, log_results, progbar=progbar, config=config, cache=cache, policy=policy, quiet=quiet)
+            if result is None:
+                return
+            newdash, rule = result
+        if metrics is not None:
+            metrics.rules[rule] += 1
+        if rule == "deferred":
+            if pending is not None:
+                pending[dash] = pending.get(dash, 0) + counts[dash]
+            continue
+        replacements[dash] = newdash
+        if resolved is not None:
+            resolved[dash] = newdash
         # Keeping track of how many dashes we fix
         dcounter +=1
 
+    return replacements, dcounter
+
+
+
+
+def split_text(_text, size):
+    """
+    Split raw text into pieces of at least size characters, cut at line breaks that no tag, inline header, whitespace run
+    or 'word- anotherword' candidate spans. Cleaning and dehyphenating each piece and joining them gives the same result as
+    doing it to the whole text. Text without such line breaks is left in one piece.
+
+    Args:
+    - _text: a raw string
+    - size: the smallest number of characters in a piece, except the last
+    """
+    pieces = []
+    start = 0
+    while len(_text) - start > size:
+        m = _SPLIT_RE.search(_text, start + size)
+        if m is None:
+            break
+        pieces.append(_text[start:m.start()])
+        start = m.start()
+    pieces.append(_text[start:])
+    return pieces
+
+
+
+
+def _dehyphenate_split(pieces, wf, selected, autojoined, log_results, dcounter, progbar, config, cache, policy, pending, decisions, resolved, metrics, workers):
+    """
+    `dehyphenate_text` of a text split with `split_text`. The pieces are cleaned, searched and rewritten in a process pool,
+    while the candidates of all pieces are merged and decided here once, in document order.
+    """
+    from multiprocessing import Pool
+    clock = time.perf_counter
+    with Pool(min(workers, len(pieces))) as pool:
+        t0 = clock()
+        prepared = pool.map(_prepare_text, pieces, chunksize=1)
+        t1 = clock()
+        counts = Counter()
+        for _, piece_counts in prepared:
+            counts.update(piece_counts)
+        result = _decide_candidates(counts, wf, selected, autojoined, log_results, dcounter, progbar, config, cache, policy, pending, decisions, resolved, metrics)
+        t2 = clock()
+        if result is None:
+            return
+        replacements, dcounter = result
+        _text = "".join(pool.map(_substitute_text, [(piece, replacements) for piece, _ in prepared], chunksize=1))
+    if metrics is not None:
+        # cleaning and the candidate search happen together in the workers, and are timed as cleaning
+        metrics.chars += sum(len(piece) for piece in pieces)
+        metrics.stages["clean"] += t1 - t0
+        metrics.stages["decision"] += t2 - t1
+        metrics.stages["substitution"] += clock() - t2
+
     return _text, dcounter
 
 
 
 
-def dehyphenate_anf_dict(_files, wf_anf, selected, autojoined, output_path, log_results, dcounter, fcounter, config=None):
+def read_chunks(f, chunk_size):
+    """
+    Yield a file's contents in chunks.
+
+    Args:
+    - f: a file opened in text mode
+    - chunk_size: number of characters per chunk
+    """
+    while True:
+        chunk = f.read(chunk_size)
+        if not chunk:
+            return
+        yield chunk
+
+
+
+
+def _clean_cut(buffer):
+    """
+    Return a position where raw text can be split so that cleaning both parts gives the same result as cleaning it whole, or -1.
+    Tags are only stripped within a line, so any newline will do. Otherwise, cut after the last '>' and before any '<' following it,
+    as long as no '<' is left open once STYLEREF headers are removed.
+    """
+    i = buffer.rfind('\n')
+    if i > 0:
+        return i
+    g = buffer.rfind('>')
+    if buffer.endswith('<p>', 0, g + 1):
+        # might be the start of a '<p> STYLEREF ...>' header
+        return -1
+    lt = buffer.find('<', g + 1)
+    cut = lt if lt >= 0 else len(buffer)
+    head = _STYLEREF_RE.sub(' ', buffer[:cut])
+    if head.rfind('<') > head.rfind('>'):
+        return -1
+    return cut
+
+
+
+
+def _candidate_cut(buffer):
+    """
+    Return the position of a space in cleaned text that no candidate spans, or -1.
+    """
+    i = buffer.rfind(' ')
+    while i > 0 and buffer[i - 1] == '-':
+        i = buffer.rfind(' ', 0, i)
+    return i if i > 0 else -1
+
+
+
+
+def _join_spaces(pieces):
+    """
+    Collapse a space run that straddles two consecutive pieces, as `clean_anftext` does within one piece.
+    """
+    space = False
+    for piece in pieces:
+        if space:
+            piece = piece.lstrip(' ')
+        if piece:
+            space = piece.endswith(' ')
+            yield piece
+
+
+
+
+def stream_clean(chunks):
+    """
+    Clean a stream of raw text chunks. The concatenated output equals `clean_anftext` of the concatenated input.
+
+    Args:
+    - chunks: an iterable of strings
+    """
+    def _pieces():
+        buffer = ""
+        for chunk in chunks:
+            buffer += chunk
+            cut = _clean_cut(buffer)
+            if cut > 0:
+                yield clean_anftext(buffer[:cut])
+                buffer = buffer[cut:]
+        if buffer:
+            yield clean_anftext(buffer)
+
+    return _join_spaces(_pieces())
+
+
+
+
+def _candidate_segments(pieces):
+    """
+    Regroup cleaned text into segments that never split a 'word- anotherword' candidate, so a `word-` at the end of one chunk still meets the `word` at the start of the next.
+    """
+    buffer = ""
+    for piece in pieces:
+        buffer += piece
+        cut = _candidate_cut(buffer)
+        if cut > 0:
+            yield buffer[:cut]
+            buffer = buffer[cut:]
+    if buffer:
+        yield buffer
+
+
+
+
+def dehyphenate_stream(chunks, out, wf, selected, autojoined, log_results, dcounter, progbar=None, config=None, cache=None, policy="ask", pending=None, decisions=None, metrics=None):
+    """
+    Dehyphenate a stream of raw text chunks and write the result to out as it goes, so memory use doesn't grow with the size of the input.
+    Each unique candidate is decided and counted once per stream. Returns the updated dcounter, or None if the user aborted.
+
+    Args:
+    - chunks: an iterable of strings, e.g. from `read_chunks`
+    - out: a writable file object
+    - wf: word frequency dictionary: 'word': freq
+    - selected: previously selected fixes
+    - autojoined: auomatic fixes based on heuristic
+    - log_results: to log or not to log
+    - dcounter: couter of hyphenation fixes
+    - progbar: progress bar instance
+    - config: a config dict
+    - cache: a DecisionCache for automatic decisions, shared across texts
+    - policy: "ask" or "defer", see `dehyphenate_text`
+    - pending: dict of deferred candidates, see `dehyphenate_text`
+    - decisions: dict of candidate: replacement settled beforehand, see `dehyphenate_text`
+    - metrics: a Metrics instance, see `dehyphenate_text`. Cleaning happens as the stream is read, so it isn't timed as a stage.
+    """
+    state = {"dcounter": dcounter, "aborted": False}
+    resolved = {}
+
+    def _dehyphenated():
+        for segment in _candidate_segments(stream_clean(chunks)):
+            result = dehyphenate_text(segment, wf, selected, autojoined, log_results, state["dcounter"], progbar=progbar, config=config, cache=cache, policy=policy, pending=pending, decisions=decisions, resolved=resolved, cleaned=True, metrics=metrics)
+            if result is None:
+                state["aborted"] = True
+                return
+            _text, state["dcounter"] = result
+            yield _text
+
+    for piece in _join_spaces(_dehyphenated()):
+        out.write(piece)
+    if state["aborted"]:
+        return None
+
+    return state["dcounter"]
+
+
+
+
+def _read_source(_file, source_type):
+    """
+    Read an input file, decompressing it if needed. Returns (document, text): the parsed anf dict and its speech text, or None
+    and the text of a text file.
+    """
+    if source_type == "anf_dict":
+        anfdict = parsejson(_file)
+        return anfdict, anfdict['anforande']['anforandetext']
+    with open_file(_file, 'r') as f:
+        return None, f.read()
+
+
+
+
+def _read_texts(_file, source_type, field=None):
+    """
+    Yield the speech texts in an input file: one for anf dict and text files, one per record for JSON Lines files.
+    """
+    if source_type == "jsonl":
+        from swedish_dehyphenator.jsonl import DEFAULT_FIELD, read_records
+        for _, _, _text in read_records(_file, field or DEFAULT_FIELD):
+            if _text is not None:
+                yield _text
+    else:
+        yield _read_source(_file, source_type)[1]
+
+
+
+
+def _output_file(_file, output_path):
+    """
+    Return the path to write an input file's output to, creating its directory under the output path if needed. See `output_name`.
+    """
+    out_file = f"{output_path}{output_name(_file)}"
+    out_dir = os.path.dirname(out_file)
+    if out_dir and not os.path.isdir(out_dir):
+        os.makedirs(out_dir, exist_ok=True)
+    return out_file
+
+
+
+
+def _write_output(_file, source_type, output_path, document, _text):
+    """
+    Write a dehyphenated text to the output path, under the input file's name and compressed like it. See `_read_source`.
+    """
+    out_file = _output_file(_file, output_path)
+    if source_type == "anf_dict":
+        document['anforande']['anforandetext'] = _text.strip()
+        savejson(output_name(_file), output_path, document, codec=output_codec(_file))
+    else:
+        with open_file(out_file, "w+", codec=output_codec(_file)) as o:
+            o.write(_text)
+
+
+
+
+def _write_patches(_file, output_path, _text, replacements):
+    """
+    Write the edits that the decisions make to a source text to the file's patch sidecar in the output path, see `swedish_dehyphenator.patches`.
+    """
+    from swedish_dehyphenator.patches import make_patches, patch_name, write_patches
+    out_file = f"{output_path}{patch_name(_file)}"
+    os.makedirs(os.path.dirname(out_file) or ".", exist_ok=True)
+    write_patches(out_file, make_patches(_text, replacements))
+
+
+
+
+def process_anf_dict(_file, wf_anf, selected, autojoined, output_path, log_results, dcounter, progbar=None, config=None, cache=None, policy="ask", pending=None, decisions=None, metrics=None, patches=False, workers=1):
+    """
+    Dehyphenate the speech text of a single anf dict json file and write it to the output path. Returns the updated dcounter,
+    or None if the user aborted, in which case nothing is written.
+
+    Args:
+    - _file: input file
+    - wf_anf: word frequency dictionary: 'word': freq
+    - selected: previously selected fixes
+    - autojoined: auomatic fixes based on heuristic
+    - output_path: output path
+    - log_results: to log or not to log
+    - dcounter: couter of hyphenation fixes
+    - progbar: progress bar instance
+    - config: a config dict
+    - cache: a DecisionCache for automatic decisions, shared across files
+    - policy: "ask" or "defer", see `dehyphenate_text`
+    - pending: dict of deferred candidates, see `dehyphenate_text`
+    - decisions: dict of candidate: replacement settled beforehand, see `dehyphenate_text`
+    - metrics: a Metrics instance, see `dehyphenate_text`
+    - patches: write a patch sidecar with the edits to the speech text instead of the dehyphenated file, see `swedish_dehyphenator.patches`
+    - workers: number of worker processes to split a large speech text over, see `dehyphenate_text`
+    """
+    anfdict, pre_text = _read_source(_file, "anf_dict")
+    resolved = {} if patches else None
+    result = dehyphenate_text(pre_text, wf_anf, selected, autojoined, log_results, dcounter, progbar=progbar, config=config, cache=cache, policy=policy, pending=pending, decisions=decisions, resolved=resolved, metrics=metrics, workers=workers)
+    if result is None:
+        return None
+    _text, dcounter = result
+    if patches:
+        _write_patches(_file, output_path, pre_text, resolved)
+    else:
+        _write_output(_file, "anf_dict", output_path, anfdict, _text)
+
+    return dcounter
+
+
+
+
+def process_txt_file(_file, wf_anf, selected, autojoined, output_path, log_results, dcounter, progbar=None, config=None, cache=None, policy="ask", pending=None, decisions=None, chunk_size=None, metrics=None, patches=False, workers=1):
+    """
+    Dehyphenate a single text file and write it to the output path. Returns the updated dcounter, or None if the user aborted.
+    With a chunk_size, the file is streamed through `dehyphenate_stream` instead of being read whole; an aborted stream leaves
+    a partial output file behind.
+
+    Args:
+    - _file: input file
+    - wf_anf: word frequency dictionary: 'word': freq
+    - selected: previously selected fixes
+    - autojoined: auomatic fixes based on heuristic
+    - output_path: output path
+    - log_results: to log or not to log
+    - dcounter: couter of hyphenation fixes
+    - progbar: progress bar instance
+    - config: a config dict
+    - cache: a DecisionCache for automatic decisions, shared across files
+    - policy: "ask" or "defer", see `dehyphenate_text`
+    - pending: dict of deferred candidates, see `dehyphenate_text`
+    - decisions: dict of candidate: replacement settled beforehand, see `dehyphenate_text`
+    - chunk_size: number of characters to read at a time, or None to read the whole file
+    - metrics: a Metrics instance, see `dehyphenate_text`
+    - patches: write a patch sidecar with the edits to the text instead of the dehyphenated file, see `swedish_dehyphenator.patches`.
+      Not used with chunk_size.
+    - workers: number of worker processes to split a large text over, see `dehyphenate_text`. Not used with chunk_size.
+    """
+    if chunk_size:
+        with open_file(_file, 'r') as f, open_file(_output_file(_file, output_path), "w+", codec=output_codec(_file)) as o:
+            return dehyphenate_stream(read_chunks(f, chunk_size), o, wf_anf, selected, autojoined, log_results, dcounter, progbar=progbar, config=config, cache=cache, policy=policy, pending=pending, decisions=decisions, metrics=metrics)
+    _, pre_text = _read_source(_file, "txt_file")
+    resolved = {} if patches else None
+    result = dehyphenate_text(pre_text, wf_anf, selected, autojoined, log_results, dcounter, progbar=progbar, config=config, cache=cache, policy=policy, pending=pending, decisions=decisions, resolved=resolved, metrics=metrics, workers=workers)
+    if result is None:
+        return None
+    _text, dcounter = result
+    if patches:
+        _write_patches(_file, output_path, pre_text, resolved)
+    else:
+        _write_output(_file, "txt_file", output_path, None, _text)
+
+    return dcounter
+
+
+
+
+def _file_done(_file, file_pending, pending, manifest):
+    """
+    Merge the candidates deferred in a processed file into `pending` and record the file in the manifest, if there is one.
+    Files with deferred candidates are recorded as "deferred", so incremental runs process them again.
+    """
+    if file_pending:
+        for dash, n in file_pending.items():
+            pending[dash] = pending.get(dash, 0) + n
+    if manifest is not None:
+        manifest.record(_file, output_name(_file), status="deferred" if file_pending else "done")
+
+
+
+
+def dehyphenate_anf_dict(_files, wf_anf, selected, autojoined, output_path, log_results, dcounter, fcounter, config=None, cache=None, policy="ask", decisions=None, manifest=None, metrics=None, patches=False, workers=1):
     """
     Find dashes in anf dict text and potentially remove them.
 
@@ -261,17 +851,32 @@ def dehyphenate_anf_dict(_files, wf_anf, selected, autojoined, output_path, log_
     - dcounter: couter of hyphenation fixes
     - fcounter: file process counter
     - config: a config dict
+    - cache: a DecisionCache for automatic decisions, shared across files
+    - policy: "ask" to ask the user about ambiguous candidates, "defer" to leave them unchanged and report them
+    - decisions: dict of candidate: replacement settled beforehand, see `dehyphenate_text`
+    - manifest: a Manifest to record finished files in, for incremental runs
+    - metrics: a Metrics instance to count decisions and time stages and files in, see `swedish_dehyphenator.metrics`
+    - patches: write patch sidecars instead of dehyphenated files, see `swedish_dehyphenator.patches`
+    - workers: number of worker processes to split each large speech text over, see `dehyphenate_text`
     """
     progbar = tqdm(total=len(_files), desc="Files", position=0, leave=True)
     progbar.update(0)
-    for _file in _files:
+    pending = {} if policy == "defer" else None
+    for i, _file in enumerate(_files):
+        file_pending = {} if pending is not None else None
+        mark = metrics.mark() if metrics is not None else None
+        d = process_anf_dict(_file, wf_anf, selected, autojoined, output_path, log_results, dcounter, progbar=progbar, config=config, cache=cache, policy=policy, pending=file_pending, decisions=decisions, metrics=metrics, patches=patches, workers=workers)
+        if d is None:
+            _print("Aborted, {} files left unprocessed".format(len(_files) - i), progbar)
+            break
+        if metrics is not None:
+            metrics.file_done(_file, mark, d - dcounter)
         fcounter += 1
-        anfdict = parsejson(_file)
-        _text, dcounter = dehyphenate_text(anfdict['anforande']['anforandetext'], wf_anf, selected, autojoined, dcounter, progbar=progbar, config=config)
-        anftext_clean = _text.strip()
-        anfdict['anforande']['anforandetext'] = anftext_clean
-        savejson(f"{_file.split('/')[-1]}", output_path, anfdict)
+        dcounter = d
+        _file_done(_file, file_pending, pending, manifest)
     _print("We went through a total of {} dashwords!".format(dcounter), progbar)
+    if pending:
+        _print("{} candidates were left unresolved".format(len(pending)), progbar)
     if log_results:
         _log_results(selected, autojoined, config=config)
 
@@ -280,7 +885,7 @@ def dehyphenate_anf_dict(_files, wf_anf, selected, autojoined, output_path, log_
 
 
 
-def dehyphenate_txt_file(_files, wf_anf, selected, autojoined, output_path, log_results, dcounter, fcounter, config=None):
+def dehyphenate_txt_file(_files, wf_anf, selected, autojoined, output_path, log_results, dcounter, fcounter, config=None, cache=None, policy="ask", decisions=None, chunk_size=None, manifest=None, metrics=None, patches=False, workers=1):
     """
     Find dashes in text files and potentially remove them.
 
@@ -294,17 +899,33 @@ def dehyphenate_txt_file(_files, wf_anf, selected, autojoined, output_path, log_
     - dcounter: couter of hyphenation fixes
     - fcounter: file process counter
     - config: a config dict
+    - cache: a DecisionCache for automatic decisions, shared across files
+    - policy: "ask" to ask the user about ambiguous candidates, "defer" to leave them unchanged and report them
+    - decisions: dict of candidate: replacement settled beforehand, see `dehyphenate_text`
+    - chunk_size: stream files in chunks of this many characters instead of reading them whole
+    - manifest: a Manifest to record finished files in, for incremental runs
+    - metrics: a Metrics instance to count decisions and time stages and files in, see `swedish_dehyphenator.metrics`
+    - patches: write patch sidecars instead of dehyphenated files, see `swedish_dehyphenator.patches`
+    - workers: number of worker processes to split each large file over, see `dehyphenate_text`
     """
     progbar = tqdm(total=len(_files), desc="Files", position=0, leave=True)
     progbar.update(0)
-    for _file in _files:
+    pending = {} if policy == "defer" else None
+    for i, _file in enumerate(_files):
+        file_pending = {} if pending is not None else None
+        mark = metrics.mark() if metrics is not None else None
+        d = process_txt_file(_file, wf_anf, selected, autojoined, output_path, log_results, dcounter, progbar=progbar, config=config, cache=cache, policy=policy, pending=file_pending, decisions=decisions, chunk_size=chunk_size, metrics=metrics, patches=patches, workers=workers)
+        if d is None:
+            _print("Aborted, {} files left unprocessed".format(len(_files) - i), progbar)
+            break
+        if metrics is not None:
+            metrics.file_done(_file, mark, d - dcounter)
         fcounter += 1
-        with open(_file, 'r') as f:
-            pre_text = clean_anftext(f.read())
-        _text, dcounter = dehyphenate_text(pre_text, wf_anf, selected, autojoined, dcounter, progbar=progbar, config=config)
-        with open(f"{output_path}{_file.split('/')[-1]}", "w+") as o:
-            o.write(_text)
+        dcounter = d
+        _file_done(_file, file_pending, pending, manifest)
         progbar.update(1)
+    if pending:
+        _print("{} candidates were left unresolved".format(len(pending)), progbar)
     if log_results:
         _log_results(selected, autojoined, config=config)
 
@@ -313,12 +934,36 @@ def dehyphenate_txt_file(_files, wf_anf, selected, autojoined, output_path, log_
 
 
 
-def dehyphenate_from(input_path, source_type, wf_anf, selected, autojoined, output_path, log_results, dcounter, fcounter, config=None):
+def list_files(input_path, source_type=None, include=None, exclude=None, shard=None, compress=None):
+    """
+    Return the list of files to process: the files under input_path if it is a directory, recursively, otherwise input_path itself.
+    See `swedish_dehyphenator.discovery`.
+
+    Args:
+    - input_path: path to a file or a directory of files
+    - source_type: anf_dict or txt_file. If include is None, only files with that type's extension are listed.
+    - include: globs of files to list, e.g. ["*.json"]
+    - exclude: globs of files and directories to leave out
+    - shard: "i/N" or (i, N), to list only the files in shard i of N
+    - compress: the codec to write the outputs with, "gz", "xz" or "none", or None to use each input's own codec
+    """
+    if include is None and source_type is not None:
+        include = SOURCE_PATTERNS.get(source_type)
+    if isinstance(shard, str):
+        shard = parse_shard(shard)
+    if compress is not None and compress != "none" and compress not in CODECS:
+        raise ValueError(f"unknown codec {compress!r}, use one of {', '.join(CODECS)} or none")
+    return list(iter_files(input_path, include=include, exclude=exclude, shard=shard, compress=compress))
+
+
+
+
+def dehyphenate_from(input_path, source_type, wf_anf, selected, autojoined, output_path, log_results, dcounter, fcounter, config=None, cache=None, workers=1, policy="ask", decisions=None, chunk_size=None, incremental=False, recheck_decisions=False, io_threads=0, prefetch=None, metrics=None, include=None, exclude=None, shard=None, field=None, patches=False, compress=None):
     """
     Deyphenate text in files.
 
     Args:
-    - input_path: path to a directory of files to operate on
+    - input_path: path to a file, or a directory of files to operate on. Subdirectories are processed too, and mirrored in the output path.
     - source_type: tyope of files in the source directory (anf_dict or txt_file)
     - wf_anf: path to pickle, which is a word frequency dictionary with all words from parliamentary debates and their frequencies there: 'word': freq
     - selected: previously selected fixes,
@@ -328,24 +973,387 @@ def dehyphenate_from(input_path, source_type, wf_anf, selected, autojoined, outp
     - dcounter: couter of hyphenation fixes
     - fcounter: file process counter
     - config: a config dict
+    - cache: a DecisionCache for automatic decisions, shared across files
+    - workers: number of worker processes. With more than one, files are spread over a process pool (see `swedish_dehyphenator.parallel`),
+      or for jsonl, the records of each file. A single large file is split over the pool instead, see `dehyphenate_text`.
+    - policy: "ask" to ask the user about ambiguous candidates, "defer" to leave them unchanged and report them
+    - decisions: dict of candidate: replacement settled beforehand, e.g. in a review (see `swedish_dehyphenator.review`)
+    - chunk_size: stream txt_file inputs in chunks of this many characters instead of reading them whole
+    - incremental: keep a manifest in the output directory and skip files that were completed in an earlier run and haven't changed since.
+      An aborted run picks up where it stopped. See `swedish_dehyphenator.manifest`
+    - recheck_decisions: in an incremental run, also redo files that were processed with a different decision set
+    - io_threads: with one or more, read and write files in that many background threads while dehyphenating (see
+      `swedish_dehyphenator.pipeline`). Not used with workers, or when streaming with chunk_size.
+    - prefetch: number of files to read ahead with io_threads
+    - metrics: a Metrics instance to count decisions and time stages and files in, see `swedish_dehyphenator.metrics`
+    - include: globs of files to process. Defaults to the source type's extension, *.json, *.txt or *.jsonl.
+    - exclude: globs of files and directories to leave out
+    - shard: "i/N" or (i, N), to process only the files in shard i of N. Files are assigned to shards by a hash of their path
+      relative to input_path, so runs on separate machines can split a corpus between them.
+    - field: for jsonl, the dotted path of the text in each record, `anforande.anforandetext` by default. See `swedish_dehyphenator.jsonl`.
+    - patches: instead of the dehyphenated files, write a patch sidecar per file with the edits to its cleaned source text, which
+      `swedish_dehyphenator.patches.apply_patches` applies. For anf_dict and txt_file, without chunk_size.
+    - compress: "gz", "xz" or "none" to write all output with that codec. By default, each output is compressed like its input.
+      Compressed inputs, .gz or .xz, are always decompressed as they are read; see `swedish_dehyphenator.compression`.
 
     """
     _fns = {
         "anf_dict": dehyphenate_anf_dict,
         "txt_file": dehyphenate_txt_file,
     }
-    if os.path.isdir(input_path):
-        _files = [f"{input_path}/{_}" for _ in os.listdir(input_path)]
-    else:
-        _files = [input_path]
+    if patches and (source_type == "jsonl" or chunk_size):
+        raise ValueError("patches can only be written for anf_dict and txt_file sources, read whole")
+    if patches:
+        from swedish_dehyphenator.patches import PATCH_SUFFIX
+        # sidecars aren't compressed, so they are named after the input as it is
+        compress = None
+    _files = list_files(input_path, source_type, include=include, exclude=exclude, shard=shard, compress=compress)
+    # options that only apply to some source types
+    extra = {"chunk_size": chunk_size} if source_type == "txt_file" else {}
+    if patches:
+        extra["patches"] = True
+    if source_type == "jsonl":
+        from swedish_dehyphenator.jsonl import DEFAULT_FIELD, dehyphenate_jsonl
+        _fns["jsonl"] = dehyphenate_jsonl
+        # records, not files, are spread over the workers
+        extra = {"field": field or DEFAULT_FIELD, "workers": workers}
+        workers, io_threads = 1, 0
+    manifest = None
+    if incremental:
+        manifest = Manifest(output_path, decision_version(selected, autojoined), recheck_decisions=recheck_decisions,
+                            suffix=PATCH_SUFFIX if patches else "")
+        todo = [_file for _file in _files if not manifest.is_done(_file, output_name(_file))]
+        if len(todo) < len(_files):
+            _print("Skipping {} files that are already done".format(len(_files) - len(todo)), None)
+        _files = todo
 
-    fcounter, dcounter = _fns[source_type](_files, wf_anf, selected, autojoined, output_path, log_results, dcounter, fcounter, config=config)
+    try:
+        if workers > 1 and len(_files) > 1:
+            from swedish_dehyphenator.parallel import dehyphenate_parallel
+            return dehyphenate_parallel(_files, source_type, wf_anf, selected, autojoined, output_path, log_results, dcounter, fcounter, workers, config=config, cache=cache, policy=policy, decisions=decisions, manifest=manifest, metrics=metrics, **extra)
+        if io_threads > 0 and not chunk_size:
+            from swedish_dehyphenator.pipeline import dehyphenate_pipelined
+            return dehyphenate_pipelined(_files, source_type, wf_anf, selected, autojoined, output_path, log_results, dcounter, fcounter, io_threads, prefetch=prefetch, config=config, cache=cache, policy=policy, decisions=decisions, manifest=manifest, metrics=metrics, patches=patches)
+        if source_type != "jsonl":
+            # with a single file, its text is split over the workers instead
+            extra["workers"] = workers
+        fcounter, dcounter = _fns[source_type](_files, wf_anf, selected, autojoined, output_path, log_results, dcounter, fcounter, config=config, cache=cache, policy=policy, decisions=decisions, manifest=manifest, metrics=metrics, **extra)
+    finally:
+        if manifest is not None:
+            manifest.close()
 
     return fcounter, dcounter
 
 
 
 
+def load_resources(autojoined=None, selected=None, store=None, wf_anf=None, log_results=True):
+    """
+    Load the word frequency lexicon and previous decisions. Returns (wf_anf, selected, autojoined, store), where store is an open DecisionStore or None.
+
+    Args:
+    - autojoined: path to autojoined.pickle, a list of previous automatic fixes based on heuristic
+    - selected: path to selected.pickle, a list of previously selected fixes
+    - store: path to a decision store database, used instead of the selected and autojoined pickles. A new store is seeded from those pickles.
+    - wf_anf: path to a word frequency lexicon, json file or pickle. An already loaded lexicon is returned as is.
+    - log_results: bool -- whether decisions will be saved
+    """
+    if store is not None:
+        seed = not os.path.exists(store)
+        store = DecisionStore(store, batch_size=256 if log_results else None)
+        if seed:
+            store.import_pickles(selected, autojoined)
+        autojoined = store.autojoined
+        selected = store.selected
+    else:
+        try:
+            with open(autojoined, 'rb') as f:
+                autojoined = pickle.load(f)
+        except:
+            autojoined = []
+        try:
+            with open(selected, 'rb') as f:
+                selected = pickle.load(f)
+        except:
+            selected = []
+    if wf_anf is None or isinstance(wf_anf, str):
+        wf_anf = load_wf(wf_anf)
+        if wf_anf is None:
+            wf_anf = load_wf('wf_anf.pickle')
+
+    return wf_anf, selected, autojoined, store
+
+
+
+
+def _batches(items, batch_size):
+    """
+    Yield lists of up to batch_size items from an iterable.
+    """
+    items = iter(items)
+    while True:
+        batch = list(islice(items, batch_size))
+        if not batch:
+            return
+        yield batch
+
+
+
+
+def _chunksize(n, workers, per_worker=8, limit=64):
+    """
+    Return the chunksize for spreading n items over a pool: about per_worker chunks for each worker, and at most limit items
+    in a chunk, so the work still evens out when files differ in size. None means no limit.
+    """
+    size = n // (workers * per_worker)
+    if limit is not None:
+        size = min(limit, size)
+    return max(1, size)
+
+
+
+
+def _prepare_text(_text):
+    """
+    Clean a text and count its candidates. Runs in pool workers for `_dehyphenate_many`.
+    """
+    _text = clean_anftext(_text)
+    return _text, Counter(find_candidates(_text))
+
+
+
+
+def _substitute_text(item):
+    return substitute_candidates(*item)
+
+
+
+
+def _dehyphenate_many(texts, wf, selected, autojoined, log_results, config=None, cache=None, policy="ask", pending=None, decisions=None, metrics=None,
+                      workers=1, batch_size=1024, quiet=True, progbar=None, lock=None):
+    """
+    Dehyphenate an iterable of strings in batches and yield a (text, fixes) tuple for each, in order. Each distinct candidate is
+    decided once for the whole call. Stops early if the user aborts. See `Dehyphenator.dehyphenate_many`.
+
+    Args:
+    - texts: an iterable of raw strings
+    - wf: word frequency dictionary: 'word': freq
+    - selected: previously selected fixes
+    - autojoined: auomatic fixes based on heuristic
+    - log_results: to log or not to log
+    - config: a config dict
+    - cache: a DecisionCache for automatic decisions
+    - policy: "ask" or "defer", see `dehyphenate_text`
+    - pending: dict of deferred candidate: number of occurrences, updated in place
+    - decisions: dict of candidate: replacement settled beforehand, see `dehyphenate_text`
+    - metrics: a Metrics instance to count decisions per rule in
+    - workers: number of worker processes to clean texts and substitute candidates in. Decisions are always made here.
+    - batch_size: number of texts to take at a time
+    - quiet: leave out the per-candidate messages
+    - progbar: progress bar instance
+    - lock: a lock to hold while deciding, for callers shared between threads
+    """
+    if workers > 1:
+        from multiprocessing import Pool
+        pool = Pool(workers)
+        def _submit(fn, items):
+            return pool.map_async(fn, items, chunksize=_chunksize(len(items), workers, per_worker=4, limit=None)).get
+    else:
+        pool = None
+        def _submit(fn, items):
+            return lambda: list(map(fn, items))
+    if lock is None:
+        lock = nullcontext()
+
+    memo = {}
+    batches = _batches(texts, batch_size)
+    try:
+        batch = next(batches, None)
+        job = _submit(_prepare_text, batch) if batch is not None else None
+        while job is not None:
+            prepared = job()
+            # Clean the next batch while this one is decided
+            batch = next(batches, None)
+            job = _submit(_prepare_text, batch) if batch is not None else None
+            with lock:
+                for _, counts in prepared:
+                    for dash in counts:
+                        if dash in memo:
+                            continue
+                        if decisions is not None and dash in decisions:
+                            newdash, rule = decisions[dash], "decided"
+                            selected.append(newdash.lower())
+                        else:
+                            result = resolve_candidate(dash, wf, selected, autojoined, log_results, progbar=progbar, config=config,
+                                                       cache=cache, policy=policy, quiet=quiet)
+                            if result is None:
+                                return
+                            newdash, rule = result
+                        if metrics is not None:
+                            metrics.rules[rule] += 1
+                        if rule == "deferred":
+                            memo[dash] = None
+                        else:
+                            memo[dash] = newdash
+                items, fixes = [], []
+                for _text, counts in prepared:
+                    replacements = {}
+                    for dash, n in counts.items():
+                        if memo[dash] is None:
+                            if pending is not None:
+                                pending[dash] = pending.get(dash, 0) + n
+                        else:
+                            replacements[dash] = memo[dash]
+                    items.append((_text, replacements))
+                    fixes.append(len(replacements))
+                    if metrics is not None:
+                        metrics.chars += len(_text)
+            yield from zip(_submit(_substitute_text, items)(), fixes)
+    finally:
+        if pool is not None:
+            pool.terminate()
+            pool.join()
+
+
+
+
+class Dehyphenator:
+    """
+    A de-hyphenator that loads the word frequency lexicon and previous decisions once, for dehyphenating many texts.
+
+    By default, candidates that need a human decision are left as they are and collected in `pending`, so no call waits for input.
+    Instances can be shared between threads; calls are serialised with a lock. Decisions learned along the way are kept in memory,
+    or buffered in the decision store, until `flush` is called.
+
+    Args:
+    - wf_anf: path to a word frequency lexicon, json file or pickle, or an already loaded lexicon
+    - selected: path to selected.pickle, a list of previously selected fixes
+    - autojoined: path to autojoined.pickle, a list of previous automatic fixes based on heuristic
+    - store: path to a decision store database, used instead of the selected and autojoined pickles. A new store is seeded from those pickles.
+    - config: a config dict
+    - cache: a DecisionCache for automatic decisions; a new one with cache_size entries is created if None
+    - cache_size: size of the new decision cache
+    - policy: "defer" to leave ambiguous candidates unchanged and collect them in `pending`, "ask" to ask the user about them
+    - decisions: dict of candidate: replacement settled beforehand, e.g. in a review (see `swedish_dehyphenator.review`)
+    - log_results: bool -- whether learned decisions are saved, by `flush` and when the decision store is closed. Pickled decisions
+      are written back to the selected and autojoined paths, or those in the config; without them, nothing is saved.
+    - metrics: a Metrics instance to count decisions and time stages in, see `swedish_dehyphenator.metrics`
+    """
+
+    def __init__(self, wf_anf=None, selected=None, autojoined=None, store=None, config=None, cache=None, cache_size=65536, policy="defer",
+                 decisions=None, log_results=True, metrics=None):
+        self._owns_wf = wf_anf is None or isinstance(wf_anf, str)
+        self.wf, self.selected, self.autojoined, self.store = load_resources(autojoined, selected, store, wf_anf, log_results)
+        # The pickles are written back where they were read from, so saving never has to ask for a path
+        self.config = dict(config) if config is not None else {}
+        for key, path in (("selected_path", selected), ("autojoined_path", autojoined)):
+            if path is not None:
+                self.config[key] = path
+        log_results = log_results and (self.store is not None or self._has_paths())
+        self.cache = cache if cache is not None else DecisionCache(maxsize=cache_size)
+        self.policy = policy
+        self.decisions = decisions
+        self.log_results = log_results
+        self.metrics = metrics
+        self.dcounter = 0
+        self.pending = {}
+        self._lock = threading.RLock()
+
+
+    def dehyphenate(self, text, workers=1):
+        """
+        Dehyphenate a string and return the result. Deferred candidates are added to `pending`, and fixes are counted in `dcounter`.
+        If the user aborts (with the "ask" policy), the text is returned as it was.
+
+        Args:
+        - text: a raw string to dehyphenate
+        - workers: number of worker processes to split a large text over, see `dehyphenate_text`
+        """
+        with self._lock:
+            result = dehyphenate_text(text, self.wf, self.selected, self.autojoined, self.log_results, self.dcounter, config=self.config, cache=self.cache,
+                                      policy=self.policy, pending=self.pending, decisions=self.decisions, metrics=self.metrics, workers=workers)
+            if result is None:
+                return text
+            text, self.dcounter = result
+            return text
+
+
+    def dehyphenate_many(self, texts, workers=1, batch_size=1024, quiet=True):
+        """
+        Dehyphenate an iterable of strings, e.g. a list or a dataframe column, and yield a (text, fixes) tuple for each, in order.
+        Texts are taken in batches. Each distinct candidate is decided once for the whole call, however many texts it occurs in;
+        the results and counts are the same as calling `dehyphenate` on each text in turn, except that a candidate the user chose
+        to keep isn't asked about again. If the user aborts (with the "ask" policy), the generator stops.
+
+        Args:
+        - texts: an iterable of raw strings
+        - workers: number of worker processes to clean texts and substitute candidates in. Decisions are always made here.
+        - batch_size: number of texts to take at a time
+        - quiet: leave out the per-candidate messages
+        """
+        for _text, fixes in _dehyphenate_many(texts, self.wf, self.selected, self.autojoined, self.log_results, config=self.config, cache=self.cache,
+                                              policy=self.policy, pending=self.pending, decisions=self.decisions, metrics=self.metrics,
+                                              workers=workers, batch_size=batch_size, quiet=quiet, lock=self._lock):
+            with self._lock:
+                self.dcounter += fixes
+            yield _text, fixes
+
+
+    def dehyphenate_files(self, input_path, source_type, output_path, **options):
+        """
+        Dehyphenate files with `dehyphenate_from` and write them to the output path. Returns (number of files, number of fixes).
+
+        Args:
+        - input_path: path to a file or a directory of files
+        - source_type: anf_dict or txt_file
+        - output_path: where to write output
+        - options: further options for `dehyphenate_from`, e.g. workers, chunk_size, incremental or io_threads
+        """
+        with self._lock:
+            fcounter, dcounter = dehyphenate_from(input_path, source_type, self.wf, self.selected, self.autojoined, output_path, self.log_results, 0, 0,
+                                                  config=self.config, cache=self.cache, policy=self.policy, decisions=self.decisions, metrics=self.metrics, **options)
+            self.dcounter += dcounter
+            return fcounter, dcounter
+
+
+    def _has_paths(self):
+        return self.config.get("selected_path") is not None and self.config.get("autojoined_path") is not None
+
+
+    def flush(self):
+        """
+        Save the decisions learned so far: write them to the decision store, or pickle them to the selected and autojoined paths if
+        there is none. Raises ValueError if there is neither.
+        """
+        with self._lock:
+            if self.store is None and not self._has_paths():
+                raise ValueError("no decision store or selected and autojoined paths to save decisions to")
+            _log_results(self.selected, self.autojoined, config=self.config)
+
+
+    def close(self):
+        """
+        Close the decision store, writing buffered decisions if log_results is set, and the lexicon if it was loaded here.
+        Pickled decisions aren't written; call `flush` first to save them.
+        """
+        with self._lock:
+            if self.store is not None:
+                self.store.close(flush=self.log_results)
+                self.store = None
+            if self._owns_wf and hasattr(self.wf, "close"):
+                self.wf.close()
+
+
+    def __enter__(self):
+        return self
+
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+
+
 def dehyphenate(input_string=None,
                 autojoined=None,
                 selected=None,
@@ -354,9 +1362,26 @@ def dehyphenate(input_string=None,
                 source_type=None,
                 wf_anf=None,
                 log_results=True,
-                config=None):
+                config=None,
+                cache=None,
+                store=None,
+                workers=1,
+                policy="ask",
+                decisions=None,
+                chunk_size=None,
+                incremental=False,
+                recheck_decisions=False,
+                io_threads=0,
+                prefetch=None,
+                metrics=None,
+                include=None,
+                exclude=None,
+                shard=None,
+                field=None,
+                patches=False,
+                compress=None):
     """
-    Main dehyphenator program.
+    Main dehyphenator program, a one-off use of `Dehyphenator`.
 
     Args:
     - input_string: a raw string to dehyphenate
@@ -364,35 +1389,67 @@ def dehyphenate(input_string=None,
     - selected: path to selected.pickle, a list of previously selected fixes
     - input_path: input path
     - output_path: output path
-    - wf_anf: path to pickle, which is a word frequency dictionary with all words from parliamentary debates and their frequencies there: 'word': freq
+    - wf_anf: path to a word frequency lexicon (built with `config-swe-dehyph build_lexicon`), json file or pickle, with all words from parliamentary debates and their frequencies there: 'word': freq. An already loaded lexicon is used as is.
     - log_results: bool -- save results or nah
+    - config: a config dict
+    - cache: a DecisionCache to reuse across calls; a new one is created if None
+    - store: path to a decision store database, used instead of the selected and autojoined pickles. A new store is seeded from those pickles.
+    - workers: number of worker processes to spread input files over
+    - policy: "ask" to ask the user about ambiguous candidates, "defer" to leave them unchanged and report them
+    - decisions: dict of candidate: replacement settled beforehand, e.g. in a review (see `swedish_dehyphenator.review`)
+    - chunk_size: stream txt_file inputs in chunks of this many characters instead of reading them whole
+    - incremental: skip files that an earlier run into the same output path completed, and resume aborted runs
+    - recheck_decisions: with incremental, also redo files processed with a different decision set
+    - io_threads: number of threads to read and write files in the background, 0 to read and write in turn
+    - prefetch: number of files to read ahead with io_threads
+    - metrics: a Metrics instance to count decisions and time stages and files in, see `swedish_dehyphenator.metrics`
+    - include: globs of input files to process, by default those with the source type's extension
+    - exclude: globs of input files and directories to leave out
+    - shard: "i/N", to process only shard i of N of the input files
+    - field: for jsonl input, the dotted path of the text in each record
+    - patches: write a patch sidecar per file with the edits to its cleaned source text instead of the dehyphenated files
+    - compress: "gz", "xz" or "none" to write all output with that codec, by default each output is compressed like its input
     """
-    dcounter = 0
-    fcounter = 0
-    try:
-        with open(autojoined, 'rb') as f:
-            autojoined = pickle.load(f)
-    except:
-        autojoined = []
+    dehyphenator = Dehyphenator(wf_anf=wf_anf, selected=selected, autojoined=autojoined, store=store, config=config, cache=cache, policy=policy,
+                                decisions=decisions, log_results=log_results, metrics=metrics)
     try:
-        with open(selected, 'rb') as f:
-            selected = pickle.load(f)
-    except:
-        selected = []
-    try:
-        with open('wf_anf.pickle', 'rb') as f:
-            wf_anf = pickle.load(f)
-    except:
-        wf_anf = None
-
-    if input_string is not None:
-        output_string, dcounter = dehyphenate_text(input_string, wf_anf, selected, autojoined, log_results, dcounter, config=config)
-        if log_results:
-            _log_results(selected, autojoined, config=config)
-        return output_string, dcounter, fcounter
-    else:
-        fcounter, dcounter = dehyphenate_from(input_path, source_type, wf_anf, selected, autojoined, output_path, log_results, dcounter, fcounter, config=config)
+        if input_string is not None:
+            output_string = dehyphenator.dehyphenate(input_string)
+            if dehyphenator.log_results:
+                dehyphenator.flush()
+            return output_string, dehyphenator.dcounter, 0
+        fcounter, dcounter = dehyphenator.dehyphenate_files(input_path, source_type, output_path, workers=workers, chunk_size=chunk_size, incremental=incremental,
+                                                            recheck_decisions=recheck_decisions, io_threads=io_threads, prefetch=prefetch,
+                                                            include=include, exclude=exclude, shard=shard, field=field, patches=patches, compress=compress)
         return None, dcounter, fcounter
+    finally:
+        dehyphenator.close()
+
+
+
+def dehyphenate_many(texts, autojoined=None, selected=None, wf_anf=None, store=None, config=None, policy="defer", decisions=None, log_results=True, workers=1, batch_size=1024):
+    """
+    Dehyphenate an iterable of strings and yield a (text, fixes) tuple for each, in order. A one-off use of `Dehyphenator.dehyphenate_many`;
+    learned decisions are saved once all texts are done, if there is a decision store or pickle paths to save them to.
+
+    Args:
+    - texts: an iterable of raw strings
+    - autojoined: path to autojoined.pickle, a list of previous automatic fixes based on heuristic
+    - selected: path to selected.pickle, a list of previously selected fixes
+    - wf_anf: path to a word frequency lexicon, json file or pickle, or an already loaded lexicon
+    - store: path to a decision store database, used instead of the selected and autojoined pickles
+    - config: a config dict
+    - policy: "defer" to leave ambiguous candidates unchanged, "ask" to ask the user about them
+    - decisions: dict of candidate: replacement settled beforehand
+    - log_results: bool -- save learned decisions
+    - workers: number of worker processes to clean texts and substitute candidates in
+    - batch_size: number of texts to take at a time
+    """
+    with Dehyphenator(wf_anf=wf_anf, selected=selected, autojoined=autojoined, store=store, config=config, policy=policy, decisions=decisions,
+                      log_results=log_results) as dehyphenator:
+        yield from dehyphenator.dehyphenate_many(texts, workers=workers, batch_size=batch_size)
+        if dehyphenator.log_results:
+            dehyphenator.flush()
 
 
 
@@ -411,9 +1468,157 @@ def cli():
                         help="Input path")
     read_from.add_argument("-s", "--source-type",
                         type=str,
-                        choices=["anf_dict", "txt_file"],
+                        choices=["anf_dict", "txt_file", "jsonl"],
                         required=True,
-                        help="What kind of data do you want to dehyphenate? anf_dict: reads json files of statement dictionaries from the input path. txt_file: reads data from text files. For anf_dict and string_from_file, when input path is a file, the program will process the file, if it is a directory, the files in that directory will be processed.")
+                        help="What kind of data do you want to dehyphenate? anf_dict: reads json files of statement dictionaries from the input path. txt_file: reads data from text files. jsonl: reads JSON Lines files with one statement dictionary per line. For anf_dict and string_from_file, when input path is a file, the program will process the file, if it is a directory, the files in that directory will be processed.")
+    read_from.add_argument("-w", "--workers",
+                        type=int,
+                        default=1,
+                        help="Number of worker processes to spread files over, or for jsonl the records of each file. A single large txt_file or anf_dict file is split over them instead. Ambiguous candidates in txt_file and anf_dict files are asked about once all files are processed; aborting then keeps the output and the answers given so far.")
+    read_from.add_argument("--chunk-size",
+                        type=int,
+                        default=None,
+                        help="Stream txt_file inputs in chunks of this many characters instead of reading whole files into memory")
+
+    scan = subparsers.add_parser("scan", help="run the automatic rules over files and write the candidates that need a decision to a review queue")
+    review = subparsers.add_parser("review", help="decide about each candidate in a review queue once")
+    apply = subparsers.add_parser("apply", help="dehyphenate files unattended, using the decisions in a review queue")
+    build_wf = subparsers.add_parser("build-wf", help="count the words in a corpus and write the word frequency table")
+    freeze = subparsers.add_parser("freeze", help="write the decisions for a corpus, from the rules and a review queue, to a frozen table")
+    apply_table = subparsers.add_parser("apply-table", help="dehyphenate files from a frozen table only, without the lexicon or any questions")
+    apply_patches = subparsers.add_parser("apply-patches", help="apply the patch sidecars written with --patches to their source files")
+    train_ngram = subparsers.add_parser("train-ngram", help="train the n-gram model that decides review queue candidates, from the word frequency lexicon (needs NumPy)")
+    train_ngram.add_argument("-m", "--model",
+                        type=str,
+                        required=True,
+                        help="Where to write the model, an .npz file")
+    train_ngram.add_argument("--max-examples",
+                        type=int,
+                        default=100000,
+                        help="The largest number of training examples of each kind, hyphenated and not")
+    train_ngram.set_defaults(program="train-ngram")
+    scan.add_argument("-m", "--model",
+                        type=str,
+                        default=None,
+                        help="An n-gram model from train-ngram. Candidates it is confident about are decided in the queue, the rest are left for review.")
+    scan.add_argument("--threshold",
+                        type=float,
+                        default=0.9,
+                        help="With --model, the confidence between 0.5 and 1 that the model needs to decide a candidate")
+    for sub in (scan, apply, build_wf, freeze, apply_table, apply_patches):
+        sub.add_argument("-i", "--input_path",
+                        type=str,
+                        required=True,
+                        help="Input path")
+        sub.add_argument("-s", "--source-type",
+                        type=str,
+                        choices=["anf_dict", "txt_file", "jsonl"],
+                        required=True,
+                        help="What kind of data do you want to dehyphenate? See `read_from`.")
+        sub.add_argument("-w", "--workers",
+                        type=int,
+                        default=1,
+                        help="Number of worker processes to spread files over")
+    apply.add_argument("--chunk-size",
+                        type=int,
+                        default=None,
+                        help="Stream txt_file inputs in chunks of this many characters instead of reading whole files into memory")
+    for sub in (read_from, apply):
+        sub.add_argument("--incremental",
+                        action="store_true",
+                        help="Keep a manifest in the output directory, skip files that are already done and resume aborted runs")
+        sub.add_argument("--recheck-decisions",
+                        action="store_true",
+                        help="With --incremental, also redo files that were processed with a different decision set")
+        sub.add_argument("--io-threads",
+                        type=int,
+                        default=0,
+                        help="Read and write files in this many background threads while dehyphenating. Useful on network file systems.")
+        sub.add_argument("--prefetch",
+                        type=int,
+                        default=None,
+                        help="With --io-threads, the number of files to read ahead (default: twice --io-threads)")
+        sub.add_argument("--patches",
+                        action="store_true",
+                        help="Write a patch sidecar per file with the edits to its cleaned source text, instead of the dehyphenated files. For anf_dict and txt_file.")
+    build_wf.add_argument("--wf-out",
+                        type=str,
+                        default=None,
+                        help="Where to write the word frequency table (default: the configured wf_path)")
+    build_wf.add_argument("--merge",
+                        action="store_true",
+                        help="Add the counts to the table already at --wf-out, so only new data has to be counted")
+    build_wf.add_argument("--overwrite",
+                        action="store_true",
+                        help="Replace the table at --wf-out if there is one")
+    build_wf.set_defaults(program="build-wf")
+    freeze.add_argument("-q", "--queue",
+                        type=str,
+                        default=None,
+                        help="A review queue whose decisions are added to the table, ahead of the rules")
+    for sub in (freeze, apply_table):
+        sub.add_argument("--table",
+                        type=str,
+                        required=True,
+                        help="Path to the frozen table, a json file of candidate: replacement")
+        sub.add_argument("--report",
+                        type=str,
+                        default=None,
+                        help="Write the candidates that the table leaves undecided to this review queue file")
+    freeze.set_defaults(program="freeze")
+    apply_table.set_defaults(program="apply-table")
+    apply_patches.add_argument("-p", "--patch-path",
+                        type=str,
+                        required=True,
+                        help="The directory with the patch sidecars, the output path of the --patches run")
+    apply_patches.set_defaults(program="apply-patches")
+    for sub in (read_from, apply, apply_table, apply_patches):
+        sub.add_argument("--compress",
+                        type=str,
+                        choices=["gz", "xz", "none"],
+                        default=None,
+                        help="Compress the output files with this codec, or none. By default each output is compressed like its input. Compressed inputs (.gz, .xz) are always read.")
+    for sub in (read_from, scan, apply, build_wf, freeze, apply_table, apply_patches):
+        sub.add_argument("--include",
+                        type=str,
+                        nargs="+",
+                        default=None,
+                        help="Globs of input files to process, matched against file names and paths relative to the input path (default: *.json for anf_dict, *.txt for txt_file)")
+        sub.add_argument("--exclude",
+                        type=str,
+                        nargs="+",
+                        default=None,
+                        help="Globs of input files and directories to leave out")
+        sub.add_argument("--field",
+                        type=str,
+                        default=None,
+                        help="For jsonl, the dotted path of the text in each record (default: anforande.anforandetext)")
+        sub.add_argument("--shard",
+                        type=parse_shard,
+                        default=None,
+                        help="Process only shard i of N of the input files, given as i/N. Files are assigned to shards by a hash of their relative path.")
+    for sub in (scan, review, apply):
+        sub.add_argument("-q", "--queue",
+                        type=str,
+                        default="review_queue.jsonl",
+                        help="Path to the review queue file")
+    serve = subparsers.add_parser("serve", help="keep the lexicon and decisions loaded and answer requests over a Unix socket or localhost HTTP")
+    serve.add_argument("--socket",
+                        type=str,
+                        default=None,
+                        help="Path of a Unix socket to listen on")
+    serve.add_argument("--host",
+                        type=str,
+                        default="127.0.0.1",
+                        help="Address to listen on for HTTP")
+    serve.add_argument("--port",
+                        type=int,
+                        default=8765,
+                        help="Port to listen on for HTTP, if no --socket is given")
+    serve.set_defaults(program="serve")
+    scan.set_defaults(program="scan")
+    review.set_defaults(program="review")
+    apply.set_defaults(program="apply")
 
     read_raw = subparsers.add_parser("raw", help="Dehyphenate raw input")
     read_raw.add_argument("input_string",
@@ -428,7 +1633,7 @@ def cli():
     parser.add_argument("--wf-anf",
                         type=str,
                         default=None,
-                        help="a pickled word frequency dictionary with all words from parliamentary debates and their frequencies there: 'word': freq")
+                        help="a word frequency lexicon, json file or pickle with all words from parliamentary debates and their frequencies there: 'word': freq. Defaults to the configured lexicon_path if it has been built, otherwise wf_path")
     parser.add_argument("--autojoined",
                         type=str,
                         default=None,
@@ -437,16 +1642,40 @@ def cli():
                         type=str,
                         default=None,
                         help="a pickle of previously selected corrections")
+    parser.add_argument("--store",
+                        type=str,
+                        default=None,
+                        help="a decision store database, used instead of the selected and autojoined pickles")
     parser.add_argument("--log-results", type=bool, default=True)
+    parser.add_argument("--cache-size",
+                        type=int,
+                        default=65536,
+                        help="Maximum number of automatic decisions to remember across files (0 disables the cache)")
+    parser.add_argument("--quiet",
+                        action="store_true",
+                        help="Don't print a message for every candidate and rule decision, only count them. Candidates that need a decision are still shown.")
+    parser.add_argument("--metrics",
+                        type=str,
+                        default=None,
+                        help="Write decisions per rule, time per stage and per-file timings to this file: JSON Lines if it ends in .jsonl, otherwise JSON")
+    parser.add_argument("--profile",
+                        type=str,
+                        default=None,
+                        help="Write cProfile stats for the run to this file (worker processes aren't profiled)")
 
     args = parser.parse_args()
     config, conf_loc = fetch_config()
     if args.wf_anf is None:
-        args.wf_anf = config["wf_path"]
+        if config.get("lexicon_path") and os.path.isfile(config["lexicon_path"]):
+            args.wf_anf = config["lexicon_path"]
+        else:
+            args.wf_anf = config["wf_path"]
     if args.autojoined is None:
         args.autojoined = config["autojoined_path"]
     if args.selected is None:
         args.selected = config["selected_path"]
+    if args.store is None:
+        args.store = config.get("store_path")
 
     try:
         if os.path.isdir(args.input_path) and not args.input_path.endswith("/"):
@@ -455,9 +1684,111 @@ def cli():
         pass
     if os.path.isdir(args.output_path) and not args.output_path.endswith("/"):
         args.output_path = f"{args.output_path}/"
-    output_string, d, f = dehyphenate(**vars(args))
+    args.cache = DecisionCache(maxsize=args.cache_size)
+    del args.cache_size
+    metrics_path, profile_path = args.metrics, args.profile
+    args.metrics = Metrics(quiet=args.quiet) if args.quiet or metrics_path is not None else None
+    del args.quiet, args.profile
+    program = vars(args).pop("program", None)
+    if program == "serve":
+        from swedish_dehyphenator.server import serve
+        dehyphenator = Dehyphenator(wf_anf=args.wf_anf, selected=args.selected, autojoined=args.autojoined, store=args.store, config=config, cache=args.cache,
+                                    policy="defer", log_results=args.log_results, metrics=Metrics(quiet=True))
+        serve(dehyphenator, socket_path=args.socket, host=args.host, port=args.port)
+        return
+    if program == "build-wf":
+        from swedish_dehyphenator.wordfreq import build_wf
+        wf_out = os.path.expanduser(args.wf_out or config["wf_path"])
+        if os.path.exists(wf_out) and not (args.merge or args.overwrite):
+            parser.error(f"{wf_out} already exists, use --merge to add to it or --overwrite to replace it")
+        _files = list_files(args.input_path, args.source_type, include=args.include, exclude=args.exclude, shard=args.shard)
+        wf = build_wf(_files, args.source_type, wf_out, merge=args.merge, field=args.field, workers=args.workers)
+        print(f"Counted {len(_files)} files, the table at {wf_out} now holds {len(wf)} words")
+        if config.get("lexicon_path") and os.path.isfile(config["lexicon_path"]):
+            print("Run `config-swe-dehyph build_lexicon` to rebuild the compact lexicon from it")
+        return
+    if program in ("freeze", "apply-table"):
+        from swedish_dehyphenator import frozen
+        from swedish_dehyphenator.review import write_queue
+        _files = list_files(args.input_path, args.source_type, include=args.include, exclude=args.exclude, shard=args.shard,
+                            compress=getattr(args, "compress", None))
+        if program == "freeze":
+            wf_anf, selected, autojoined, store = load_resources(args.autojoined, args.selected, args.store, args.wf_anf, log_results=False)
+            table, unknown = frozen.freeze_table(_files, args.source_type, wf_anf, selected, autojoined, queue_path=args.queue, cache=args.cache,
+                                                 workers=args.workers, field=args.field)
+            frozen.save_table(table, args.table)
+            if store is not None:
+                store.close(flush=False)
+            print(f"{len(table)} decisions written to {args.table}, {len(unknown)} candidates are undecided")
+        else:
+            f, d, unknown = frozen.apply_files(_files, args.source_type, frozen.load_table(args.table), args.output_path, field=args.field,
+                                               workers=args.workers, report=args.report is not None)
+            print(f"{d} hyphens removed in {f} files")
+        if args.report is not None:
+            write_queue(unknown, args.report)
+            print(f"{len(unknown)} undecided candidates written to {args.report}")
+        return
+    if program == "apply-patches":
+        from swedish_dehyphenator.patches import apply_patches
+        if args.source_type == "jsonl":
+            parser.error("patches are only written for anf_dict and txt_file sources")
+        _files = list_files(args.input_path, args.source_type, include=args.include, exclude=args.exclude, shard=args.shard, compress=args.compress)
+        f, d, missing = apply_patches(_files, args.source_type, args.patch_path, args.output_path, workers=args.workers)
+        print(f"{d} edits applied to {f} files, {missing} files have no patch")
+        return
+    if program == "train-ngram":
+        from swedish_dehyphenator.lexicon import load_wf
+        from swedish_dehyphenator.ngram import train_model
+        wf_anf = load_wf(args.wf_anf)
+        if wf_anf is None:
+            parser.error(f"can't read the word frequency lexicon at {args.wf_anf}")
+        model, accuracy = train_model(wf_anf, max_examples=args.max_examples)
+        model.save(args.model)
+        print(f"Model written to {args.model}, {accuracy:.1%} of the training examples are classified right")
+        return
+    if program in ("scan", "review"):
+        from swedish_dehyphenator import review
+        if program == "scan":
+            if args.model is not None and not 0.5 <= args.threshold <= 1:
+                parser.error("--threshold must be between 0.5 and 1")
+            wf_anf, selected, autojoined, store = load_resources(args.autojoined, args.selected, args.store, args.wf_anf, log_results=False)
+            queue = review.scan_files(list_files(args.input_path, args.source_type, include=args.include, exclude=args.exclude, shard=args.shard), args.source_type, wf_anf, selected, autojoined, cache=args.cache, workers=args.workers, field=args.field)
+            if args.model is not None:
+                from swedish_dehyphenator.ngram import NgramModel, resolve_queue
+                decided = resolve_queue(queue, NgramModel.load(args.model), threshold=args.threshold)
+                print(f"{decided} candidates decided by the n-gram model")
+            review.write_queue(queue, args.queue)
+            print(f"{sum(entry['decision'] is None for entry in queue.values())} candidates need a decision, written to {args.queue}")
+        else:
+            store = DecisionStore(args.store) if args.store is not None else None
+            answered = review.review_queue(args.queue, selected=store.selected if store is not None else None)
+            print(f"{answered} candidates decided, saved to {args.queue}")
+        if store is not None:
+            store.close(flush=program == "review")
+        return
+    if program == "apply":
+        from swedish_dehyphenator.review import queue_decisions, read_queue
+        args.decisions = queue_decisions(read_queue(args.queue))
+        args.policy = "defer"
+        del args.queue
+    if profile_path is not None:
+        import cProfile
+        profiler = cProfile.Profile()
+        profiler.enable()
+    try:
+        output_string, d, f = dehyphenate(**vars(args))
+    finally:
+        if profile_path is not None:
+            profiler.disable()
+            profiler.dump_stats(profile_path)
+    if metrics_path is not None:
+        args.metrics.write(metrics_path)
     if output_string is None:
         print(f"{d} hyphens removed in {f} files")
     else:
         print(output_string)
+    info = args.cache.info()
+    print(f"Decision cache: {info.hits} hits, {info.misses} misses, {info.currsize} entries", file=sys.stderr)
+    if args.metrics is not None:
+        print("Decisions per rule: {}".format(", ".join(f"{rule} {n}" for rule, n in args.metrics.rules.most_common())), file=sys.stderr)
 
@@ -0,0 +1,140 @@
+#!/usr/bin/env python3
+"""
+Build the word frequency table from a corpus.
+
+Texts are cleaned like before dehyphenation, the candidates for dehyphenation ('word- anotherword') are taken out, and the
+remaining words, including hyphenated compounds, are counted in lower case. Files are counted in chunks across a process pool
+and the partial counts are added up.
+
+The table maps each word to its number of occurrences. The de-hyphenator only compares frequencies with each other, so a table
+of counts can be used as `wf_path` as it is, or built into a compact lexicon. Since counts add up, the counts of new data can be
+merged into an existing table without counting the old data again.
+"""
+from swedish_dehyphenator.swedish_dehyphenator import _DASH_RE, _batches, _chunksize, _read_texts, clean_anftext
+from collections import Counter
+from multiprocessing import Pool
+from tqdm import tqdm
+import json
+import os
+import re
+
+
+
+
+# Words of letters, possibly hyphenated, but not parts of tokens with digits like "1990-talet"
+_WORD_RE = re.compile(r"(?<![\w-])[^\W\d_]+(?:-[^\W\d_]+)*(?![\w-])")
+
+
+
+
+def count_words(_text, counts=None):
+    """
+    Count the words in a text, leaving out candidates for dehyphenation. Returns a Counter of 'word': occurrences.
+
+    Args:
+    - _text: a raw string
+    - counts: a Counter to add to, updated in place
+    """
+    if counts is None:
+        counts = Counter()
+    _text = _DASH_RE.sub(" ", clean_anftext(_text))
+    counts.update(word.lower() for word in _WORD_RE.findall(_text))
+    return counts
+
+
+
+
+def _count_chunk(args):
+    _files, source_type, field = args
+    counts = Counter()
+    for _file in _files:
+        for _text in _read_texts(_file, source_type, field):
+            count_words(_text, counts)
+    return len(_files), counts
+
+
+
+
+def count_files(_files, source_type, field=None, workers=1):
+    """
+    Count the words in files. Returns a Counter of 'word': occurrences.
+
+    Args:
+    - _files: list of input files
+    - source_type: anf_dict, txt_file or jsonl
+    - field: for jsonl, the dotted path of the text in each record
+    - workers: number of worker processes to spread the files over
+    """
+    progbar = tqdm(total=len(_files), desc="Counting", position=0, leave=True)
+    counts = Counter()
+    if workers > 1 and len(_files) > 1:
+        chunks = [(batch, source_type, field) for batch in _batches(_files, _chunksize(len(_files), workers, per_worker=4))]
+        with Pool(workers) as pool:
+            for n, partial in pool.imap_unordered(_count_chunk, chunks):
+                counts.update(partial)
+                progbar.update(n)
+    else:
+        for _file in _files:
+            for _text in _read_texts(_file, source_type, field):
+                count_words(_text, counts)
+            progbar.update(1)
+    progbar.close()
+
+    return counts
+
+
+
+
+def load_counts(wf_path):
+    """
+    Load a word frequency table of counts, as written by `save_counts`. Raises ValueError if it holds relative frequencies,
+    which can't be merged with counts.
+
+    Args:
+    - wf_path: path to the json file
+    """
+    with open(wf_path, 'r', encoding='utf-8') as f:
+        wf = json.load(f)
+    if not all(isinstance(v, int) for v in wf.values()):
+        raise ValueError(f"{wf_path} holds relative frequencies, not counts, so new counts can't be merged into it")
+    return Counter(wf)
+
+
+
+
+def save_counts(counts, wf_path):
+    """
+    Write a word frequency table of counts as json, most frequent first.
+
+    Args:
+    - counts: a Counter of 'word': occurrences
+    - wf_path: where to write the table
+    """
+    if os.path.dirname(wf_path):
+        os.makedirs(os.path.dirname(wf_path), exist_ok=True)
+    tmp_path = f"{wf_path}.tmp"
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        json.dump(dict(counts.most_common()), f, ensure_ascii=False)
+    os.replace(tmp_path, wf_path)
+
+
+
+
+def build_wf(_files, source_type, wf_path, merge=False, field=None, workers=1):
+    """
+    Count the words in files and write the word frequency table. Returns the table as a Counter.
+
+    Args:
+    - _files: list of input files
+    - source_type: anf_dict, txt_file or jsonl
+    - wf_path: where to write the table
+    - merge: add the counts to the table already at wf_path, if there is one
+    - field: for jsonl, the dotted path of the text in each record
+    - workers: number of worker processes
+    """
+    base = load_counts(wf_path) if merge and os.path.isfile(wf_path) else Counter()
+    counts = count_files(_files, source_type, field=field, workers=workers)
+    base.update(counts)
+    save_counts(base, wf_path)
+
+    return base
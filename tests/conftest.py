@@ -0,0 +1,39 @@
+"""
+Shared test data: a small lexicon and random raw texts made of the pieces cleaning and dehyphenation have to get right,
+candidates, line breaks, lone carriage returns, tags and inline headers.
+"""
+import random
+
+import pytest
+
+
+
+
+TOKENS = ["riks-", "dag", "sam-", "arbete", " ", "  ", "\n", "\r", "\r\n", "\n\n", "<p>", "</p>", "<EU", "foo>",
+          "<p> STYLEREF Kantrubrik \\* MERGEFORMAT>", "-", ">", "<", "ord.", "Öst-", "ersjön", "1990-", "talet"]
+WF = {"riksdag": 10, "samarbete": 5, "östersjön": 3, "riks-dag": 1}
+
+
+
+
+def _random_texts(n, seed=0):
+    rng = random.Random(seed)
+    for _ in range(n):
+        yield "".join(rng.choice(TOKENS) + rng.choice(["", " ", "\n"]) for _ in range(rng.randint(5, 80)))
+
+
+
+
+@pytest.fixture
+def wf():
+    return dict(WF)
+
+
+
+
+@pytest.fixture
+def random_texts():
+    """
+    A function that yields n random raw texts from a seed.
+    """
+    return _random_texts
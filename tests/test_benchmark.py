@@ -0,0 +1,10 @@
+import pytest
+
+from swedish_dehyphenator.benchmark.runner import run_benchmark
+
+
+
+
+def test_run_benchmark_needs_a_repeat(tmp_path):
+    with pytest.raises(ValueError):
+        run_benchmark(str(tmp_path), repeat=0)
@@ -0,0 +1,69 @@
+from swedish_dehyphenator import swedish_dehyphenator as sd
+from swedish_dehyphenator.cache import DecisionCache
+from swedish_dehyphenator.metrics import Metrics
+
+
+
+
+class _CountingList(list):
+    """
+    A list of decisions that counts how often it is searched.
+    """
+
+    def __init__(self, words=()):
+        super().__init__(words)
+        self.scans = 0
+
+
+    def __contains__(self, word):
+        self.scans += 1
+        return super().__contains__(word)
+
+
+
+
+def test_repeats_hit_the_cache_before_selected():
+    selected = _CountingList(["riksdagen"])
+    cache = DecisionCache()
+    assert sd.resolve_candidate("riks- dagen", {}, selected, [], False, cache=cache, quiet=True) == ("riksdagen", "selected")
+    scans = selected.scans
+    for _ in range(3):
+        assert sd.resolve_candidate("riks- dagen", {}, selected, [], False, cache=cache, quiet=True) == ("riksdagen", "selected")
+    assert selected.scans == scans
+    assert cache.info().hits == 3
+
+
+
+
+def test_merge_adds_entries_and_statistics():
+    cache, other = DecisionCache(), DecisionCache()
+    other.put(("riks", "dagen"), ("j", "lexicon"))
+    other.get(("riks", "dagen"))
+    other.get(("eu", "nämnden"))
+    cache.merge(other._data.items(), other.hits, other.misses)
+    assert cache.get(("riks", "dagen")) == ("j", "lexicon")
+    assert cache.info()[:2] == (2, 1)
+    assert len(cache) == 1
+
+
+
+
+def test_repeats_arent_recorded_again():
+    selected = []
+    cache = DecisionCache()
+    wf = {"riksdagen": 10, "riks": 1, "dagen": 1}
+    for _ in range(3):
+        sd.dehyphenate_text("Riks- dagen och riks- dagen.", wf, selected, [], False, 0, cache=cache, policy="defer")
+    assert selected == ["riksdagen"]
+
+
+
+
+def test_cache_hits_keep_their_rule():
+    metrics = Metrics(quiet=True)
+    cache = DecisionCache()
+    wf = {"riksdagen": 10}
+    for _ in range(3):
+        sd.dehyphenate_text("Riks- dagen, EU- nämnden och 1990- talet.", wf, [], [], False, 0, cache=cache, policy="defer", metrics=metrics)
+    assert metrics.rules == {"lexicon": 3, "uppercase": 3, "numeric": 3}
+    assert cache.info().hits == 6
@@ -0,0 +1,73 @@
+from swedish_dehyphenator.compression import codec_from_name, detect_codec, open_file, output_codec, with_codec
+from swedish_dehyphenator.discovery import InputFile
+from swedish_dehyphenator import swedish_dehyphenator as sd
+import gzip
+import lzma
+
+import pytest
+
+
+TEXT = "Riks- dagen och EU- nämnden\növer två rader\n"
+
+
+
+
+@pytest.mark.parametrize("codec, opener", [("gz", gzip.open), ("xz", lzma.open)])
+def test_round_trip(tmp_path, codec, opener):
+    path = str(tmp_path / f"a.txt.{codec}")
+    with open_file(path, "w", codec=codec, encoding="utf-8") as f:
+        f.write(TEXT)
+    with opener(path, "rt", encoding="utf-8") as f:
+        assert f.read() == TEXT
+    with open_file(path, "r", encoding="utf-8") as f:
+        assert f.read() == TEXT
+
+
+
+
+@pytest.mark.parametrize("codec, opener", [("gz", gzip.open), ("xz", lzma.open), (None, open)])
+def test_detect_codec_from_the_content(tmp_path, codec, opener):
+    path = str(tmp_path / "a.txt")
+    with opener(path, "wt", encoding="utf-8") as f:
+        f.write(TEXT)
+    assert detect_codec(path) == codec
+    with open_file(path, "r", encoding="utf-8") as f:
+        assert f.read() == TEXT
+
+
+
+
+def test_names():
+    assert codec_from_name("a.json.gz") == "gz"
+    assert codec_from_name("a.json.xz") == "xz"
+    assert codec_from_name("a.json") is None
+    assert with_codec("a.json.gz", "xz") == "a.json.xz"
+    assert with_codec("a.json.gz", "none") == "a.json"
+    assert with_codec("a.json", "gz") == "a.json.gz"
+
+
+
+
+def test_output_codec(tmp_path):
+    path = tmp_path / "a.txt.gz"
+    with gzip.open(path, "wt") as f:
+        f.write(TEXT)
+    assert output_codec(str(path)) == "gz"
+    assert output_codec(InputFile(str(path), "a.txt.gz", "none")) is None
+    assert output_codec(InputFile(str(path), "a.txt.gz", "xz")) == "xz"
+
+
+
+
+def test_compressed_corpus_round_trip(tmp_path, wf):
+    src, out = tmp_path / "src", tmp_path / "out"
+    src.mkdir()
+    out.mkdir()
+    with gzip.open(src / "a.txt.gz", "wt", encoding="utf-8") as f:
+        f.write("riks- dag\nsam- arbete")
+    sd.dehyphenate_from(f"{src}/", "txt_file", wf, [], [], f"{out}/", False, 0, 0, policy="defer")
+    with gzip.open(out / "a.txt.gz", "rt", encoding="utf-8") as f:
+        assert f.read() == "riksdag samarbete"
+    sd.dehyphenate_from(f"{src}/", "txt_file", wf, [], [], f"{out}/", False, 0, 0, policy="defer", compress="xz")
+    with lzma.open(out / "a.txt.xz", "rt", encoding="utf-8") as f:
+        assert f.read() == "riksdag samarbete"
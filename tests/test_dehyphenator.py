@@ -0,0 +1,53 @@
+import pickle
+
+import pytest
+
+from swedish_dehyphenator import swedish_dehyphenator as sd
+
+
+WF = {"riksdagen": 10, "riks": 1, "dagen": 1}
+
+
+
+
+@pytest.fixture
+def no_input(monkeypatch):
+    def _input(*args):
+        raise AssertionError("asked for input")
+    monkeypatch.setattr("builtins.input", _input)
+
+
+
+
+def test_flush_writes_to_the_pickles_it_read(tmp_path, no_input):
+    selected, autojoined = tmp_path / "selected.pickle", tmp_path / "autojoined.pickle"
+    with sd.Dehyphenator(wf_anf=WF, selected=str(selected), autojoined=str(autojoined)) as dehyphenator:
+        assert dehyphenator.dehyphenate("Riks- dagen.") == "Riksdagen."
+        dehyphenator.flush()
+    with open(selected, "rb") as f:
+        assert pickle.load(f) == ["riksdagen"]
+    assert autojoined.exists()
+
+
+
+
+def test_flush_without_paths_raises(no_input):
+    dehyphenator = sd.Dehyphenator(wf_anf=WF)
+    assert not dehyphenator.log_results
+    with pytest.raises(ValueError):
+        dehyphenator.flush()
+
+
+
+
+def test_dehyphenate_many_without_paths_doesnt_prompt(no_input):
+    assert list(sd.dehyphenate_many(["Riks- dagen.", "riks- dagen"], wf_anf=WF)) == [("Riksdagen.", 1), ("riksdagen", 1)]
+
+
+
+
+def test_dehyphenate_many_saves_to_the_pickles(tmp_path, no_input):
+    selected, autojoined = tmp_path / "selected.pickle", tmp_path / "autojoined.pickle"
+    list(sd.dehyphenate_many(["Riks- dagen."], wf_anf=WF, selected=str(selected), autojoined=str(autojoined)))
+    with open(selected, "rb") as f:
+        assert pickle.load(f) == ["riksdagen"]
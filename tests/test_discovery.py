@@ -0,0 +1,63 @@
+from swedish_dehyphenator.discovery import iter_files, output_name, parse_shard, shard_of
+
+import pytest
+
+
+
+
+def _tree(root, names):
+    for name in names:
+        path = root / name
+        path.parent.mkdir(parents=True, exist_ok=True)
+        path.write_text("riks- dag", encoding="utf-8")
+
+
+
+
+def test_shards_are_pinned_to_the_relative_path():
+    # Machines must agree on the shards of a corpus without coordinating, so the assignment may never change between releases
+    assert [shard_of(p, 4) for p in ["a.json", "2020/b.json", "2021/c/d.json.gz", "å.txt"]] == [3, 3, 2, 3]
+    assert [shard_of(p, 7) for p in ["a.json", "2020/b.json"]] == [7, 1]
+
+
+
+
+def test_shards_split_a_tree(tmp_path):
+    names = [f"{year}/{i}.json" for year in (2019, 2020) for i in range(30)]
+    _tree(tmp_path / "one", names)
+    _tree(tmp_path / "two", names + ["extra.json"])
+    shards = [[f.relpath for f in iter_files(str(tmp_path / "one"), shard=(i, 3))] for i in (1, 2, 3)]
+    assert sorted(sum(shards, [])) == sorted(names)
+    assert all(shards)
+    # a file's shard doesn't depend on where the tree is or what else is in it
+    assert [f.relpath for f in iter_files(str(tmp_path / "two"), shard=(2, 3)) if f.relpath != "extra.json"] == shards[1]
+
+
+
+
+def test_parse_shard():
+    assert parse_shard("2/5") == (2, 5)
+    for shard in ("0/5", "6/5", "2", "a/b"):
+        with pytest.raises(ValueError):
+            parse_shard(shard)
+
+
+
+
+def test_walk_is_sorted_and_filtered(tmp_path):
+    _tree(tmp_path, ["b.json", "a.json.gz", "sub/c.json", ".hidden.json", ".git/d.json", "skip/e.json", "f.txt"])
+    files = list(iter_files(str(tmp_path), include=["*.json", "*.json.gz"], exclude=["skip"]))
+    assert [f.relpath for f in files] == ["a.json.gz", "b.json", "sub/c.json"]
+    assert str(files[2]) == str(tmp_path / "sub" / "c.json")
+
+
+
+
+def test_output_name_follows_the_relative_path_and_codec(tmp_path):
+    _tree(tmp_path, ["sub/a.json.gz"])
+    (_file,) = iter_files(str(tmp_path))
+    assert output_name(_file) == "sub/a.json.gz"
+    (_file,) = iter_files(str(tmp_path), compress="none")
+    assert output_name(_file) == "sub/a.json"
+    (_file,) = iter_files(str(tmp_path), compress="xz")
+    assert output_name(_file) == "sub/a.json.xz"
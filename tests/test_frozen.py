@@ -0,0 +1,54 @@
+from swedish_dehyphenator import frozen, review
+from swedish_dehyphenator import swedish_dehyphenator as sd
+
+
+
+
+def _corpus(root, texts):
+    root.mkdir()
+    for i, _text in enumerate(texts):
+        (root / f"{i}.txt").write_text(_text, encoding="utf-8", newline="")
+    return sd.list_files(f"{root}/", "txt_file")
+
+
+
+
+def test_applying_the_frozen_table_matches_a_normal_run(tmp_path, random_texts, wf):
+    files = _corpus(tmp_path / "src", random_texts(30, seed=8))
+    table, queue = frozen.freeze_table(files, "txt_file", wf, [], [])
+    for out in ("normal", "frozen"):
+        (tmp_path / out).mkdir()
+    _, dcounter = sd.dehyphenate_from(f"{tmp_path / 'src'}/", "txt_file", wf, [], [], f"{tmp_path / 'normal'}/", False, 0, 0, policy="defer")
+    fcounter, fixes, unknown = frozen.apply_files(files, "txt_file", table, f"{tmp_path / 'frozen'}/", workers=2, report=True)
+    assert (fcounter, fixes) == (len(files), dcounter)
+    assert set(unknown) == set(queue)
+    for _file in files:
+        name = _file.relpath
+        assert (tmp_path / "frozen" / name).read_text(encoding="utf-8") == (tmp_path / "normal" / name).read_text(encoding="utf-8")
+
+
+
+
+def test_review_answers_take_precedence(tmp_path, wf):
+    # equally frequent forms need a human decision
+    wf.update({"tvärsektoriell": 2, "tvär-sektoriell": 2})
+    files = _corpus(tmp_path / "src", ["riks- dag och tvär- sektoriell", "sam- arbete"])
+    queue_path = str(tmp_path / "queue.jsonl")
+    queue = review.scan_files(files, "txt_file", wf, [], [])
+    assert set(queue) == {"tvär- sektoriell"}
+    queue["tvär- sektoriell"].update(decision="d", replacement="tvär-sektoriell")
+    review.write_queue(queue, queue_path)
+    table, left = frozen.freeze_table(files, "txt_file", wf, [], [], queue_path=queue_path)
+    assert table == {"riks- dag": "riksdag", "sam- arbete": "samarbete", "tvär- sektoriell": "tvär-sektoriell"}
+    assert left == {}
+
+
+
+
+def test_apply_table_reports_unknown_candidates(tmp_path):
+    unknown = {}
+    assert frozen.apply_table("riks-\ndag och sam- arbete, sam- arbete", {"riks- dag": "riksdag"}, unknown) == ("riksdag och sam- arbete, sam- arbete", 1)
+    assert unknown["sam- arbete"]["count"] == 2
+    table_path = str(tmp_path / "table.json")
+    frozen.save_table({"sam- arbete": "samarbete", "riks- dag": "riksdag"}, table_path)
+    assert frozen.load_table(table_path) == {"riks- dag": "riksdag", "sam- arbete": "samarbete"}
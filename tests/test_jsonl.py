@@ -0,0 +1,73 @@
+from swedish_dehyphenator import jsonl
+from swedish_dehyphenator import swedish_dehyphenator as sd
+import json
+
+import pytest
+
+
+
+
+def _write_lines(path, lines):
+    with open(path, "w", encoding="utf-8") as f:
+        f.write("".join(lines))
+
+
+
+
+def _records(random_texts):
+    lines = []
+    for i, _text in enumerate(random_texts(60, seed=6)):
+        if i % 7 == 3:
+            lines.append("\n")
+        elif i % 7 == 5:
+            lines.append(json.dumps({"id": i, "anforande": {"talare": "x"}}) + "\n")
+        else:
+            lines.append(json.dumps({"id": i, "anforande": {"anforandetext": _text}}, ensure_ascii=False) + "\n")
+    return lines
+
+
+
+
+@pytest.mark.parametrize("workers", [1, 2])
+def test_records_keep_their_order_and_others_pass_through(tmp_path, random_texts, wf, workers):
+    src, out = tmp_path / "src", tmp_path / "out"
+    src.mkdir()
+    out.mkdir()
+    lines = _records(random_texts)
+    _write_lines(src / "a.jsonl", lines)
+    fcounter, dcounter = sd.dehyphenate_from(f"{src}/", "jsonl", wf, [], [], f"{out}/", False, 0, 0, policy="defer", workers=workers)
+    assert fcounter == 1
+    with open(out / "a.jsonl", encoding="utf-8") as f:
+        written = f.readlines()
+    assert len(written) == len(lines)
+    fixes = 0
+    for line, output in zip(lines, written):
+        if not line.strip() or "anforandetext" not in line:
+            assert output == line
+            continue
+        record, result = json.loads(line), json.loads(output)
+        expected, n = sd.dehyphenate_text(record["anforande"]["anforandetext"], wf, [], [], False, 0, policy="defer")
+        assert result["id"] == record["id"]
+        assert result["anforande"]["anforandetext"] == expected.strip()
+        fixes += n
+    assert dcounter == fixes
+
+
+
+
+def test_field_paths():
+    record = {"a": {"b": "text"}, "c": 1}
+    assert jsonl.get_field(record, "a.b") == "text"
+    assert jsonl.get_field(record, "c.d") is None
+    assert jsonl.get_field(record, "x") is None
+    jsonl.set_field(record, "new", "a.b")
+    assert record == {"a": {"b": "new"}, "c": 1}
+
+
+
+
+def test_bad_lines_name_the_file_and_line(tmp_path):
+    path = tmp_path / "a.jsonl"
+    _write_lines(path, ['{"anforande": {}}\n', "{not json\n"])
+    with pytest.raises(ValueError, match="line 2"):
+        list(jsonl.read_records(str(path)))
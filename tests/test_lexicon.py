@@ -0,0 +1,75 @@
+from swedish_dehyphenator.lexicon import MAGIC, Lexicon, build_lexicon, load_wf
+import pickle
+import struct
+
+import pytest
+
+
+# Non-ASCII words, which sort after 'z' by their UTF-8 bytes, upper case ones, and words that are prefixes of others
+WF = {"riksdag": 10, "riks-dag": 1, "zebra": 2, "ål": 3, "öl": 4, "äpple": 5, "Öst": 6, "a": 7, "aa": 8, "b": 0.5}
+
+
+
+
+@pytest.fixture
+def lexicon(tmp_path):
+    path = str(tmp_path / "wf.lex")
+    assert build_lexicon(WF, path) == len(WF)
+    lexicon = Lexicon(path)
+    yield lexicon
+    lexicon.close()
+
+
+
+
+def test_lookups_match_the_dict(lexicon):
+    for word, freq in WF.items():
+        assert word in lexicon
+        assert lexicon[word] == freq
+        assert lexicon.get(word) == freq
+    for word in ("", "riks", "riksdagen", "å", "ö", "zz", "c", "ÖST"):
+        assert word not in lexicon
+        assert lexicon.get(word, -1) == -1
+        with pytest.raises(KeyError):
+            lexicon[word]
+    assert len(lexicon) == len(WF)
+
+
+
+
+def test_words_are_sorted_by_utf8_bytes(lexicon):
+    assert list(lexicon) == sorted(WF, key=lambda word: word.encode("utf-8"))
+
+
+
+
+def test_file_is_little_endian(tmp_path):
+    path = tmp_path / "wf.lex"
+    build_lexicon({"b": 2, "a": 1.5}, str(path))
+    data = path.read_bytes()
+    magic, n = struct.unpack_from("<8sQ", data)
+    assert (magic, n) == (MAGIC, 2)
+    assert struct.unpack_from("<3Q2d", data, 16) == (0, 1, 2, 1.5, 2.0)
+    assert data[16 + 3 * 8 + 2 * 8:] == b"ab"
+
+
+
+
+def test_load_wf_reads_every_format(tmp_path, lexicon):
+    json_path, pickle_path = tmp_path / "wf.json", tmp_path / "wf.pickle"
+    json_path.write_text('{"riksdag": 10}', encoding="utf-8")
+    with open(pickle_path, "wb") as f:
+        pickle.dump({"riksdag": 10}, f)
+    loaded = load_wf(lexicon.path)
+    assert isinstance(loaded, Lexicon) and loaded["riksdag"] == 10
+    loaded.close()
+    assert load_wf(str(json_path)) == load_wf(str(pickle_path)) == {"riksdag": 10}
+    assert load_wf(str(tmp_path / "missing")) is None
+
+
+
+
+def test_lexicon_pickles_by_path(lexicon):
+    copy = pickle.loads(pickle.dumps(lexicon))
+    assert copy.path == lexicon.path and copy["öl"] == 4
+    copy.close()
@@ -0,0 +1,8 @@
+from swedish_dehyphenator.manifest import decision_version
+
+
+
+
+def test_decision_version_ignores_duplicates_and_order():
+    assert decision_version(["riksdagen", "eu-nämnden", "riksdagen"], ["talman"]) == decision_version(["eu-nämnden", "riksdagen"], ["talman"])
+    assert decision_version(["riksdagen"], ["talman"]) != decision_version(["riksdagen", "talman"], [])
@@ -0,0 +1,61 @@
+import pytest
+
+np = pytest.importorskip("numpy")
+
+from swedish_dehyphenator import ngram
+from swedish_dehyphenator.review import queue_candidate
+
+
+WORDS = ["riksdagen", "regeringen", "samarbete", "östersjön", "utskottet", "betänkandet", "propositionen", "talmannen",
+         "eu-nämnden", "eu-rätten", "nato-medlemskap", "fn-stadgan", "icke-spridning", "tv-tittare", "it-system", "ab-bolag"]
+OPTIONS = {"trigram_bits": 12, "bigram_bits": 10, "word_bits": 12}
+
+
+
+
+@pytest.fixture
+def model():
+    model, accuracy = ngram.train_model({word: 1 for word in WORDS}, seed=1, **OPTIONS)
+    assert 0 <= accuracy <= 1
+    return model
+
+
+
+
+def test_saved_model_scores_the_same(tmp_path, model):
+    path = str(tmp_path / "model.npz")
+    model.save(path)
+    loaded = ngram.NgramModel.load(path)
+    assert (loaded.trigram_bits, loaded.bigram_bits, loaded.word_bits) == (12, 10, 12)
+    assert loaded.smoothing == model.smoothing
+    candidates = ["riks- dagen", "EU- nämnden", "sam- arbete", "tv- tittare", "ny- ord"]
+    assert np.array_equal(loaded.score(candidates), model.score(candidates))
+    assert loaded.score([]).shape == (0,)
+
+
+
+
+def test_untrained_model_cant_score():
+    with pytest.raises(ValueError):
+        ngram.NgramModel(**OPTIONS).score(["riks- dagen"])
+
+
+
+
+def test_resolve_queue_only_takes_confident_decisions(model):
+    queue = {}
+    for dash in ("riks- dagen", "EU- nämnden", "sam- arbete"):
+        queue_candidate(queue, dash, 1, dash)
+    queue["sam- arbete"].update(decision="k", replacement="sam- arbete")
+    scores = dict(zip(["riks- dagen", "EU- nämnden"], model.score(["riks- dagen", "EU- nämnden"])))
+    decided = ngram.resolve_queue(queue, model, threshold=0.5)
+    assert decided == 2
+    for dash, p in scores.items():
+        entry = queue[dash]
+        assert entry["decision"] == ("j" if p >= 0.5 else "d")
+        assert entry["confidence"] == round(float(max(p, 1 - p)), 3)
+    assert queue["sam- arbete"]["decision"] == "k"
+    unsure = {}
+    queue_candidate(unsure, "riks- dagen", 1, "riks- dagen")
+    assert ngram.resolve_queue(unsure, model, threshold=1.01) == 0
+    assert unsure["riks- dagen"]["decision"] is None
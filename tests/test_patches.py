@@ -0,0 +1,85 @@
+"""
+Applying patches must give the same output as a normal run with the same decisions.
+"""
+from swedish_dehyphenator import patches
+from swedish_dehyphenator import swedish_dehyphenator as sd
+import json
+
+
+
+
+def _dehyphenate(_text, wf):
+    resolved = {}
+    result = sd.dehyphenate_text(_text, wf, [], [], False, 0, policy="defer", resolved=resolved)
+    return result[0], resolved
+
+
+
+
+def test_apply_edits_matches_dehyphenate_text(random_texts, wf):
+    for _text in random_texts(5000, seed=4):
+        expected, resolved = _dehyphenate(_text, wf)
+        edits = patches.make_patches(_text, resolved)
+        assert patches.apply_edits(sd.clean_anftext(_text), edits) == expected, repr(_text)
+
+
+
+
+def test_stray_brackets_across_a_line_break():
+    _text = "a <b riks-\ndag c> d"
+    expected, resolved = _dehyphenate(_text, {"riksdag": 10})
+    assert patches.apply_edits(sd.clean_anftext(_text), patches.make_patches(_text, resolved)) == expected
+
+
+
+
+def test_apply_edits_checks_the_original():
+    edits = [{"start": 0, "end": 9, "original": "riks- dag", "replacement": "riksdag"}]
+    assert patches.apply_edits("riks- dag i dag", edits) == "riksdag i dag"
+    try:
+        patches.apply_edits("sam- arbete", edits)
+    except ValueError:
+        pass
+    else:
+        raise AssertionError("a changed source was patched")
+
+
+
+
+def test_apply_patches_matches_a_normal_run(tmp_path, random_texts, wf):
+    src, patched, normal = tmp_path / "src", tmp_path / "patched", tmp_path / "normal"
+    for d in (src, patched, normal):
+        d.mkdir()
+    texts = list(random_texts(20, seed=5))
+    for i, _text in enumerate(texts):
+        (src / f"{i}.txt").write_text(_text, encoding="utf-8", newline="")
+        with open(src / f"{i}.json", "w", encoding="utf-8") as f:
+            json.dump({"anforande": {"anforandetext": _text}}, f)
+    for source_type, ext in (("txt_file", ".txt"), ("anf_dict", ".json")):
+        files = sorted(str(p) for p in src.iterdir() if p.suffix == ext)
+        for output_path, as_patches in ((normal, False), (tmp_path / "sidecars", True)):
+            output_path.mkdir(exist_ok=True)
+            sd.dehyphenate_from(f"{src}/", source_type, wf, [], [], f"{output_path}/", False, 0, 0, policy="defer", patches=as_patches)
+        fcounter, _, missing = patches.apply_patches(files, source_type, f"{tmp_path / 'sidecars'}/", f"{patched}/")
+        assert (fcounter, missing) == (len(files), 0)
+    for p in src.iterdir():
+        if p.suffix == ".txt":
+            assert (patched / p.name).read_text(encoding="utf-8") == (normal / p.name).read_text(encoding="utf-8")
+        else:
+            assert sd.parsejson(str(patched / p.name)) == sd.parsejson(str(normal / p.name))
+
+
+
+
+def test_sidecars_are_found_when_the_output_codec_changes(tmp_path, wf):
+    import gzip
+    src, sidecars, patched = tmp_path / "src", tmp_path / "sidecars", tmp_path / "patched"
+    for d in (src, sidecars, patched):
+        d.mkdir()
+    with gzip.open(src / "a.txt.gz", "wt", encoding="utf-8") as f:
+        f.write("riks-\ndag och riks- dag")
+    sd.dehyphenate_from(f"{src}/", "txt_file", wf, [], [], f"{sidecars}/", False, 0, 0, policy="defer", patches=True, compress="none")
+    assert (sidecars / ("a.txt.gz" + patches.PATCH_SUFFIX)).exists()
+    files = sd.list_files(f"{src}/", "txt_file", compress="none")
+    assert patches.apply_patches(files, "txt_file", f"{sidecars}/", f"{patched}/") == (1, 2, 0)
+    assert (patched / "a.txt").read_text(encoding="utf-8") == "riksdag och riksdag"
@@ -0,0 +1,54 @@
+from swedish_dehyphenator import review
+from swedish_dehyphenator import swedish_dehyphenator as sd
+
+
+
+
+def _keys(monkeypatch, keys):
+    keys = iter(keys)
+    monkeypatch.setattr(sd.getch, "getch", lambda: next(keys))
+
+
+
+
+def _queue(tmp_path, *dashes):
+    queue = {}
+    for n, dash in enumerate(dashes):
+        review.queue_candidate(queue, dash, len(dashes) - n, f"om {dash} i dag")
+    queue_path = str(tmp_path / "queue.jsonl")
+    review.write_queue(queue, queue_path)
+    return queue_path
+
+
+
+
+def test_ask_user_returns_the_retried_answer(monkeypatch):
+    _keys(monkeypatch, "xj")
+    assert sd.ask_user(None, None, False) == "j"
+    _keys(monkeypatch, "anD")
+    assert sd.ask_user(None, None, False) == "d"
+    _keys(monkeypatch, "ay")
+    assert sd.ask_user(None, None, False) == "a"
+
+
+
+
+def test_review_queue_stores_the_retried_answer(tmp_path, monkeypatch):
+    queue_path = _queue(tmp_path, "riks- dagen", "EU- nämnden")
+    _keys(monkeypatch, "xjand")
+    selected = []
+    assert review.review_queue(queue_path, selected=selected) == 2
+    queue = review.read_queue(queue_path)
+    assert review.queue_decisions(queue) == {"riks- dagen": "riksdagen", "EU- nämnden": "EU-nämnden"}
+    assert selected == ["riksdagen", "eu-nämnden"]
+
+
+
+
+def test_review_queue_abort_keeps_earlier_answers(tmp_path, monkeypatch):
+    queue_path = _queue(tmp_path, "riks- dagen", "EU- nämnden")
+    _keys(monkeypatch, "kay")
+    assert review.review_queue(queue_path) == 1
+    queue = review.read_queue(queue_path)
+    assert queue["riks- dagen"]["decision"] == "k"
+    assert queue["EU- nämnden"]["decision"] is None
@@ -0,0 +1,53 @@
+"""
+Splitting a large text for `dehyphenate_text` with workers must give the same result as processing it whole.
+"""
+from swedish_dehyphenator import swedish_dehyphenator as sd
+
+
+
+
+def _dehyphenate(_text, wf, workers):
+    pending = {}
+    result = sd.dehyphenate_text(_text, wf, [], [], False, 0, policy="defer", pending=pending, workers=workers)
+    return result, pending
+
+
+
+
+def test_split_keeps_the_text(random_texts):
+    for _text in random_texts(500):
+        assert "".join(sd.split_text(_text, 3)) == _text
+
+
+
+
+def test_split_doesnt_cut_tags_at_carriage_returns():
+    _text = "abc <EU\rfoo>bar"
+    pieces = sd.split_text(_text, 3)
+    assert "".join(sd.clean_anftext(piece) for piece in pieces) == sd.clean_anftext(_text) == "abc bar"
+
+
+
+
+def test_cleaning_pieces_matches_cleaning_whole(random_texts):
+    for _text in random_texts(3000, seed=1):
+        pieces = sd.split_text(_text, 3)
+        assert "".join(sd.clean_anftext(piece) for piece in pieces) == sd.clean_anftext(_text), repr(_text)
+
+
+
+
+def test_split_candidates_match_whole(random_texts):
+    for _text in random_texts(3000, seed=2):
+        pieces = sd.split_text(_text, 3)
+        split = [dash for piece in pieces for dash in sd.find_candidates(sd.clean_anftext(piece))]
+        assert split == sd.find_candidates(sd.clean_anftext(_text)), repr(_text)
+
+
+
+
+def test_dehyphenate_text_with_workers_matches_serial(monkeypatch, random_texts, wf):
+    monkeypatch.setattr(sd, "_MIN_SPLIT", 8)
+    _text = "".join(random_texts(200, seed=3))
+    assert len(sd.split_text(_text, 8)) > 1
+    assert _dehyphenate(_text, wf, 2) == _dehyphenate(_text, wf, 1)
@@ -0,0 +1,74 @@
+from swedish_dehyphenator.store import DecisionStore
+from multiprocessing import Pool
+import pickle
+
+
+
+
+def _append_words(args):
+    path, words = args
+    with DecisionStore(path, batch_size=4) as store:
+        for word in words:
+            store.selected.append(word)
+    return len(words)
+
+
+
+
+def test_appended_words_are_seen_before_and_after_a_flush(tmp_path):
+    path = str(tmp_path / "decisions.db")
+    with DecisionStore(path, batch_size=None) as store:
+        store.selected.append("riksdag")
+        assert "riksdag" in store.selected
+        assert "riksdag" not in store.autojoined
+        with DecisionStore(path) as other:
+            assert "riksdag" not in other.selected
+            store.flush()
+            assert "riksdag" in other.selected
+    with DecisionStore(path) as store:
+        assert list(store.selected) == ["riksdag"]
+        assert len(store.autojoined) == 0
+
+
+
+
+def test_duplicates_are_stored_once(tmp_path):
+    with DecisionStore(str(tmp_path / "decisions.db"), batch_size=2) as store:
+        store.selected.extend(["riksdag", "samarbete", "riksdag", "riksdag"])
+        assert len(store.selected) == 2
+        assert sorted(store.selected) == ["riksdag", "samarbete"]
+
+
+
+
+def test_close_without_flush_drops_buffered_words(tmp_path):
+    path = str(tmp_path / "decisions.db")
+    store = DecisionStore(path, batch_size=None)
+    store.autojoined.append("riksdag")
+    store.close(flush=False)
+    with DecisionStore(path) as store:
+        assert "riksdag" not in store.autojoined
+
+
+
+
+def test_import_pickles(tmp_path):
+    selected_path, autojoined_path = tmp_path / "selected.pickle", tmp_path / "autojoined.pickle"
+    with open(selected_path, "wb") as f:
+        pickle.dump(["riksdag", "eu-nämnd", "riksdag"], f)
+    with DecisionStore(str(tmp_path / "decisions.db")) as store:
+        assert store.import_pickles(str(selected_path), str(autojoined_path)) == (3, 0)
+        assert sorted(store.selected) == ["eu-nämnd", "riksdag"]
+        assert list(store.autojoined) == []
+
+
+
+
+def test_processes_append_to_one_store(tmp_path):
+    path = str(tmp_path / "decisions.db")
+    DecisionStore(path).close()
+    jobs = [(path, [f"ord{i}-{j}" for j in range(50)]) for i in range(4)]
+    with Pool(4) as pool:
+        assert sum(pool.map(_append_words, jobs)) == 200
+    with DecisionStore(path) as store:
+        assert len(store.selected) == 200
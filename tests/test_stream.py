@@ -0,0 +1,47 @@
+"""
+Streaming a text in chunks must give the same result as cleaning and dehyphenating it whole.
+"""
+from swedish_dehyphenator import swedish_dehyphenator as sd
+import io
+import random
+
+
+
+
+def _chunks(_text, rng):
+    i = 0
+    while i < len(_text):
+        n = rng.randint(1, 12)
+        yield _text[i:i + n]
+        i += n
+
+
+
+
+def test_stream_clean_matches_clean_anftext(random_texts):
+    rng = random.Random(0)
+    for _text in random_texts(3000, seed=1):
+        assert "".join(sd.stream_clean(_chunks(_text, rng))) == sd.clean_anftext(_text), repr(_text)
+
+
+
+
+def test_stream_clean_with_tags_across_chunks():
+    for _text in ("abc <EU\rfoo>bar", "x <p> STYLEREF Kantrubrik \\* MERGEFORMAT> y", "riks-\r\n<p>dag", "a <b\nc> d"):
+        for size in range(1, len(_text) + 1):
+            chunks = [_text[i:i + size] for i in range(0, len(_text), size)]
+            assert "".join(sd.stream_clean(chunks)) == sd.clean_anftext(_text), (repr(_text), size)
+
+
+
+
+def test_dehyphenate_stream_matches_dehyphenate_text(random_texts, wf):
+    rng = random.Random(2)
+    for _text in random_texts(1000, seed=3):
+        out = io.StringIO()
+        pending_stream, pending_whole = {}, {}
+        dcounter = sd.dehyphenate_stream(_chunks(_text, rng), out, wf, [], [], False, 0, policy="defer", pending=pending_stream)
+        expected, expected_dcounter = sd.dehyphenate_text(_text, wf, [], [], False, 0, policy="defer", pending=pending_whole)
+        assert out.getvalue() == expected, repr(_text)
+        assert dcounter == expected_dcounter
+        assert pending_stream == pending_whole
@@ -0,0 +1,51 @@
+from swedish_dehyphenator import wordfreq
+import json
+
+import pytest
+
+
+
+
+def _corpus(root, texts):
+    root.mkdir()
+    for i, _text in enumerate(texts):
+        (root / f"{i}.txt").write_text(_text, encoding="utf-8")
+    return sorted(str(p) for p in root.iterdir())
+
+
+
+
+def test_count_words_leaves_out_candidates():
+    counts = wordfreq.count_words("Riks- dagen och EU-nämnden, <p>och</p> 1990-talet och riks-\ndagen.")
+    assert counts == {"och": 3, "eu-nämnden": 1}
+
+
+
+
+def test_parallel_counts_match_serial(tmp_path, random_texts):
+    files = _corpus(tmp_path / "src", random_texts(40, seed=7))
+    assert wordfreq.count_files(files, "txt_file", workers=3) == wordfreq.count_files(files, "txt_file")
+
+
+
+
+def test_merged_counts_add_up(tmp_path):
+    first = _corpus(tmp_path / "first", ["riksdagen och regeringen", "och riksdagen"])
+    second = _corpus(tmp_path / "second", ["regeringen och talmannen"])
+    wf_path = str(tmp_path / "wf.json")
+    wordfreq.build_wf(first, "txt_file", wf_path)
+    merged = wordfreq.build_wf(second, "txt_file", wf_path, merge=True)
+    assert merged == wordfreq.count_files(first + second, "txt_file")
+    with open(wf_path, encoding="utf-8") as f:
+        assert list(json.load(f).items()) == [("och", 3), ("riksdagen", 2), ("regeringen", 2), ("talmannen", 1)]
+    # without merge, the table is replaced
+    assert wordfreq.build_wf(second, "txt_file", wf_path) == {"regeringen": 1, "och": 1, "talmannen": 1}
+
+
+
+
+def test_relative_frequencies_cant_be_merged(tmp_path):
+    wf_path = tmp_path / "wf.json"
+    wf_path.write_text('{"och": 0.5}', encoding="utf-8")
+    with pytest.raises(ValueError):
+        wordfreq.load_counts(str(wf_path))